@@ -1,34 +1,268 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.db import transaction
+from django.utils import timezone
+
+from . import pricing, stock
+from .dedupe import merge_customers
 from .models import (
     Customer, Purchase, Prescription,
     CustomerHistory, ProductCategory,
-    Supplier, Product, Inventory, Sale
+    Supplier, Product, Inventory, Sale,
+    SupplierLedgerEntry, SyncPeer, ParkedChange, Bill,
+    PurchaseOrder, PurchaseOrderLine, GoodsReceipt,
+    StockTake, StockMovement, StockSnapshot, PriceHistory,
 )
 
+
+# Changelists over tables that grow without bound skip the second, unfiltered
+# COUNT(*) per page. Their search fields are prefix ('^') and exact
+# ('__exact') lookups instead of a full '%term%' scan: '^' is a
+# case-insensitive LIKE 'term%', which SQLite answers from the COLLATE NOCASE
+# indexes declared on those columns, and codes and references are matched
+# exactly on their plain indexes ('=' would be a case-insensitive LIKE too).
+class LargeTableAdmin(admin.ModelAdmin):
+    show_full_result_count = False
+    list_per_page = 50
+
+
+class RepriceActionForm(ActionForm):
+    percent = forms.DecimalField(
+        required=False, max_digits=6, decimal_places=2,
+        help_text="Reprice: percentage change, e.g. 5 or -10",
+    )
+
+
 @admin.register(Customer)
-class CustomerAdmin(admin.ModelAdmin):
-    list_display = ('first_name', 'last_name', 'phone')
+class CustomerAdmin(LargeTableAdmin):
+    list_display = ('first_name', 'last_name', 'phone', 'email', 'created_at')
+    search_fields = ('^phone', '^first_name', '^last_name')
+    date_hierarchy = 'created_at'
+    # The model's default ordering (prescription_date) has no index; newest rows by primary key.
+    ordering = ('-pk',)
+    autocomplete_fields = ('user',)
+    raw_id_fields = ('latest_prescription',)
+    actions = ['merge_selected']
+
+    @admin.action(description="Merge selected customers into the oldest")
+    def merge_selected(self, request, queryset):
+        customers = list(queryset.order_by('pk'))
+        if len({c.user_id for c in customers}) > 1:
+            self.message_user(request, "Only customers of the same user can be merged.", messages.ERROR)
+            return
+        merged = merge_customers(customers[0], customers[1:])
+        self.message_user(request, f"Merged {merged} customer(s) into {customers[0]}.")
 
 @admin.register(Product)
-class ProductAdmin(admin.ModelAdmin):
-    list_display = ('name', 'category', 'price')
+class ProductAdmin(LargeTableAdmin):
+    list_display = ('name', 'brand', 'category', 'sku', 'price')
+    list_select_related = ('category',)
+    list_filter = ('category', 'lens_type')
+    search_fields = ('^name', '^brand', 'sku__exact', 'barcode__exact')
+    action_form = RepriceActionForm
+    actions = ['reprice']
+
+    @admin.action(description="Reprice selected products by a percentage")
+    def reprice(self, request, queryset):
+        form = self.action_form(request.POST, auto_id=None)
+        form.fields['action'].choices = self.get_action_choices(request)
+        percent = form.cleaned_data['percent'] if form.is_valid() else None
+        if percent is None:
+            self.message_user(request, "Enter the percentage change to reprice by.", messages.ERROR)
+            return
+        if percent <= -100:
+            self.message_user(request, "Prices cannot drop by 100% or more.", messages.ERROR)
+            return
+
+        changes = pricing.plan_formula(queryset, percent)
+        repriced = pricing.apply(changes, user=request.user, reason=f"Admin reprice by {percent}%")
+        self.message_user(request, f"Repriced {repriced} product(s) by {percent}%.")
+        skipped = len(changes) - repriced
+        if skipped:
+            self.message_user(request, f"Skipped {skipped} product(s) that would be priced above their MRP.",
+                              messages.WARNING)
 
 @admin.register(Supplier)
 class SupplierAdmin(admin.ModelAdmin):
     list_display = ('name', 'gstin', 'contact_person')
+    search_fields = ('^name',)
 
 @admin.register(Inventory)
-class InventoryAdmin(admin.ModelAdmin):
-    list_display = ('product', 'batch_number', 'quantity')
+class InventoryAdmin(LargeTableAdmin):
+    list_display = ('product', 'batch_number', 'supplier', 'quantity', 'selling_price', 'expiry_date', 'is_active')
+    list_select_related = ('product', 'supplier')
+    list_filter = ('is_active', 'expiry_bucket')
+    search_fields = ('batch_number__exact', '^product__name')
+    date_hierarchy = 'purchase_date'
+    autocomplete_fields = ('product', 'supplier', 'created_by')
+    actions = ['deactivate_batches', 'activate_batches']
+
+    def _set_active(self, request, queryset, active):
+        with transaction.atomic():
+            product_ids = set(queryset.values_list('product_id', flat=True))
+            updated = queryset.update(is_active=active, last_modified=timezone.now())
+            stock.after_bulk_change(product_ids)
+        self.message_user(request, f"{'Activated' if active else 'Deactivated'} {updated} batch(es).")
 
-from .models import Bill
+    @admin.action(description="Deactivate selected batches")
+    def deactivate_batches(self, request, queryset):
+        self._set_active(request, queryset, False)
+
+    @admin.action(description="Activate selected batches")
+    def activate_batches(self, request, queryset):
+        self._set_active(request, queryset, True)
+
+    def delete_queryset(self, request, queryset):
+        # One at a time, so each deleted batch posts its stock movement.
+        with transaction.atomic():
+            for batch in queryset:
+                batch.delete()
 
 @admin.register(Bill)
-class BillAdmin(admin.ModelAdmin):
-    list_display = ('id', 'customer', 'total', 'payment_method')
+class BillAdmin(LargeTableAdmin):
+    list_display = ('id', 'customer', 'date', 'total', 'payment_method')
+    list_select_related = ('customer',)
+    list_filter = ('payment_method',)
+    search_fields = ('id__exact', '^customer__phone')
+    date_hierarchy = 'date'
+    autocomplete_fields = ('customer', 'products', 'created_by')
+
+@admin.register(Sale)
+class SaleAdmin(LargeTableAdmin):
+    list_display = ('date', 'product', 'quantity', 'price', 'total', 'created_by')
+    list_select_related = ('product', 'created_by')
+    search_fields = ('^product__name',)
+    date_hierarchy = 'date'
+    autocomplete_fields = ('product', 'created_by')
+
+@admin.register(Purchase)
+class PurchaseAdmin(LargeTableAdmin):
+    list_display = ('customer', 'product_type', 'date_of_purchase', 'lens_type', 'frame_model', 'lens_price', 'frame_price')
+    list_select_related = ('customer',)
+    search_fields = ('^customer__phone', 'lens_type__exact', '^frame_model')
+    date_hierarchy = 'date_of_purchase'
+    autocomplete_fields = ('customer',)
+
+@admin.register(Prescription)
+class PrescriptionAdmin(LargeTableAdmin):
+    list_display = ('customer', 'date', 'sph_left', 'sph_right')
+    list_select_related = ('customer',)
+    search_fields = ('^customer__phone',)
+    date_hierarchy = 'date'
+    autocomplete_fields = ('customer',)
+
+@admin.register(CustomerHistory)
+class CustomerHistoryAdmin(LargeTableAdmin):
+    list_display = ('customer', 'date', 'description')
+    list_select_related = ('customer',)
+    search_fields = ('^customer__phone',)
+    date_hierarchy = 'date'
+    autocomplete_fields = ('customer',)
+
+@admin.register(SupplierLedgerEntry)
+class SupplierLedgerEntryAdmin(LargeTableAdmin):
+    list_display = ('date', 'supplier', 'entry_type', 'reference', 'amount')
+    list_select_related = ('supplier',)
+    list_filter = ('entry_type',)
+    search_fields = ('reference__exact', '^supplier__name')
+    date_hierarchy = 'date'
+    autocomplete_fields = ('supplier', 'created_by')
+    raw_id_fields = ('inventory',)
+
+class PurchaseOrderLineInline(admin.TabularInline):
+    model = PurchaseOrderLine
+    autocomplete_fields = ('product',)
+    readonly_fields = ('quantity_received',)
+    extra = 5
+
+@admin.register(PurchaseOrder)
+class PurchaseOrderAdmin(LargeTableAdmin):
+    list_display = ('number', 'supplier', 'status', 'order_date', 'expected_date')
+    list_select_related = ('supplier',)
+    list_filter = ('status',)
+    search_fields = ('id__exact', '^supplier__name')
+    date_hierarchy = 'order_date'
+    autocomplete_fields = ('supplier', 'created_by')
+    inlines = [PurchaseOrderLineInline]
+
+@admin.register(GoodsReceipt)
+class GoodsReceiptAdmin(LargeTableAdmin):
+    list_display = ('number', 'supplier', 'purchase_order', 'received_date', 'reference')
+    list_select_related = ('supplier', 'purchase_order')
+    search_fields = ('id__exact', 'reference__exact', '^supplier__name')
+    date_hierarchy = 'received_date'
+    autocomplete_fields = ('supplier', 'created_by')
+    raw_id_fields = ('purchase_order', 'ledger_entry')
+
+@admin.register(StockTake)
+class StockTakeAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'started_at', 'applied_at', 'created_by')
+    list_select_related = ('created_by',)
+    list_filter = ('status',)
+    # Counts are applied from the stock take page, which adjusts the batches.
+    readonly_fields = ('status', 'applied_at')
+    actions = ['cancel_stock_takes']
+
+    @admin.action(description="Cancel selected stock takes that are still counting")
+    def cancel_stock_takes(self, request, queryset):
+        cancelled = queryset.filter(status=StockTake.Status.OPEN).update(status=StockTake.Status.CANCELLED)
+        self.message_user(request, f"Cancelled {cancelled} stock take(s).")
 
-admin.site.register(Purchase)
-admin.site.register(Prescription)
-admin.site.register(CustomerHistory)
 admin.site.register(ProductCategory)
-admin.site.register(Sale)
\ No newline at end of file
+admin.site.register(SyncPeer)
+
+
+@admin.register(ParkedChange)
+class ParkedChangeAdmin(admin.ModelAdmin):
+    list_display = ('origin', 'origin_seq', 'error', 'parked_at')
+    list_filter = ('origin',)
+    # Parked changes are retried by every sync; deleting one drops that change for good.
+    readonly_fields = ('origin', 'origin_seq', 'change', 'error', 'parked_at')
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(StockMovement)
+class StockMovementAdmin(LargeTableAdmin):
+    list_display = ('occurred_at', 'product', 'kind', 'quantity', 'unit_cost', 'reference', 'created_by')
+    list_select_related = ('product', 'created_by')
+    list_filter = ('kind',)
+    search_fields = ('^product__name', 'reference__exact')
+    date_hierarchy = 'occurred_at'
+
+    # The ledger is append-only; corrections are posted as new movements.
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(StockSnapshot)
+class StockSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('taken_at', 'products', 'units', 'value', 'last_movement_id')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(PriceHistory)
+class PriceHistoryAdmin(LargeTableAdmin):
+    list_display = ('effective_at', 'product', 'previous_price', 'price', 'previous_mrp', 'mrp', 'reason', 'created_by')
+    list_select_related = ('product', 'created_by')
+    search_fields = ('^product__name', 'product__sku__exact')
+    date_hierarchy = 'effective_at'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,169 @@
+"""
+Inventory expiry and batch ageing.
+
+Each active batch with an expiry date carries an ``expiry_bucket``. Buckets
+are half-open ranges of days-to-expiry, so between two runs a batch can only
+change bucket if its expiry date lies in ``[last_run + threshold, today + threshold)``
+for one of the thresholds below. The job therefore only touches those batches
+through the ``(is_active, expiry_date)`` index, plus batches edited since the
+last run through the ``last_modified`` index, instead of rescanning the whole
+table. Running as of a date before the last run's falls back to a full pass.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, ExpressionWrapper, F, Q, Sum, Value, When
+from django.utils import timezone
+
+from .models import Inventory, InventoryAgeingRun
+
+Bucket = Inventory.ExpiryBucket
+
+# (bucket, days-to-expiry upper bound, exclusive), checked in order.
+EXPIRY_THRESHOLDS = [
+    (Bucket.EXPIRED, 0),
+    (Bucket.CRITICAL, 31),
+    (Bucket.NEAR, 91),
+]
+
+# Suggested discount on the selling price per bucket; expired stock is written off.
+MARKDOWNS = {
+    Bucket.CRITICAL: Decimal('30'),
+    Bucket.NEAR: Decimal('10'),
+}
+
+# (label, days since purchase upper bound, exclusive); older stock falls in the last bucket.
+AGE_BUCKETS = [
+    ('0-90 days', 91),
+    ('91-180 days', 181),
+    ('181-365 days', 366),
+]
+AGE_OVERFLOW = 'Over a year'
+
+
+def expiry_bucket_for(expiry_date, as_of):
+    if expiry_date is None:
+        return None
+    days = (expiry_date - as_of).days
+    for bucket, threshold in EXPIRY_THRESHOLDS:
+        if days < threshold:
+            return bucket
+    return Bucket.OK
+
+
+def _crossing_batches(last_run, as_of):
+    """Batches whose bucket may have changed since ``last_run``."""
+    if last_run is None or as_of < last_run.as_of:
+        return Inventory.objects.all()
+
+    # One flat OR of indexable terms, so SQLite serves each from its index.
+    # Value(True) keeps "is_active = 1": the bare column test Django writes
+    # for is_active=True cannot seek the (is_active, expiry_date) index.
+    candidates = Q(last_modified__gte=last_run.run_at)
+    for _, threshold in EXPIRY_THRESHOLDS:
+        candidates |= Q(
+            is_active=Value(True),
+            expiry_date__gte=last_run.as_of + timedelta(days=threshold),
+            expiry_date__lt=as_of + timedelta(days=threshold),
+        )
+    return Inventory.objects.filter(candidates)
+
+
+def run_ageing(as_of=None, full=False):
+    """
+    Recompute ``expiry_bucket`` for batches that crossed a boundary since the
+    previous run (or all batches when ``full`` is set, no run exists yet or
+    ``as_of`` is before the previous run's).
+    Returns the ``InventoryAgeingRun`` recorded for this pass.
+    """
+    as_of = as_of or timezone.localdate()
+    started = timezone.now()
+    last_run = None if full else InventoryAgeingRun.objects.first()
+
+    candidates = _crossing_batches(last_run, as_of).values_list(
+        'id', 'is_active', 'expiry_date', 'expiry_bucket'
+    )
+    changes = {}
+    checked = 0
+    for pk, is_active, expiry_date, current in candidates.iterator():
+        checked += 1
+        bucket = expiry_bucket_for(expiry_date, as_of) if is_active else None
+        if bucket != current:
+            changes.setdefault(bucket, []).append(pk)
+
+    with transaction.atomic():
+        # QuerySet.update() leaves last_modified untouched, so this pass does
+        # not make the same batches candidates again on the next run.
+        for bucket, ids in changes.items():
+            Inventory.objects.filter(pk__in=ids).update(expiry_bucket=bucket)
+        return InventoryAgeingRun.objects.create(
+            run_at=started,
+            as_of=as_of,
+            batches_checked=checked,
+            batches_updated=sum(len(ids) for ids in changes.values()),
+        )
+
+
+def ageing_summary(as_of=None):
+    """Stock quantity and value per expiry bucket and per age bucket, one query each."""
+    as_of = as_of or timezone.localdate()
+    active = Inventory.objects.filter(is_active=True, quantity__gt=0)
+    value = ExpressionWrapper(F('quantity') * F('selling_price'), output_field=DecimalField())
+
+    by_expiry = {
+        row['expiry_bucket']: row
+        for row in active.values('expiry_bucket').annotate(
+            batches=Count('id'), units=Sum('quantity'), stock_value=Sum(value)
+        ).order_by()
+    }
+
+    age_bucket = Case(
+        *[
+            When(purchase_date__gt=as_of - timedelta(days=limit), then=Value(label))
+            for label, limit in AGE_BUCKETS
+        ],
+        default=Value(AGE_OVERFLOW),
+    )
+    by_age = {
+        row['age']: row
+        for row in active.annotate(age=age_bucket).values('age').annotate(
+            batches=Count('id'), units=Sum('quantity'), stock_value=Sum(value)
+        ).order_by()
+    }
+
+    empty = {'batches': 0, 'units': 0, 'stock_value': 0}
+    return {
+        'expiry': [
+            {'bucket': label, **{k: by_expiry.get(bucket, empty)[k] for k in empty}}
+            for bucket, label in Bucket.choices
+        ],
+        'age': [
+            {'bucket': label, **{k: by_age.get(label, empty)[k] for k in empty}}
+            for label in [label for label, _ in AGE_BUCKETS] + [AGE_OVERFLOW]
+        ],
+    }
+
+
+def markdown_proposals(as_of=None):
+    """Near-expiry batches with a suggested marked-down selling price, soonest first."""
+    as_of = as_of or timezone.localdate()
+    batches = Inventory.objects.filter(
+        is_active=True,
+        quantity__gt=0,
+        expiry_bucket__in=[Bucket.EXPIRED, Bucket.CRITICAL, Bucket.NEAR],
+    ).select_related('product', 'supplier').order_by('expiry_date')
+
+    proposals = []
+    for batch in batches:
+        percentage = MARKDOWNS.get(batch.expiry_bucket)
+        proposals.append({
+            'batch': batch,
+            'days_to_expiry': (batch.expiry_date - as_of).days,
+            'markdown_percentage': percentage,
+            'proposed_price': (
+                (batch.selling_price * (100 - percentage) / 100).quantize(Decimal('0.01'))
+                if percentage is not None else None
+            ),
+        })
+    return proposals
@@ -0,0 +1,233 @@
+"""
+Vectorised sales analytics.
+
+Sales are pulled once as columnar arrays (``values_list`` into NumPy) and every
+aggregate below is computed with ``np.unique``/``np.bincount`` over those
+arrays rather than by iterating model instances. The loaded columns and
+the results for each period are cached per user and filter, keyed on a
+fingerprint of the sales table so new or edited sales invalidate them
+automatically; switching between daily/weekly/monthly views reuses the columns.
+Archived sales (see ``customers.archive``) are appended when the report range
+reaches back into closed financial years. Purchase revenue is summed in SQL
+over the typed lens/frame price columns.
+"""
+import hashlib
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Count, FloatField, Max, Sum
+from django.db.models.functions import Cast
+
+from .models import Bill, Product, ProductCategory, Purchase
+
+PERIODS = ('day', 'week', 'month')
+CACHE_TIMEOUT = 60 * 60
+
+
+def load_sales(queryset, category_field='product__category_id'):
+    """Return the columns of ``queryset`` needed for analytics as NumPy arrays."""
+    # Casting in SQL skips building a Decimal per row, which dominates load time.
+    rows = list(queryset.annotate(total_float=Cast('total', FloatField())).values_list(
+        'date', 'product_id', category_field, 'quantity', 'total_float'
+    ).order_by())
+    if not rows:
+        return {
+            'date': np.array([], dtype='datetime64[D]'),
+            'product': np.array([], dtype=np.int64),
+            'category': np.array([], dtype=np.int64),
+            'quantity': np.array([], dtype=np.int64),
+            'total': np.array([], dtype=np.float64),
+        }
+    dates, products, categories, quantities, totals = zip(*rows)
+    return {
+        'date': np.array(dates, dtype='datetime64[D]'),
+        'product': np.array([p if p is not None else -1 for p in products], dtype=np.int64),
+        # Uncategorised products are grouped under -1.
+        'category': np.array([c if c is not None else -1 for c in categories], dtype=np.int64),
+        'quantity': np.array(quantities, dtype=np.int64),
+        'total': np.array(totals, dtype=np.float64),
+    }
+
+
+def concat_columns(*columns):
+    return {name: np.concatenate([c[name] for c in columns]) for name in columns[0]}
+
+
+def bucket_dates(dates, period):
+    """Truncate ``datetime64[D]`` values to the start of their day, ISO week or month."""
+    if period == 'day':
+        return dates
+    if period == 'week':
+        # 1970-01-01 was a Thursday; shift so buckets start on Monday.
+        offset = (dates.astype(np.int64) + 3) % 7
+        return dates - offset.astype('timedelta64[D]')
+    if period == 'month':
+        return dates.astype('datetime64[M]')
+    raise ValueError(f"Unknown period '{period}'")
+
+
+def revenue_series(dates, totals, period):
+    """
+    Revenue per bucket over a continuous range, so gaps (days with no sales)
+    show up as zeros instead of being skipped by charts and moving averages.
+    """
+    if not len(dates):
+        return np.array([], dtype='datetime64[D]'), np.array([], dtype=np.float64)
+    keys = bucket_dates(dates, period)
+    unique, inverse = np.unique(keys, return_inverse=True)
+    sums = np.bincount(inverse, weights=totals)
+
+    step = 7 if period == 'week' else 1
+    buckets = np.arange(unique[0], unique[-1] + step, step)
+    revenue = np.zeros(len(buckets))
+    revenue[np.searchsorted(buckets, unique)] = sums
+    return buckets, revenue
+
+
+def moving_average(values, window):
+    """Trailing moving average; the first ``window - 1`` points average what is available."""
+    if not len(values):
+        return values
+    cumulative = np.cumsum(np.insert(values, 0, 0.0))
+    counts = np.minimum(np.arange(1, len(values) + 1), window)
+    ends = np.arange(1, len(values) + 1)
+    return (cumulative[ends] - cumulative[ends - counts]) / counts
+
+
+def top_n(keys, weights, n):
+    """Return ``[(key, total), ...]`` for the ``n`` keys with the highest summed weight."""
+    if not len(keys):
+        return []
+    unique, inverse = np.unique(keys, return_inverse=True)
+    sums = np.bincount(inverse, weights=weights)
+    order = np.argsort(-sums, kind='stable')[:n]
+    return [(int(unique[i]), float(sums[i])) for i in order]
+
+
+def year_over_year(dates, totals):
+    """Monthly revenue alongside the same month one year earlier."""
+    months, revenue = revenue_series(dates, totals, 'month')
+    if not len(months):
+        return []
+    previous = months - np.timedelta64(12, 'M')
+    index = np.searchsorted(months, previous)
+    found = (index < len(months)) & (months[np.minimum(index, len(months) - 1)] == previous)
+    last_year = np.where(found, revenue[np.minimum(index, len(months) - 1)], np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change = np.where(found & (last_year > 0), (revenue - last_year) / last_year * 100, np.nan)
+    return [
+        {
+            'month': str(month),
+            'revenue': round(float(value), 2),
+            'previous_year': None if np.isnan(prev) else round(float(prev), 2),
+            'change_pct': None if np.isnan(pct) else round(float(pct), 1),
+        }
+        for month, value, prev, pct in zip(months, revenue, last_year, change)
+    ]
+
+
+def basket_sizes(bills, archived_bills=None):
+    """Products per bill for ``bills``, from the many-to-many table in one query."""
+    bill_ids = np.array(list(
+        Bill.products.through.objects.filter(bill__in=bills).values_list('bill_id', flat=True)
+    ), dtype=np.int64)
+    _, counts = np.unique(bill_ids, return_counts=True)
+    if archived_bills is not None:
+        archived = [len(ids) for ids in archived_bills.values_list('product_ids', flat=True) if ids]
+        counts = np.concatenate([counts, np.array(archived, dtype=np.int64)])
+    if not len(counts):
+        return {'bills': 0, 'average': 0.0, 'median': 0.0, 'max': 0}
+    return {
+        'bills': int(len(counts)),
+        'average': round(float(counts.mean()), 2),
+        'median': float(np.median(counts)),
+        'max': int(counts.max()),
+    }
+
+
+def purchase_revenue(purchases):
+    """Lens and frame revenue of ``purchases``, summed in the database, with a per-lens-type split."""
+    revenue = Purchase.revenue_expression()
+    totals = purchases.aggregate(
+        count=Count('pk'), lenses=Sum('lens_price'), frames=Sum('frame_price'), total=Sum(revenue),
+    )
+    by_lens_type = (
+        purchases.exclude(lens_type=None).values('lens_type')
+        .annotate(count=Count('pk'), revenue=Sum(revenue)).order_by('-revenue')
+    )
+    return {
+        'count': totals['count'],
+        'lenses': totals['lenses'] or 0,
+        'frames': totals['frames'] or 0,
+        'total': totals['total'] or 0,
+        'by_lens_type': list(by_lens_type),
+    }
+
+
+def _fingerprint(queryset, modified='updated_at'):
+    # Archived rows are never edited, so count and last id are enough for them.
+    latest = {'latest': Max(modified)} if modified else {}
+    state = queryset.aggregate(count=Count('pk'), last_id=Max('pk'), **latest)
+    return f"{state.get('latest')}|{state['count']}|{state['last_id']}"
+
+
+def summarize(user, sales, bills, period='day', window=7, top=10, cache_key='',
+              archived_sales=None, archived_bills=None):
+    """
+    Build the pre-aggregated analytics payload for ``sales``/``bills`` (already
+    filtered to the user and date range). ``cache_key`` distinguishes filter
+    combinations and must not include the period; the table fingerprint is
+    appended so stale entries are never served. ``archived_sales`` and
+    ``archived_bills`` (from ``customers.archive``) are added in when given.
+    """
+    if period not in PERIODS:
+        raise ValueError(f"Unknown period '{period}'")
+
+    base_key = f"{user.pk}|{cache_key}|{_fingerprint(sales)}|{_fingerprint(bills)}"
+    if archived_sales is not None:
+        base_key += f"|{_fingerprint(archived_sales, None)}"
+    if archived_bills is not None:
+        base_key += f"|{_fingerprint(archived_bills, None)}"
+    key = 'sales-analytics:' + hashlib.md5(f"{base_key}|{period}|{window}|{top}".encode()).hexdigest()
+    result = cache.get(key)
+    if result is not None:
+        return result
+
+    data_key = 'sales-columns:' + hashlib.md5(base_key.encode()).hexdigest()
+    data = cache.get(data_key)
+    if data is None:
+        data = load_sales(sales)
+        if archived_sales is not None:
+            data = concat_columns(load_sales(archived_sales, 'category_id'), data)
+        cache.set(data_key, data, CACHE_TIMEOUT)
+    buckets, revenue = revenue_series(data['date'], data['total'], period)
+    averages = moving_average(revenue, window)
+
+    top_products = top_n(data['product'], data['total'], top)
+    top_categories = top_n(data['category'], data['total'], top)
+    product_names = Product.objects.in_bulk([pk for pk, _ in top_products])
+    category_names = ProductCategory.objects.in_bulk([pk for pk, _ in top_categories if pk != -1])
+
+    result = {
+        'period': period,
+        'total_revenue': round(float(data['total'].sum()), 2),
+        'units_sold': int(data['quantity'].sum()),
+        'sale_count': int(len(data['total'])),
+        'series': {
+            'labels': [str(b) for b in buckets],
+            'revenue': [round(float(v), 2) for v in revenue],
+            'moving_average': [round(float(v), 2) for v in averages],
+        },
+        'top_products': [
+            {'id': pk, 'name': str(product_names[pk]) if pk in product_names else str(pk), 'revenue': round(total, 2)}
+            for pk, total in top_products
+        ],
+        'top_categories': [
+            {'id': pk, 'name': category_names[pk].name if pk in category_names else 'Uncategorised', 'revenue': round(total, 2)}
+            for pk, total in top_categories
+        ],
+        'basket': basket_sizes(bills, archived_bills),
+        'year_over_year': year_over_year(data['date'], data['total']),
+    }
+    cache.set(key, result, CACHE_TIMEOUT)
+    return result
@@ -0,0 +1,310 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Max, Q
+from django.http import JsonResponse, Http404
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_datetime
+from django.utils.crypto import constant_time_compare
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.gzip import gzip_page
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import require_GET, require_http_methods
+
+from . import replication
+from .models import Customer, Prescription, Purchase, Inventory, Sale, Bill, Product, Supplier
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Each resource declares the model, the fields a client may project, how rows
+# are scoped to the logged-in user and which timestamp drives ETag/Last-Modified.
+API_RESOURCES = {
+    'customers': {
+        'model': Customer,
+        'fields': [
+            'id', 'first_name', 'last_name', 'email', 'phone', 'address',
+            'date_of_birth', 'gender', 'prescription_date', 'additional_info',
+            'latest_prescription_id', 'created_at', 'updated_at',
+        ],
+        'scoped': True,
+        'modified': 'updated_at',
+    },
+    'prescriptions': {
+        'model': Prescription,
+        'fields': [
+            'id', 'customer_id', 'date',
+            'sph_left', 'sph_right', 'cyl_left', 'cyl_right',
+            'axis_left', 'axis_right', 'add_left', 'add_right',
+            'vision_left', 'vision_right', 'updated_at',
+        ],
+        'scoped': True,
+        'modified': 'updated_at',
+    },
+    'purchases': {
+        'model': Purchase,
+        'fields': [
+            'id', 'customer_id', 'product_type', 'details', 'date_of_purchase',
+            'lens_price', 'frame_price', 'lens_type', 'frame_model', 'updated_at',
+        ],
+        'scoped': True,
+        'modified': 'updated_at',
+    },
+    'inventory': {
+        'model': Inventory,
+        'fields': [
+            'id', 'product_id', 'supplier_id', 'batch_number', 'quantity',
+            'purchase_price', 'selling_price', 'purchase_date', 'expiry_date',
+            'mfg_date', 'is_active', 'last_modified',
+        ],
+        'scoped': False,
+        'modified': 'last_modified',
+    },
+    'sales': {
+        'model': Sale,
+        'fields': ['id', 'date', 'product_id', 'quantity', 'price', 'total', 'updated_at'],
+        'scoped': True,
+        'modified': 'updated_at',
+    },
+    'bills': {
+        'model': Bill,
+        'fields': ['id', 'customer_id', 'date', 'discount', 'total', 'payment_method', 'updated_at'],
+        'scoped': True,
+        'modified': 'updated_at',
+    },
+}
+
+
+# Prefix-search endpoints behind the autocomplete widgets in customers.widgets.
+# Every search field is the leading column of an index (see the model Meta).
+AUTOCOMPLETE_RESOURCES = {
+    'customers': {
+        'model': Customer,
+        'scoped': True,
+        'search': ['phone', 'first_name', 'last_name'],
+        'fields': ['id', 'first_name', 'last_name', 'phone'],
+        'order': ['first_name', 'last_name', 'id'],
+        'text': lambda row: f"{' '.join(filter(None, [row['first_name'], row['last_name']]))} ({row['phone'] or '-'})",
+    },
+    'products': {
+        'model': Product,
+        'scoped': False,
+        'search': ['name', 'brand', 'sku', 'barcode'],
+        'fields': ['id', 'name', 'brand', 'price'],
+        'order': ['name', 'id'],
+        'text': lambda row: f"{row['name']} ({row['brand']}) - {row['price']}",
+    },
+    'suppliers': {
+        'model': Supplier,
+        'scoped': False,
+        'search': ['name'],
+        'fields': ['id', 'name'],
+        'order': ['name', 'id'],
+        'text': lambda row: row['name'],
+    },
+}
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 25
+AUTOCOMPLETE_MAX_AGE = 60
+
+
+class ApiError(Exception):
+    pass
+
+
+def _get_resource(name):
+    try:
+        return API_RESOURCES[name]
+    except KeyError:
+        raise Http404(f"Unknown resource '{name}'")
+
+
+def _scoped_queryset(resource, user):
+    if resource['scoped']:
+        return resource['model'].objects.for_user(user)
+    return resource['model'].objects.all()
+
+
+def _projection(resource, raw):
+    """Translate ``fields=a,b,c`` into a validated list of columns."""
+    if not raw:
+        return list(resource['fields'])
+    fields = [f.strip() for f in raw.split(',') if f.strip()]
+    unknown = [f for f in fields if f not in resource['fields']]
+    if unknown:
+        raise ApiError(f"Unknown field(s): {', '.join(unknown)}")
+    # The primary key is always returned so clients can page and refetch rows.
+    if 'id' not in fields:
+        fields.insert(0, 'id')
+    return fields
+
+
+def _int_param(request, name, default=None):
+    value = request.GET.get(name)
+    if value in (None, ''):
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ApiError(f"'{name}' must be an integer")
+
+
+def _conditional(request, queryset, resource, variant):
+    """
+    Compute ETag/Last-Modified from one aggregate over the scoped rows.
+    Returns ``(not_modified_response_or_None, headers, row_count)``.
+    """
+    state = queryset.aggregate(latest=Max(resource['modified']), count=Count('pk'), last_id=Max('pk'))
+    latest = state['latest']
+    fingerprint = f"{latest and latest.isoformat()}|{state['count']}|{state['last_id']}|{variant}"
+    etag = quote_etag(hashlib.md5(fingerprint.encode()).hexdigest())
+    last_modified = int(latest.timestamp()) if latest else None
+
+    headers = {'ETag': etag}
+    if last_modified is not None:
+        headers['Last-Modified'] = http_date(last_modified)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        for key, value in headers.items():
+            response[key] = value
+    return response, headers, state['count']
+
+
+def _json(data, headers=None, status=200):
+    response = JsonResponse(data, encoder=DjangoJSONEncoder, status=status)
+    for key, value in (headers or {}).items():
+        response[key] = value
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+# ======================
+# API Views
+# ======================
+@gzip_page
+@require_GET
+@login_required
+def api_list(request, resource):
+    """
+    Keyset-paginated list: ``?fields=id,phone&after=<id>&limit=<n>&since=<iso>``.
+    ``since`` returns only rows modified after the given timestamp.
+    """
+    config = _get_resource(resource)
+    try:
+        fields = _projection(config, request.GET.get('fields'))
+        after = _int_param(request, 'after')
+        limit = min(_int_param(request, 'limit', DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE)
+    except ApiError as e:
+        return _json({'error': str(e)}, status=400)
+    if limit < 1:
+        return _json({'error': "'limit' must be positive"}, status=400)
+
+    queryset = _scoped_queryset(config, request.user)
+    since = request.GET.get('since')
+    if since:
+        since = parse_datetime(since)
+        if since is None:
+            return _json({'error': "'since' must be an ISO 8601 datetime"}, status=400)
+        queryset = queryset.filter(**{f"{config['modified']}__gt": since})
+
+    not_modified, headers, _ = _conditional(
+        request, queryset, config, f"{','.join(fields)}|{after}|{limit}|{since}"
+    )
+    if not_modified is not None:
+        return not_modified
+
+    page = queryset.order_by('pk')
+    if after is not None:
+        page = page.filter(pk__gt=after)
+    rows = list(page.values(*fields)[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return _json({
+        'results': rows,
+        'next': rows[-1]['id'] if has_more else None,
+    }, headers)
+
+
+@gzip_page
+@require_GET
+@login_required
+def api_detail(request, resource, pk):
+    config = _get_resource(resource)
+    try:
+        fields = _projection(config, request.GET.get('fields'))
+    except ApiError as e:
+        return _json({'error': str(e)}, status=400)
+
+    queryset = _scoped_queryset(config, request.user).filter(pk=pk)
+    not_modified, headers, count = _conditional(request, queryset, config, ','.join(fields))
+    if not count:
+        raise Http404("Not found")
+    if not_modified is not None:
+        return not_modified
+
+    return _json(queryset.values(*fields).get(), headers)
+
+
+@gzip_page
+@require_GET
+@login_required
+def autocomplete(request, resource):
+    """Prefix search: ``?q=<term>&limit=<n>`` returns ``{"results": [{"id", "text"}]}``."""
+    try:
+        config = AUTOCOMPLETE_RESOURCES[resource]
+    except KeyError:
+        raise Http404(f"Unknown resource '{resource}'")
+    try:
+        limit = min(_int_param(request, 'limit', AUTOCOMPLETE_LIMIT), AUTOCOMPLETE_MAX_LIMIT)
+    except ApiError as e:
+        return _json({'error': str(e)}, status=400)
+
+    term = request.GET.get('q', '').strip()
+    results = []
+    if term:
+        queryset = config['model'].objects
+        queryset = queryset.for_user(request.user) if config['scoped'] else queryset.all()
+        match = Q()
+        for field in config['search']:
+            match |= Q(**{f'{field}__istartswith': term})
+        rows = queryset.filter(match).order_by(*config['order']).values(*config['fields'])[:max(limit, 1)]
+        results = [{'id': row['id'], 'text': config['text'](row)} for row in rows]
+
+    response = JsonResponse({'results': results}, encoder=DjangoJSONEncoder)
+    # Repeated keystrokes for the same prefix are answered by the browser cache.
+    patch_cache_control(response, private=True, max_age=AUTOCOMPLETE_MAX_AGE)
+    patch_vary_headers(response, ['Cookie'])
+    return response
+
+
+@csrf_exempt
+@gzip_page
+@require_http_methods(['GET', 'POST'])
+def sync_changes(request):
+    """
+    Branch-to-branch replication, authenticated by the shared ``X-Sync-Token``.
+    GET ``?since=<seq>&branch=<requesting branch>`` returns our changes after
+    ``since``; POST applies a batch of changes pushed by another branch.
+    """
+    token = settings.SYNC_TOKEN
+    if not token or not constant_time_compare(request.headers.get('X-Sync-Token', ''), token):
+        return _json({'error': 'Invalid sync token'}, status=403)
+
+    if request.method == 'POST':
+        try:
+            payload = json.loads(request.body)
+            counts = replication.apply_changes(payload)
+        except (ValueError, KeyError, TypeError) as e:
+            return _json({'error': f"Malformed change batch: {e}"}, status=400)
+        return _json(counts)
+
+    try:
+        since = _int_param(request, 'since', 0)
+    except ApiError as e:
+        return _json({'error': str(e)}, status=400)
+    return _json(replication.changes_since(since, exclude_origin=request.GET.get('branch')))
@@ -0,0 +1,197 @@
+"""
+Hot/cold archival of closed financial years.
+
+Sales, bills, purchases and customer history dated before the end of a closed
+financial year (April-March) are copied in batches into the ``archive``
+database and then deleted from the working tables, so day-to-day queries and
+indexes only cover recent data. Reports call ``archived_sales`` and friends,
+which return an empty queryset without touching the archive unless the
+requested range starts before the archive boundary.
+"""
+from datetime import date, datetime, time
+
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import (
+    ArchivedBill, ArchivedCustomerHistory, ArchivedFinancialYear, ArchivedPurchase,
+    ArchivedSale, Bill, CustomerHistory, Purchase, Sale,
+)
+from .routers import ARCHIVE_DB
+
+FY_START_MONTH = 4
+# Archived rows listed per page of a report.
+REPORT_PAGE_SIZE = 50
+
+
+def financial_year_of(day):
+    return day.year if day.month >= FY_START_MONTH else day.year - 1
+
+
+def financial_year_bounds(start_year):
+    """``[start, end)`` dates of the financial year starting in April of ``start_year``."""
+    return date(start_year, FY_START_MONTH, 1), date(start_year + 1, FY_START_MONTH, 1)
+
+
+def archive_boundary():
+    """
+    First date that is still in the working tables, or ``None`` if nothing is
+    archived. Read on every call (one lookup on the unique ``start_year``
+    index) so every process sees a year as soon as ``archive_year`` records it.
+    """
+    latest = ArchivedFinancialYear.objects.aggregate(latest=Max('start_year'))['latest']
+    return financial_year_bounds(latest)[1] if latest is not None else None
+
+
+def needs_archive(start_date):
+    """Whether a report starting at ``start_date`` (``None`` = all time) reaches archived data."""
+    boundary = archive_boundary()
+    return boundary is not None and (start_date is None or start_date < boundary)
+
+
+def _start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+# ======================
+# Moving rows
+# ======================
+def _archive_sale(sale):
+    category = sale.product.category if sale.product_id else None
+    return ArchivedSale(
+        original_id=sale.pk,
+        financial_year=financial_year_of(sale.date),
+        date=sale.date,
+        product_id=sale.product_id,
+        product_name=sale.product.name if sale.product_id else None,
+        category_id=category.pk if category else None,
+        category_name=category.name if category else None,
+        quantity=sale.quantity,
+        price=sale.price,
+        total=sale.total,
+        created_by_id=sale.created_by_id,
+    )
+
+
+def _archive_bill(bill):
+    customer = bill.customer
+    return ArchivedBill(
+        original_id=bill.pk,
+        financial_year=financial_year_of(timezone.localdate(bill.date)),
+        date=bill.date,
+        customer_id=bill.customer_id,
+        customer_name=' '.join(filter(None, [customer.first_name, customer.last_name])),
+        customer_user_id=customer.user_id,
+        product_ids=[product.pk for product in bill.products.all()],
+        discount=bill.discount,
+        total=bill.total,
+        payment_method=bill.payment_method,
+        created_by_id=bill.created_by_id,
+    )
+
+
+def _archive_purchase(purchase):
+    return ArchivedPurchase(
+        original_id=purchase.pk,
+        financial_year=financial_year_of(purchase.date_of_purchase),
+        customer_id=purchase.customer_id,
+        customer_user_id=purchase.customer.user_id if purchase.customer_id else None,
+        product_type=purchase.product_type,
+        details=purchase.details,
+        date_of_purchase=purchase.date_of_purchase,
+        lens_price=purchase.lens_price,
+        frame_price=purchase.frame_price,
+    )
+
+
+def _archive_history(entry):
+    return ArchivedCustomerHistory(
+        original_id=entry.pk,
+        financial_year=financial_year_of(timezone.localdate(entry.date)),
+        customer_id=entry.customer_id,
+        customer_user_id=entry.customer.user_id,
+        date=entry.date,
+        description=entry.description,
+        details=entry.details,
+    )
+
+
+def _move(queryset, convert, archive_model, batch_size):
+    """
+    Copy ``queryset`` into the archive in primary-key batches, deleting each
+    batch from the working table only after its copy is committed. Re-running
+    after an interruption is safe: already-copied rows are skipped by the
+    unique ``original_id``.
+    """
+    moved = 0
+    while True:
+        batch = list(queryset.order_by('pk')[:batch_size])
+        if not batch:
+            return moved
+        with transaction.atomic(using=ARCHIVE_DB):
+            archive_model.objects.bulk_create([convert(row) for row in batch], ignore_conflicts=True)
+        with transaction.atomic():
+            queryset.model.objects.filter(pk__in=[row.pk for row in batch]).delete()
+        moved += len(batch)
+
+
+def archive_through(start_year, batch_size=2000):
+    """
+    Archive everything dated before the end of financial year ``start_year``.
+    Only closed years can be archived. Returns the rows moved per table.
+    """
+    _, end = financial_year_bounds(start_year)
+    if end > timezone.localdate():
+        raise ValueError(f"Financial year {start_year}-{start_year + 1} is not closed yet.")
+
+    counts = {
+        'sales': _move(
+            Sale.objects.filter(date__lt=end).select_related('product__category'),
+            _archive_sale, ArchivedSale, batch_size,
+        ),
+        'bills': _move(
+            Bill.objects.filter(date__lt=_start_of_day(end)).select_related('customer').prefetch_related('products'),
+            _archive_bill, ArchivedBill, batch_size,
+        ),
+        'purchases': _move(
+            Purchase.objects.filter(date_of_purchase__lt=end).select_related('customer'),
+            _archive_purchase, ArchivedPurchase, batch_size,
+        ),
+        'history': _move(
+            CustomerHistory.objects.filter(date__lt=_start_of_day(end)).select_related('customer'),
+            _archive_history, ArchivedCustomerHistory, batch_size,
+        ),
+    }
+    ArchivedFinancialYear.objects.update_or_create(
+        start_year=start_year, defaults={'archived_at': timezone.now(), 'counts': counts}
+    )
+    return counts
+
+
+# ======================
+# Reading archived rows
+# ======================
+def archived_sales(user, start_date=None, end_date=None, category=None):
+    """Archived sales for a report range; empty (and free) when the range is all hot."""
+    if not needs_archive(start_date):
+        return ArchivedSale.objects.none()
+    sales = ArchivedSale.objects.for_user(user)
+    if start_date:
+        sales = sales.filter(date__gte=start_date)
+    if end_date:
+        sales = sales.filter(date__lte=end_date)
+    if category:
+        sales = sales.filter(category_id=category.pk)
+    return sales
+
+
+def archived_bills(user, start_date=None, end_date=None):
+    if not needs_archive(start_date):
+        return ArchivedBill.objects.none()
+    bills = ArchivedBill.objects.for_user(user)
+    if start_date:
+        bills = bills.filter(date__gte=_start_of_day(start_date))
+    if end_date:
+        bills = bills.filter(date__lt=_start_of_day(end_date) + timezone.timedelta(days=1))
+    return bills
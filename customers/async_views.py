@@ -0,0 +1,114 @@
+"""
+Async versions of the dashboard, sales report and scan lookup for ASGI.
+
+The independent queries behind each page run at the same time on a small
+pool of query threads instead of one after another, and the event loop is
+free to serve other requests while they run. Each pool thread keeps its own
+database connection open for the life of the process, since opening one per
+query would cost more than the queries on this app's small tables. That is up
+to ``QUERY_WORKERS`` extra connections per process, so these views are opt-in:
+``urls`` routes to them only when ``settings.ASYNC_VIEWS`` is set
+(``DJANGO_ASYNC_VIEWS=1`` under ASGI). The queries themselves are built by the
+same helpers in ``views`` that the synchronous views use.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.db import DatabaseError, connections
+from django.http import JsonResponse
+from django.shortcuts import render
+
+from . import analytics
+from .catalog import AmbiguousCode, catalog
+from .views import ambiguous_scan, archived_sales_page, dashboard_queries, sales_report_queries, sales_total
+
+
+QUERY_WORKERS = 4
+
+_query_pool = ThreadPoolExecutor(max_workers=QUERY_WORKERS, thread_name_prefix='async-views')
+
+
+def _query(func, *args):
+    """Run ``func(*args)`` on the query pool."""
+    def run():
+        try:
+            return func(*args)
+        except DatabaseError:
+            # Reconnect on the next query rather than reuse a broken connection.
+            connections.close_all()
+            raise
+    return sync_to_async(run, thread_sensitive=False, executor=_query_pool)()
+
+
+async def _render(request, template, context):
+    # Templates and context processors (``user``) may still touch the ORM, and
+    # rendering in the pool keeps it off the single thread-sensitive executor.
+    return await _query(render, request, template, context)
+
+
+# ======================
+# Dashboard
+# ======================
+@login_required
+async def dashboard(request):
+    customers, recent_sales, low_stock = dashboard_queries(await request.auser())
+    customer_count, recent_sales, low_stock = await asyncio.gather(
+        _query(customers.count),
+        _query(list, recent_sales),
+        _query(list, low_stock),
+    )
+
+    context = {
+        'customer_count': customer_count,
+        'recent_sales': recent_sales,
+        'low_stock': low_stock
+    }
+    return await _render(request, "dashboard.html", context)
+
+
+# ======================
+# Sales & Reporting
+# ======================
+@login_required
+async def sales_report(request):
+    user = await request.auser()
+    # Validating the filters can read categories, so it runs on the pool too.
+    form, sales, archived_sales, purchases = await _query(sales_report_queries, request, user)
+    sales, total_sales, archived_sales, archived_total, purchase_revenue = await asyncio.gather(
+        _query(list, sales),
+        _query(sales_total, sales),
+        _query(archived_sales_page, archived_sales, request.GET.get('archived_page')),
+        _query(sales_total, archived_sales),
+        _query(analytics.purchase_revenue, purchases),
+    )
+
+    context = {
+        'sales': sales,
+        'archived_sales': archived_sales,
+        'form': form,
+        'total_sales': total_sales + archived_total,
+        'archived_total': archived_total,
+        'purchase_revenue': purchase_revenue,
+    }
+    return await _render(request, 'customers/sales_report.html', context)
+
+
+# ======================
+# Lookups
+# ======================
+@login_required
+async def scan_lookup(request):
+    code = request.GET.get('code', '').strip()
+    if not code:
+        return JsonResponse({'error': 'No code scanned.'}, status=400)
+
+    # Only the first lookup in a process touches the database (to warm the index).
+    try:
+        result = await _query(catalog.lookup, code)
+    except AmbiguousCode as exc:
+        return ambiguous_scan(exc)
+    if result is None:
+        return JsonResponse({'error': f'No product or batch found for {code}.'}, status=404)
+    return JsonResponse(result)
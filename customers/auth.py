@@ -0,0 +1,56 @@
+"""
+Authentication backend that keeps logged-in users in the cache.
+
+``AuthenticationMiddleware`` loads ``request.user`` through the backend's
+``get_user`` on every request; this backend answers it from the cache so an
+authenticated page costs no ``auth_user`` query. ``customers.signals`` drops the
+cached row whenever the user, their groups or their permissions change.
+Together with the cached sessions configured in settings, a logged-in GET makes
+no session or auth queries at all.
+
+The signals only reach this process's cache, so a password reset or
+deactivation made elsewhere (another worker, ``manage.py changepassword``, a
+raw update) is caught by a version check instead: once a cached user is older
+than ``AUTH_USER_RECHECK_INTERVAL`` seconds, one narrow query compares its
+password hash, active flag and last login with the database, and a stale row
+is reloaded. The reloaded password hash no longer matches the session's, so
+Django logs those sessions out.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend, UserModel
+from django.core.cache import cache
+
+VERSION_FIELDS = ('password', 'is_active', 'last_login')
+
+
+def _user_key(user_id):
+    return f'auth-user:{user_id}'
+
+
+def _version(user):
+    return tuple(getattr(user, field) for field in VERSION_FIELDS)
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        key = _user_key(user_id)
+        user, checked_at = cache.get(key) or (None, 0)
+        if user is not None and time.time() - checked_at >= settings.AUTH_USER_RECHECK_INTERVAL:
+            current = UserModel._default_manager.filter(pk=user_id).values_list(*VERSION_FIELDS).first()
+            if current != _version(user):
+                user = None
+            else:
+                cache.set(key, (user, time.time()), settings.AUTH_USER_CACHE_TIMEOUT)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                cache.delete(key)
+                return None
+            cache.set(key, (user, time.time()), settings.AUTH_USER_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
+
+
+def invalidate_user(user_id):
+    cache.delete(_user_key(user_id))
@@ -0,0 +1,322 @@
+"""
+Online, compressed database backups.
+
+SQLite databases are copied with SQLite's online backup API a few thousand
+pages at a time, sleeping between steps so the counter can keep committing
+while a backup runs. The copy is integrity-checked, gzipped and described in a
+JSON manifest (checksum, source signature, timings) next to it; a run is
+skipped when the source has not changed since the last backup. PostgreSQL
+databases are dumped with ``pg_dump`` in its compressed custom format.
+"""
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+import time
+import zlib
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+PAGES_PER_STEP = 1024
+STEP_SLEEP = 0.01  # seconds; lets writers in between steps
+# A write from another connection restarts a paged copy from the first page;
+# after this many restarts the rest is copied in one step instead.
+MAX_RESTARTS = 3
+CHUNK_SIZE = 1024 * 1024
+
+
+class BackupError(Exception):
+    pass
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def backup_dir():
+    path = Path(getattr(settings, 'BACKUP_DIR', settings.BASE_DIR / 'backups'))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _engine(alias):
+    engine = settings.DATABASES[alias]['ENGINE']
+    if engine.endswith('sqlite3'):
+        return 'sqlite'
+    if engine.endswith('postgresql'):
+        return 'postgresql'
+    raise BackupError(f"Backups are not supported for the '{engine}' engine.")
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _manifest_path(path):
+    return Path(f'{path}.json')
+
+
+def _read_manifest(path):
+    try:
+        return json.loads(_manifest_path(path).read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def list_backups(alias='default'):
+    """Backups of ``alias``, newest first."""
+    suffix = '.sqlite3.gz' if _engine(alias) == 'sqlite' else '.dump'
+    return sorted(backup_dir().glob(f'{alias}-*{suffix}'), reverse=True)
+
+
+# ======================
+# SQLite
+# ======================
+def _source_signature(path):
+    # The WAL file holds committed pages that are not in the main file yet.
+    parts = []
+    for name in (path, f'{path}-wal'):
+        if os.path.exists(name):
+            stat = os.stat(name)
+            parts.append(f'{stat.st_mtime_ns}:{stat.st_size}')
+    return '|'.join(parts)
+
+
+def _integrity_check(path):
+    db = sqlite3.connect(path)
+    try:
+        result = db.execute('PRAGMA integrity_check').fetchone()[0]
+    except sqlite3.DatabaseError as exc:
+        result = str(exc)
+    finally:
+        db.close()
+    if result != 'ok':
+        raise BackupError(f"Integrity check failed for {path}: {result}")
+
+
+def _online_copy(source_path, target_path):
+    """
+    Copy ``source_path`` to ``target_path`` page-wise, holding the read lock
+    only for one step at a time. If busy writers keep restarting the copy, it
+    is finished in a single step, which blocks writers only for as long as
+    reading the file takes. Returns the number of steps taken.
+    """
+    steps = 0
+    restarts = 0
+    last_remaining = None
+
+    def progress(status, remaining, total):
+        nonlocal steps, restarts, last_remaining
+        steps += 1
+        if last_remaining is not None and remaining >= last_remaining:
+            restarts += 1
+            if restarts >= MAX_RESTARTS:
+                raise _TooManyRestarts
+        last_remaining = remaining
+
+    source = sqlite3.connect(source_path, timeout=30)
+    target = sqlite3.connect(target_path)
+    try:
+        try:
+            source.backup(target, pages=PAGES_PER_STEP, progress=progress, sleep=STEP_SLEEP)
+        except _TooManyRestarts:
+            source.backup(target)
+            steps += 1
+    finally:
+        target.close()
+        source.close()
+    return steps
+
+
+def _backup_sqlite(alias, force):
+    source_path = str(settings.DATABASES[alias]['NAME'])
+    if not os.path.exists(source_path):
+        raise BackupError(f"Database file {source_path} does not exist.")
+    signature = _source_signature(source_path)
+    existing = list_backups(alias)
+    if existing and not force:
+        latest = _read_manifest(existing[0])
+        if latest and latest.get('source_signature') == signature:
+            return None
+
+    stamp = timezone.localtime().strftime('%Y%m%d-%H%M%S')
+    path = backup_dir() / f'{alias}-{stamp}.sqlite3.gz'
+    timings = {}
+    with tempfile.TemporaryDirectory(dir=backup_dir()) as tmp:
+        copy = os.path.join(tmp, 'copy.sqlite3')
+        started = time.perf_counter()
+        steps = _online_copy(source_path, copy)
+        timings['copy'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        _integrity_check(copy)
+        checksum = _sha256(copy)
+        timings['verify'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        partial = f'{path}.partial'
+        with open(copy, 'rb') as src, gzip.open(partial, 'wb', compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, CHUNK_SIZE)
+        os.replace(partial, path)
+        timings['compress'] = time.perf_counter() - started
+        raw_size = os.path.getsize(copy)
+
+    manifest = {
+        'database': alias,
+        'engine': 'sqlite',
+        'created_at': timezone.now().isoformat(),
+        'source_signature': signature,
+        'sha256': checksum,
+        'size': raw_size,
+        'compressed_size': path.stat().st_size,
+        'steps': steps,
+        'timings': {name: round(value, 3) for name, value in timings.items()},
+    }
+    _manifest_path(path).write_text(json.dumps(manifest, indent=2))
+    return path, manifest
+
+
+def _decompress(path, target):
+    try:
+        with gzip.open(path, 'rb') as src, open(target, 'wb') as dst:
+            shutil.copyfileobj(src, dst, CHUNK_SIZE)
+    except (OSError, EOFError, zlib.error) as exc:
+        raise BackupError(f"{path} is not a readable backup: {exc}")
+
+
+def _verify_sqlite(path, keep_copy_at=None):
+    manifest = _read_manifest(path) or {}
+    with tempfile.TemporaryDirectory(dir=backup_dir()) as tmp:
+        copy = keep_copy_at or os.path.join(tmp, 'verify.sqlite3')
+        _decompress(path, copy)
+        if manifest.get('sha256') and _sha256(copy) != manifest['sha256']:
+            raise BackupError(f"Checksum mismatch for {path}.")
+        _integrity_check(copy)
+
+
+def _restore_sqlite(path, alias):
+    target_path = str(settings.DATABASES[alias]['NAME'])
+    with tempfile.TemporaryDirectory(dir=backup_dir()) as tmp:
+        copy = os.path.join(tmp, 'restore.sqlite3')
+        _verify_sqlite(path, keep_copy_at=copy)
+        connections[alias].close()
+        source = sqlite3.connect(copy)
+        target = sqlite3.connect(target_path, timeout=30)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+
+
+# ======================
+# PostgreSQL
+# ======================
+def _pg_env(alias):
+    db = settings.DATABASES[alias]
+    env = dict(os.environ)
+    if db.get('PASSWORD'):
+        env['PGPASSWORD'] = db['PASSWORD']
+    args = []
+    for option, key in (('--host', 'HOST'), ('--port', 'PORT'), ('--username', 'USER')):
+        if db.get(key):
+            args += [option, str(db[key])]
+    return env, args + ['--dbname', db['NAME']]
+
+
+def _run(command, env):
+    result = subprocess.run(command, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise BackupError(f"{command[0]} failed: {result.stderr.strip()}")
+    return result.stdout
+
+
+def _backup_postgresql(alias, force):
+    env, args = _pg_env(alias)
+    stamp = timezone.localtime().strftime('%Y%m%d-%H%M%S')
+    path = backup_dir() / f'{alias}-{stamp}.dump'
+    timings = {}
+    started = time.perf_counter()
+    # The custom format is compressed and restorable table by table; pg_dump
+    # reads from one snapshot, so writers are never blocked.
+    _run(['pg_dump', '--format=custom', '--compress=6', '--file', str(path)] + args, env)
+    timings['copy'] = time.perf_counter() - started
+    started = time.perf_counter()
+    _run(['pg_restore', '--list', str(path)], env)
+    timings['verify'] = time.perf_counter() - started
+    manifest = {
+        'database': alias,
+        'engine': 'postgresql',
+        'created_at': timezone.now().isoformat(),
+        'sha256': _sha256(path),
+        'compressed_size': path.stat().st_size,
+        'timings': {name: round(value, 3) for name, value in timings.items()},
+    }
+    _manifest_path(path).write_text(json.dumps(manifest, indent=2))
+    return path, manifest
+
+
+# ======================
+# Public API
+# ======================
+def backup_database(alias='default', force=False):
+    """
+    Back up ``alias``. Returns ``(path, manifest)``, or ``None`` when a SQLite
+    database is unchanged since its latest backup (unless ``force``).
+    """
+    try:
+        if _engine(alias) == 'sqlite':
+            return _backup_sqlite(alias, force)
+        return _backup_postgresql(alias, force)
+    except (sqlite3.Error, OSError) as exc:
+        # A locked database or a full disk is a failed backup, not a crash of the scheduler.
+        raise BackupError(f"Backup of {alias} failed: {exc}") from exc
+
+
+def verify_backup(path):
+    """Raise ``BackupError`` unless ``path`` matches its checksum and restores cleanly."""
+    path = Path(path)
+    manifest = _read_manifest(path) or {}
+    if path.name.endswith('.sqlite3.gz'):
+        _verify_sqlite(path)
+    else:
+        if manifest.get('sha256') and _sha256(path) != manifest['sha256']:
+            raise BackupError(f"Checksum mismatch for {path}.")
+        env, _ = _pg_env(manifest.get('database', 'default'))
+        _run(['pg_restore', '--list', str(path)], env)
+
+
+def restore_backup(path, alias='default'):
+    """Verify ``path`` and restore it over ``alias``, taking a safety backup first."""
+    path = Path(path)
+    backup_database(alias, force=True)
+    if _engine(alias) == 'sqlite':
+        _restore_sqlite(path, alias)
+    else:
+        verify_backup(path)
+        env, args = _pg_env(alias)
+        connections[alias].close()
+        _run(['pg_restore', '--clean', '--if-exists', '--no-owner'] + args + [str(path)], env)
+
+
+def rotate_backups(alias='default', keep=None):
+    """Delete all but the newest ``keep`` backups of ``alias``; returns the removed paths."""
+    keep = keep if keep is not None else getattr(settings, 'BACKUP_KEEP', 14)
+    if keep < 1:
+        raise ValueError("At least one backup must be kept.")
+    removed = list_backups(alias)[keep:]
+    for path in removed:
+        path.unlink(missing_ok=True)
+        _manifest_path(path).unlink(missing_ok=True)
+    return removed
@@ -0,0 +1,152 @@
+"""
+Process-local catalog index for barcode/SKU/batch scans at the counter.
+
+The index maps every barcode, SKU and batch number to the products carrying
+it and keeps each product's active batch (first to expire, then oldest)
+alongside, so a scan is a dictionary lookup. Batch numbers are only unique per
+product, so a code can belong to several products: a barcode or SKU takes
+precedence over batch numbers, and a code still shared by more than one
+product raises ``AmbiguousCode`` rather than picking one. It is built once per process on first use (or at
+startup via ``warm()``), and ``Product``/``Inventory`` saves and deletes refresh
+only the affected product through the signals in ``customers.signals``.
+"""
+import threading
+
+from django.db import DatabaseError
+from django.db.models import F
+
+from .models import Inventory, Product
+
+PRODUCT_FIELDS = ('id', 'name', 'brand', 'model_number', 'sku', 'barcode', 'price', 'mrp', 'gst_percentage')
+BATCH_FIELDS = ('id', 'product_id', 'batch_number', 'quantity', 'selling_price', 'expiry_date')
+
+
+class AmbiguousCode(Exception):
+    """A scanned code that belongs to more than one product."""
+
+    def __init__(self, code, products):
+        super().__init__(f"{code} matches {len(products)} products.")
+        self.code = code
+        self.products = products
+
+
+def _add_code(codes, product_codes, code, product_id, batch=None):
+    # A product's own barcode or SKU (batch None) wins over its batch of the same number.
+    targets = codes.setdefault(code, {})
+    if batch is None or targets.get(product_id, batch) is not None:
+        targets[product_id] = batch
+    product_codes.setdefault(product_id, set()).add(code)
+
+
+def _batch_order():
+    # First-expiring stock is sold first; batches without an expiry date go last.
+    return [F('expiry_date').asc(nulls_last=True), 'purchase_date', 'id']
+
+
+class CatalogIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ready = False
+        self._products = {}
+        self._active_batch = {}
+        self._codes = {}
+        self._product_codes = {}
+
+    def warm(self):
+        """(Re)build the whole index with two queries."""
+        products = {row['id']: row for row in Product.objects.values(*PRODUCT_FIELDS)}
+        batches = Inventory.objects.filter(is_active=True).order_by(*_batch_order()).values(*BATCH_FIELDS)
+        active_batch = {}
+        codes = {}
+        product_codes = {}
+
+        for row in batches.iterator():
+            if row['batch_number']:
+                _add_code(codes, product_codes, row['batch_number'], row['product_id'], row)
+            if row['quantity'] > 0:
+                active_batch.setdefault(row['product_id'], row)
+        for product in products.values():
+            for code in (product['sku'], product['barcode']):
+                if code:
+                    _add_code(codes, product_codes, code, product['id'])
+
+        with self._lock:
+            self._products = products
+            self._active_batch = active_batch
+            self._codes = codes
+            self._product_codes = product_codes
+            self._ready = True
+
+    def warm_on_startup(self):
+        """Warm from wsgi/asgi startup; a missing table just defers to the first scan."""
+        try:
+            self.warm()
+        except DatabaseError:
+            pass
+
+    def invalidate(self):
+        with self._lock:
+            self._ready = False
+
+    def refresh_product(self, product_id):
+        """Reload one product and its batches after a save or delete."""
+        if not self._ready:
+            return
+        product = Product.objects.filter(pk=product_id).values(*PRODUCT_FIELDS).first()
+        batches = list(
+            Inventory.objects.filter(product_id=product_id, is_active=True)
+            .order_by(*_batch_order()).values(*BATCH_FIELDS)
+        )
+
+        with self._lock:
+            # Other products sharing these codes keep their entries.
+            for code in self._product_codes.pop(product_id, ()):
+                targets = self._codes.get(code, {})
+                targets.pop(product_id, None)
+                if not targets:
+                    self._codes.pop(code, None)
+            self._products.pop(product_id, None)
+            self._active_batch.pop(product_id, None)
+            if product is None:
+                return
+
+            self._products[product_id] = product
+            for row in batches:
+                if row['batch_number']:
+                    _add_code(self._codes, self._product_codes, row['batch_number'], product_id, row)
+                if row['quantity'] > 0:
+                    self._active_batch.setdefault(product_id, row)
+            for code in (product['sku'], product['barcode']):
+                if code:
+                    _add_code(self._codes, self._product_codes, code, product_id)
+
+    def lookup(self, code):
+        """
+        Resolve a scanned code to ``{'product', 'batch', 'price'}`` or ``None``.
+        A batch-number scan returns that batch; a barcode/SKU scan returns the
+        product's active batch. Raises ``AmbiguousCode`` if the code is the
+        barcode or SKU of several products, or else a batch number of several.
+        """
+        if not self._ready:
+            self.warm()
+        code = (code or '').strip()
+        with self._lock:
+            targets = self._codes.get(code)
+            if not targets:
+                return None
+            matches = [(pk, None) for pk, batch in targets.items() if batch is None] or list(targets.items())
+            if len(matches) > 1:
+                raise AmbiguousCode(code, [dict(self._products[pk]) for pk, _ in matches])
+            [(product_id, batch)] = matches
+            product = self._products[product_id]
+            batch = batch or self._active_batch.get(product_id)
+
+        price = batch['selling_price'] if batch else product['price']
+        return {
+            'product': dict(product),
+            'batch': dict(batch) if batch else None,
+            'price': price,
+        }
+
+
+catalog = CatalogIndex()
@@ -0,0 +1,203 @@
+"""
+Duplicate-customer detection and merging.
+
+Customers are only compared with others that share a blocking key (same
+normalised phone, same phonetic name, or same date of birth and phonetic
+first name), so the work grows with the size of each block rather than with
+n². Candidate pairs are scored, linked into clusters, and each cluster can be
+merged into its oldest row: purchases, prescriptions, bills and history are
+reassigned with one bulk ``update()`` per table inside a single transaction.
+"""
+import re
+from collections import defaultdict
+from difflib import SequenceMatcher
+
+from django.db import transaction
+
+from . import replication
+from .models import (
+    ArchivedBill, ArchivedCustomerHistory, ArchivedPurchase, Bill, ChangeLogEntry, Customer,
+    CustomerHistory, Prescription, Purchase,
+)
+from .archive import archive_boundary
+from .routers import ARCHIVE_DB
+
+DEFAULT_THRESHOLD = 0.75
+# Blocks larger than this (a very common name) are skipped; the phone and
+# birthday keys still pair those customers up when they match.
+MAX_BLOCK_SIZE = 50
+
+# Models pointing at Customer, moved to the surviving row on merge.
+RELATED = [Purchase, Prescription, Bill, CustomerHistory]
+ARCHIVED_RELATED = [ArchivedPurchase, ArchivedBill, ArchivedCustomerHistory]
+
+FIELDS = ('id', 'user_id', 'first_name', 'last_name', 'phone', 'email', 'date_of_birth')
+# Filled on the surviving row from its duplicates when it has no value.
+MERGED_FIELDS = (
+    'first_name', 'last_name', 'email', 'phone', 'address', 'date_of_birth', 'gender',
+    'prescription_date', 'additional_info',
+)
+
+_SOUNDEX = {
+    letter: str(code)
+    for code, letters in enumerate(['aeiouyhw', 'bfpv', 'cgjkqsxz', 'dt', 'l', 'mn', 'r'])
+    for letter in letters
+}
+
+
+def normalize_phone(phone):
+    """Last ten digits, so '+91 98765-43210' and '09876543210' compare equal."""
+    digits = re.sub(r'\D', '', phone or '')
+    return digits[-10:] if len(digits) >= 10 else digits or None
+
+
+def normalize_name(name):
+    return re.sub(r'[^a-z ]', '', (name or '').lower()).strip()
+
+
+def soundex(name):
+    """Four-character Soundex code, so 'Sharma' and 'Sarma' share a block."""
+    letters = re.sub(r'[^a-z]', '', (name or '').lower())
+    if not letters:
+        return ''
+    code, previous = letters[0].upper(), _SOUNDEX[letters[0]]
+    for letter in letters[1:]:
+        digit = _SOUNDEX[letter]
+        if digit != '0' and digit != previous:
+            code += digit
+        if letter not in 'hw':
+            previous = digit
+    return (code + '000')[:4]
+
+
+def _blocking_keys(row):
+    keys = []
+    phone = normalize_phone(row['phone'])
+    if phone:
+        keys.append(('phone', phone))
+    first, last = soundex(row['first_name']), soundex(row['last_name'])
+    if first:
+        keys.append(('name', first, last))
+        if row['date_of_birth']:
+            keys.append(('dob', row['date_of_birth'], first))
+    return keys
+
+
+def score(a, b):
+    """Similarity of two customer rows in [0, 1]."""
+    points = 0.0
+    phone_a, phone_b = normalize_phone(a['phone']), normalize_phone(b['phone'])
+    if phone_a and phone_a == phone_b:
+        points += 0.45
+    name_a = normalize_name(f"{a['first_name'] or ''} {a['last_name'] or ''}")
+    name_b = normalize_name(f"{b['first_name'] or ''} {b['last_name'] or ''}")
+    if name_a and name_b:
+        points += 0.35 * SequenceMatcher(None, name_a, name_b).ratio()
+    if a['date_of_birth'] and a['date_of_birth'] == b['date_of_birth']:
+        points += 0.2
+    if a['email'] and (a['email'] or '').lower() == (b['email'] or '').lower():
+        points += 0.2
+    return min(points, 1.0)
+
+
+def find_duplicates(customers=None, threshold=DEFAULT_THRESHOLD):
+    """
+    Scored candidate pairs ``(score, id_a, id_b)``, best first. Only customers
+    of the same user are compared.
+    """
+    customers = customers if customers is not None else Customer.objects.all()
+    rows = {}
+    blocks = defaultdict(list)
+    for row in customers.values(*FIELDS).order_by().iterator(chunk_size=5000):
+        rows[row['id']] = row
+        for key in _blocking_keys(row):
+            blocks[(row['user_id'],) + key].append(row['id'])
+
+    seen = set()
+    pairs = []
+    for ids in blocks.values():
+        if len(ids) < 2 or len(ids) > MAX_BLOCK_SIZE:
+            continue
+        for i, id_a in enumerate(ids):
+            for id_b in ids[i + 1:]:
+                pair = (id_a, id_b) if id_a < id_b else (id_b, id_a)
+                if pair in seen:
+                    continue
+                seen.add(pair)
+                value = score(rows[pair[0]], rows[pair[1]])
+                if value >= threshold:
+                    pairs.append((value, *pair))
+    pairs.sort(reverse=True)
+    return pairs
+
+
+def clusters(pairs):
+    """Group matched pairs into sets of customer ids (union-find)."""
+    parent = {}
+
+    def find(x):
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for _, a, b in pairs:
+        parent[find(a)] = find(b)
+    groups = defaultdict(set)
+    for x in parent:
+        groups[find(x)].add(x)
+    return [sorted(group) for group in groups.values()]
+
+
+def merge_customers(survivor, duplicates):
+    """
+    Merge ``duplicates`` into ``survivor``: related rows are reassigned in bulk,
+    blank fields on the survivor are filled from the duplicates, and the
+    duplicates are deleted, all in one transaction. Archived rows are moved in
+    an archive transaction nested inside it, which commits first: if the merge
+    then fails they point at the survivor, which still exists.
+    """
+    duplicate_ids = [c.pk for c in duplicates if c.pk != survivor.pk]
+    if not duplicate_ids:
+        return 0
+    with transaction.atomic(), transaction.atomic(using=ARCHIVE_DB):
+        if archive_boundary() is not None:
+            for model in ARCHIVED_RELATED:
+                model.objects.filter(customer_id__in=duplicate_ids).update(customer_id=survivor.pk)
+        moved_prescriptions = list(Prescription.objects.filter(customer_id__in=duplicate_ids))
+        for model in RELATED:
+            model.objects.filter(customer_id__in=duplicate_ids).update(customer=survivor)
+        for prescription in moved_prescriptions:
+            prescription.customer = survivor
+        # update() skips the save signals, so the moved prescriptions are logged
+        # for the other branches here; the survivor's save logs itself.
+        replication.record_changes(moved_prescriptions, ChangeLogEntry.Operation.SAVE)
+        for customer in sorted(duplicates, key=lambda c: c.pk):
+            for field in MERGED_FIELDS:
+                if getattr(survivor, field) in (None, '') and getattr(customer, field) not in (None, ''):
+                    setattr(survivor, field, getattr(customer, field))
+        # Delete first: the survivor may take over a duplicate's phone.
+        Customer.objects.filter(pk__in=duplicate_ids).delete()
+        survivor.save()
+        Customer.refresh_latest_prescription([survivor.pk])
+        CustomerHistory.objects.create(
+            customer=survivor,
+            description=f"Merged {len(duplicate_ids)} duplicate record(s)",
+            details={'merged_ids': duplicate_ids},
+        )
+    return len(duplicate_ids)
+
+
+def merge_all(pairs, batch_size=500):
+    """Merge every cluster into its oldest customer; returns the number of rows removed."""
+    groups = clusters(pairs)
+    merged = 0
+    for start in range(0, len(groups), batch_size):
+        batch = groups[start:start + batch_size]
+        customers = Customer.objects.in_bulk([pk for group in batch for pk in group])
+        for group in batch:
+            members = [customers[pk] for pk in group if pk in customers]
+            if len(members) > 1:
+                merged += merge_customers(members[0], members[1:])
+    return merged
@@ -0,0 +1,264 @@
+"""
+Demand forecasting and reorder suggestions.
+
+Weekly unit sales per product are loaded with one grouped query into a
+products x weeks matrix, and damped-trend exponential smoothing runs over
+every row at once, one NumPy step per week. Products with two full years of
+history also get an additive yearly seasonal term. Each product's reorder point
+covers the forecast demand over its supplier's lead time plus safety stock
+sized from the one-step forecast error. The order-up-to level adds
+``REVIEW_WEEKS`` of demand on top. Results live in ``ProductForecast``, which
+the low-stock alerts prefer over the hand-set ``Product.reorder_level``.
+"""
+import math
+from datetime import timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .analytics import bucket_dates
+from .archive import needs_archive
+from .models import ArchivedSale, ForecastRun, Inventory, Product, ProductForecast, Sale, Supplier
+
+HISTORY_WEEKS = 104
+SEASON_WEEKS = 52
+# Smoothing weights for level, trend and season, and the trend damping factor.
+ALPHA, BETA, GAMMA, PHI = 0.3, 0.1, 0.2, 0.9
+# z-score for a 95% chance of not running out during the lead time.
+SERVICE_Z = 1.65
+REVIEW_WEEKS = 4
+DEFAULT_LEAD_TIME_DAYS = 7
+
+FIELDS = (
+    'supplier_id', 'lead_time_days', 'weekly_demand', 'demand_error',
+    'reorder_point', 'order_up_to',
+)
+BATCH_SIZE = 1000
+
+
+def _week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def demand_matrix(as_of):
+    """
+    Units sold per product per complete week before ``as_of``. Returns the
+    product ids (sorted) and a float matrix with one row per product.
+    """
+    end = _week_start(as_of)
+    start = end - timedelta(weeks=HISTORY_WEEKS)
+    ids = np.array(Product.objects.order_by('id').values_list('id', flat=True), dtype=np.int64)
+
+    rows = list(
+        Sale.objects.filter(date__gte=start, date__lt=end)
+        .values('product_id', 'date').annotate(units=Sum('quantity'))
+        .order_by().values_list('product_id', 'date', 'units')
+    )
+    if needs_archive(start):
+        rows += ArchivedSale.objects.filter(date__gte=start, date__lt=end, product_id__isnull=False).values_list(
+            'product_id', 'date', 'quantity'
+        )
+
+    matrix = np.zeros((len(ids), HISTORY_WEEKS), dtype=np.float64)
+    if rows:
+        products, dates, units = zip(*rows)
+        products = np.array(products, dtype=np.int64)
+        units = np.array(units, dtype=np.float64)
+        weeks = bucket_dates(np.array(dates, dtype='datetime64[D]'), 'week')
+        columns = (weeks - np.datetime64(start, 'D')).astype(np.int64) // 7
+        # Sales of products deleted since are dropped.
+        known = np.isin(products, ids)
+        np.add.at(matrix, (np.searchsorted(ids, products[known]), columns[known]), units[known])
+    return ids, matrix
+
+
+def smooth(demand):
+    """
+    Damped-trend exponential smoothing of every row of ``demand`` at once.
+
+    A row starts at its first week with sales, so a new product's empty past
+    does not drag its level down. Rows with at least two seasons of history
+    also get an additive seasonal term, seeded from their first two seasons.
+    Returns ``(level, trend, seasonal, error)``: ``seasonal`` is indexed by
+    week of the season, aligned so column ``0`` is the week after the history,
+    and ``error`` is the RMSE of the one-step forecasts (``nan`` where a row
+    has no sales).
+    """
+    products, weeks = demand.shape
+    sold = demand > 0
+    first = np.where(sold.any(axis=1), sold.argmax(axis=1), weeks)
+    seasonal_rows = (weeks - first) >= 2 * SEASON_WEEKS
+
+    level = np.zeros(products)
+    trend = np.zeros(products)
+    seasonal = np.zeros((products, SEASON_WEEKS))
+    # Seasonal rows start with the trend between their first two seasons and
+    # the first season's deviations from that trend line.
+    initial_trend = np.zeros(products)
+    rows = np.flatnonzero(seasonal_rows)
+    offsets = np.arange(SEASON_WEEKS)
+    columns = first[rows, None] + offsets
+    first_season = demand[rows[:, None], columns]
+    second_season = demand[rows[:, None], columns + SEASON_WEEKS]
+    initial_trend[rows] = (second_season.mean(axis=1) - first_season.mean(axis=1)) / SEASON_WEEKS
+    line = first_season.mean(axis=1, keepdims=True) + initial_trend[rows, None] * (offsets - (SEASON_WEEKS - 1) / 2)
+    seasonal[rows[:, None], columns % SEASON_WEEKS] = first_season - line
+    squared_error = np.zeros(products)
+    forecasts = np.zeros(products)
+
+    for week in range(weeks):
+        actual = demand[:, week]
+        slot = week % SEASON_WEEKS
+        season = np.where(seasonal_rows, seasonal[:, slot], 0)
+        started = week == first
+        active = week > first
+
+        error = actual - (level + PHI * trend + season)
+        squared_error += np.where(active, error ** 2, 0)
+        forecasts += active
+
+        new_level = ALPHA * (actual - season) + (1 - ALPHA) * (level + PHI * trend)
+        new_trend = BETA * (new_level - level) + (1 - BETA) * PHI * trend
+        seasonal[:, slot] = np.where(active, GAMMA * (actual - new_level) + (1 - GAMMA) * season, seasonal[:, slot])
+        level = np.where(started, actual - season, np.where(active, new_level, level))
+        trend = np.where(started, initial_trend, np.where(active, new_trend, trend))
+
+    seasonal = np.where(seasonal_rows[:, None], np.roll(seasonal, -(weeks % SEASON_WEEKS), axis=1), 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        error = np.sqrt(squared_error / forecasts)
+    error = np.where(first < weeks, np.nan_to_num(error), np.nan)
+    return level, trend, seasonal, error
+
+
+def weekly_forecast(level, trend, seasonal, horizon):
+    """Forecast units for each of the next ``horizon`` weeks, never below zero."""
+    steps = np.arange(1, horizon + 1)
+    damping = np.cumsum(PHI ** steps)
+    season = seasonal[:, (steps - 1) % SEASON_WEEKS]
+    return np.maximum(level[:, None] + trend[:, None] * damping + season, 0)
+
+
+def demand_over(weekly, weeks):
+    """Forecast units over a (fractional) number of weeks per row of ``weekly``."""
+    whole = np.floor(weeks).astype(np.int64)
+    cumulative = np.concatenate([np.zeros((len(weekly), 1)), np.cumsum(weekly, axis=1)], axis=1)
+    rows = np.arange(len(weekly))
+    partial = np.where(whole < weekly.shape[1], weekly[rows, np.minimum(whole, weekly.shape[1] - 1)], 0)
+    return cumulative[rows, whole] + (weeks - whole) * partial
+
+
+def _last_supplier():
+    """Subquery for a product's supplier on its most recent batch that has one."""
+    return Subquery(
+        Inventory.objects.filter(product=OuterRef('pk')).exclude(supplier=None)
+        .order_by('-purchase_date', '-id').values('supplier_id')[:1]
+    )
+
+
+def _last_suppliers():
+    return dict(
+        Product.objects.annotate(last_supplier=_last_supplier())
+        .exclude(last_supplier=None).values_list('pk', 'last_supplier')
+    )
+
+
+def forecast_products(as_of):
+    """Compute the forecast row of every product with sales; returns ``{product_id: {field: value}}``."""
+    ids, demand = demand_matrix(as_of)
+    level, trend, seasonal, error = smooth(demand)
+
+    suppliers = _last_suppliers()
+    lead_times = dict(Supplier.objects.values_list('pk', 'lead_time_days'))
+    supplier_ids = [suppliers.get(int(pk)) for pk in ids]
+    lead_days = np.array(
+        [lead_times.get(supplier, DEFAULT_LEAD_TIME_DAYS) for supplier in supplier_ids], dtype=np.float64
+    )
+    lead_weeks = lead_days / 7
+
+    horizon = int(math.ceil(lead_weeks.max(initial=0))) + REVIEW_WEEKS
+    weekly = weekly_forecast(level, trend, seasonal, max(horizon, 1))
+    safety = SERVICE_Z * np.nan_to_num(error) * np.sqrt(lead_weeks)
+    reorder_point = np.ceil(demand_over(weekly, lead_weeks) + safety)
+    order_up_to = np.ceil(demand_over(weekly, lead_weeks + REVIEW_WEEKS) + safety)
+
+    return {
+        int(ids[i]): {
+            'supplier_id': supplier_ids[i],
+            'lead_time_days': int(lead_days[i]),
+            'weekly_demand': Decimal(f'{weekly[i, 0]:.2f}'),
+            'demand_error': Decimal(f'{error[i]:.2f}'),
+            'reorder_point': int(reorder_point[i]),
+            'order_up_to': int(max(order_up_to[i], reorder_point[i])),
+        }
+        for i in np.flatnonzero(~np.isnan(error))
+    }
+
+
+def refresh_forecasts(as_of=None):
+    """
+    Reforecast every product and write only the ``ProductForecast`` rows that
+    changed. Forecasts of products with no sales in the history window are
+    removed so their hand-set reorder level applies again. Returns the
+    ``ForecastRun`` recorded for this pass.
+    """
+    as_of = as_of or timezone.localdate()
+    started = timezone.now()
+    forecasts = forecast_products(as_of)
+    stored = {row[0]: dict(zip(FIELDS, row[1:])) for row in ProductForecast.objects.values_list('pk', *FIELDS)}
+
+    created, changed = [], []
+    for product_id, values in forecasts.items():
+        current = stored.get(product_id)
+        if current == values:
+            continue
+        row = ProductForecast(product_id=product_id, updated_at=started, **values)
+        (changed if current is not None else created).append(row)
+    stale = [product_id for product_id in stored if product_id not in forecasts]
+
+    with transaction.atomic():
+        ProductForecast.objects.bulk_create(created, batch_size=BATCH_SIZE)
+        ProductForecast.objects.bulk_update(changed, [*FIELDS, 'updated_at'], batch_size=BATCH_SIZE)
+        ProductForecast.objects.filter(pk__in=stale).delete()
+        return ForecastRun.objects.create(
+            run_at=started,
+            as_of=as_of,
+            products_forecast=len(forecasts),
+            forecasts_updated=len(created) + len(changed) + len(stale),
+        )
+
+
+def low_stock():
+    """
+    Stocked products whose active units are below their reorder point: the
+    forecast one where there is a forecast, else ``Product.reorder_level``.
+    """
+    return Product.objects.filter(
+        Exists(Inventory.objects.filter(product=OuterRef('pk')))
+    ).annotate(
+        reorder_at=Coalesce('forecast__reorder_point', 'reorder_level'),
+    ).filter(stock_on_hand__lt=F('reorder_at'))
+
+
+def reorder_suggestions():
+    """Low-stock products with a suggested order quantity, grouped by their last supplier."""
+    products = low_stock().annotate(
+        last_supplier=_last_supplier(),
+        order_up_to=Coalesce('forecast__order_up_to', 'reorder_level'),
+    ).select_related('forecast').order_by('name')
+
+    groups = {}
+    for product in products:
+        groups.setdefault(product.last_supplier, []).append({
+            'product': product,
+            'forecast': getattr(product, 'forecast', None),
+            'quantity': product.order_up_to - product.stock_on_hand,
+        })
+    names = dict(Supplier.objects.filter(pk__in=[pk for pk in groups if pk]).values_list('pk', 'name'))
+    return [
+        {'supplier': names.get(supplier_id) or "No supplier", 'items': items}
+        for supplier_id, items in sorted(groups.items(), key=lambda group: (group[0] is None, names.get(group[0]) or ''))
+    ]
@@ -1,5 +1,8 @@
 from django import forms
-from .models import (Customer, Purchase, Prescription, Product, Supplier, Inventory, ProductCategory, Bill)
+from django.utils import timezone
+from .models import (PRESCRIPTION_FIELDS, Customer, Purchase, Prescription, Product, Supplier, Inventory, ProductCategory, Bill, SupplierLedgerEntry, GoodsReceipt, PurchaseOrder)
+from . import pricing, receiving
+from .widgets import AutocompleteSelect, AutocompleteSelectMultiple
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.contrib.auth.forms import UserCreationForm as DjangoUserCreationForm
 from django.contrib.auth.models import User
@@ -22,8 +25,6 @@ class CustomerForm(forms.ModelForm):
         fields = [
             'first_name', 'last_name', 'email', 'phone', 'address',
             'date_of_birth', 'gender', 'prescription_date', 'additional_info',
-            'sph_left', 'cyl_left', 'axis_left', 'add_left', 'vision_left',
-            'sph_right', 'cyl_right', 'axis_right', 'add_right', 'vision_right'
         ]
         widgets = {
             'date_of_birth': forms.DateInput(attrs={'type': 'date'}),
@@ -34,9 +35,27 @@ class CustomerForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        # The eye readings are entered here but stored as a Prescription row.
+        self.fields.update(forms.fields_for_model(Prescription, fields=PRESCRIPTION_FIELDS))
+        latest = self.instance.latest_prescription if self.instance.latest_prescription_id else None
+        if latest is not None:
+            for name in PRESCRIPTION_FIELDS:
+                self.initial.setdefault(name, getattr(latest, name))
         for field in self.fields.values():
             field.widget.attrs['class'] = 'form-control'
 
+    def save_prescription(self, customer):
+        """Record the entered readings as a new prescription when they changed."""
+        values = {name: self.cleaned_data.get(name) for name in PRESCRIPTION_FIELDS}
+        if all(value in (None, '') for value in values.values()):
+            return None
+        latest = customer.latest_prescription if customer.latest_prescription_id else None
+        if latest is not None and all(getattr(latest, name) == value for name, value in values.items()):
+            return latest
+        return Prescription.objects.create(
+            customer=customer, date=self.cleaned_data.get('prescription_date') or timezone.localdate(), **values
+        )
+
 class PurchaseForm(forms.ModelForm):
     class Meta:
         model = Purchase
@@ -77,14 +96,149 @@ class SupplierForm(forms.ModelForm):
 class InventoryForm(forms.ModelForm):
     class Meta:
         model = Inventory
-        fields = '__all__'
+        exclude = ['created_by']
         widgets = {
             'purchase_date': forms.DateInput(attrs={'type': 'date'}),
             'expiry_date': forms.DateInput(attrs={'type': 'date'}),
-            'product': forms.Select(attrs={'class': 'form-select'}),
-            'supplier': forms.Select(attrs={'class': 'form-select'}),
+            'product': AutocompleteSelect('products'),
+            'supplier': AutocompleteSelect('suppliers'),
+        }
+
+class GoodsReceiptForm(forms.ModelForm):
+    sheet = forms.CharField(
+        required=False, widget=forms.Textarea(attrs={'rows': 4}),
+        help_text="Or paste rows from a spreadsheet: code, batch, quantity, cost, selling price, expiry",
+    )
+    sheet_file = forms.FileField(required=False, help_text="Or upload the rows as a CSV file")
+
+    class Meta:
+        model = GoodsReceipt
+        fields = ['supplier', 'purchase_order', 'received_date', 'reference']
+        widgets = {
+            'supplier': AutocompleteSelect('suppliers'),
+            'received_date': forms.DateInput(attrs={'type': 'date'}),
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['supplier'].required = True
+        self.fields['purchase_order'].queryset = PurchaseOrder.objects.filter(
+            status__in=[PurchaseOrder.Status.ORDERED, PurchaseOrder.Status.PARTIAL]
+        ).select_related('supplier')
+        for field in self.fields.values():
+            field.widget.attrs.setdefault('class', 'form-control')
+
+    def clean(self):
+        cleaned_data = super().clean()
+        order = cleaned_data.get('purchase_order')
+        supplier = cleaned_data.get('supplier')
+        if order and supplier and order.supplier_id != supplier.pk:
+            self.add_error('purchase_order', f"{order.number} was placed with {order.supplier}, not {supplier}.")
+        return cleaned_data
+
+class ReceiptLineForm(forms.Form):
+    # SKU, barcode or product id, so lines can be typed, scanned or pasted.
+    product = forms.CharField(max_length=32)
+    batch_number = forms.CharField(max_length=50)
+    quantity = forms.IntegerField(min_value=1)
+    purchase_price = forms.DecimalField(max_digits=10, decimal_places=2, min_value=0)
+    selling_price = forms.DecimalField(max_digits=10, decimal_places=2, min_value=0)
+    expiry_date = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for field in self.fields.values():
+            field.widget.attrs['class'] = 'form-control form-control-sm'
+
+class BaseReceiptLineFormSet(forms.BaseFormSet):
+    def clean(self):
+        """Resolve every line's product and check batch numbers with one query each."""
+        self.lines = []
+        if any(self.errors):
+            return
+        filled = [f for f in self.forms if f.cleaned_data and not self._should_delete_form(f)]
+        if not filled:
+            raise forms.ValidationError("Enter at least one line.")
+
+        products = receiving.resolve_products(f.cleaned_data['product'] for f in filled)
+        resolved, seen = [], set()
+        for form in filled:
+            product = products.get(form.cleaned_data['product'])
+            if product is None:
+                form.add_error('product', "No product has this SKU, barcode or id.")
+                continue
+            key = (product.pk, form.cleaned_data['batch_number'])
+            if key in seen:
+                form.add_error('batch_number', "This batch is already on another line.")
+                continue
+            seen.add(key)
+            form.cleaned_data['product'] = product
+            resolved.append((form, key))
+        existing = receiving.existing_batches(seen)
+        for form, key in resolved:
+            if key in existing:
+                form.add_error('batch_number', f"{form.cleaned_data['product'].name} already has a batch with this number.")
+        if any(self.errors):
+            return
+        self.lines = [
+            {name: value for name, value in f.cleaned_data.items() if name != 'DELETE'}
+            for f in filled
+        ]
+
+ReceiptLineFormSet = forms.formset_factory(
+    ReceiptLineForm, formset=BaseReceiptLineFormSet, extra=10, can_delete=True,
+    max_num=receiving.MAX_LINES, absolute_max=receiving.MAX_LINES, validate_max=True,
+)
+
+class RepriceForm(forms.Form):
+    brand = forms.CharField(max_length=100, required=False)
+    category = forms.ModelChoiceField(queryset=ProductCategory.objects.all(), required=False)
+    supplier = forms.ModelChoiceField(queryset=Supplier.objects.all(), required=False,
+                                      widget=AutocompleteSelect('suppliers'))
+    target = forms.ChoiceField(choices=pricing.TARGETS, label="Set")
+    base = forms.ChoiceField(choices=pricing.BASES, label="From")
+    percent = forms.DecimalField(max_digits=6, decimal_places=2, required=False,
+                                 help_text="Percentage to add, e.g. 5, or -10 for a cut")
+    round_to = forms.ChoiceField(choices=pricing.ROUNDING, label="Round")
+    sheet = forms.CharField(
+        required=False, widget=forms.Textarea(attrs={'rows': 4}),
+        help_text="Or paste rows from a spreadsheet: SKU/barcode, price[, MRP]",
+    )
+    sheet_file = forms.FileField(required=False, help_text="Or upload the rows as a CSV file")
+    reason = forms.CharField(max_length=100, required=False)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for field in self.fields.values():
+            field.widget.attrs.setdefault('class', 'form-control')
+
+    def clean(self):
+        cleaned_data = super().clean()
+        percent = cleaned_data.get('percent')
+        if not cleaned_data.get('sheet', '').strip() and not cleaned_data.get('sheet_file'):
+            if percent is None:
+                self.add_error('percent', "Enter the percentage, or paste or upload a sheet.")
+            elif percent <= -100:
+                self.add_error('percent', "Prices cannot drop by 100% or more.")
+        return cleaned_data
+
+class SupplierPaymentForm(forms.ModelForm):
+    class Meta:
+        model = SupplierLedgerEntry
+        fields = ['entry_type', 'date', 'reference', 'amount', 'notes']
+        widgets = {
+            'date': forms.DateInput(attrs={'type': 'date'}),
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['entry_type'].choices = [
+            choice for choice in SupplierLedgerEntry.EntryType.choices
+            if choice[0] != SupplierLedgerEntry.EntryType.INVOICE
+        ]
+        for field in self.fields.values():
+            field.widget.attrs['class'] = 'form-control'
+
 class SalesFilterForm(forms.Form):
     start_date = forms.DateField(
         widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
@@ -109,16 +263,30 @@ class SalesFilterForm(forms.Form):
             raise forms.ValidationError("End date must be after start date")
         return cleaned_data
 
+    def filter_queryset(self, queryset, date_field='date', category_field='product__category'):
+        start_date = self.cleaned_data.get('start_date')
+        end_date = self.cleaned_data.get('end_date')
+        category = self.cleaned_data.get('category')
+
+        if start_date:
+            queryset = queryset.filter(**{f'{date_field}__gte': start_date})
+        if end_date:
+            queryset = queryset.filter(**{f'{date_field}__lte': end_date})
+        if category and category_field:
+            queryset = queryset.filter(**{category_field: category})
+        return queryset
+
 class BillForm(forms.ModelForm):
     def __init__(self, user, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.fields['customer'].queryset = Customer.objects.filter(user=user)
+        self.fields['customer'].queryset = Customer.objects.for_user(user)
         self.fields['products'].queryset = Product.objects.all()
 
     class Meta:
         model = Bill
         fields = ['customer', 'products', 'discount', 'payment_method']
         widgets = {
-            'products': forms.CheckboxSelectMultiple,
+            'customer': AutocompleteSelect('customers'),
+            'products': AutocompleteSelectMultiple('products'),
             'payment_method': forms.RadioSelect
         }
\ No newline at end of file
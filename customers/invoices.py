@@ -0,0 +1,392 @@
+"""
+Invoice and receipt PDFs for bills.
+
+PDFs are written directly (standard Type 1 fonts, one Flate-compressed content
+stream per page) so no PDF library is needed. The static part of each layout
+(shop header, column titles, rules) is compiled once per paper size and reused;
+only the bill-specific text is generated per invoice. Rendered files are cached
+on disk keyed by the bill's version, so reprints are a file read, and
+``render_batch`` renders many bills in a process pool into one zip archive.
+"""
+import os
+import tempfile
+import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from decimal import Decimal
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+
+FORMATS = ('a4', 'thermal')
+
+MM = 72 / 25.4
+A4 = (595.28, 841.89)
+THERMAL_WIDTH = 80 * MM
+COURIER_WIDTH = 0.6  # Courier glyphs are 0.6 em wide, so alignment is simple arithmetic.
+
+
+def shop_details():
+    return {
+        'name': getattr(settings, 'SHOP_NAME', 'Sachdeva Opticals'),
+        'address': getattr(settings, 'SHOP_ADDRESS', 'Rudrapur, Uttarakhand'),
+        'gstin': getattr(settings, 'SHOP_GSTIN', ''),
+    }
+
+
+# ======================
+# PDF primitives
+# ======================
+def _escape(text):
+    text = str(text).replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+    return text.encode('cp1252', 'replace')
+
+
+def _text(x, y, text, font='F1', size=10):
+    return b'BT /%s %d Tf %.2f %.2f Td (%s) Tj ET\n' % (font.encode(), size, x, y, _escape(text))
+
+
+def _text_right(x, y, text, size=10):
+    """Right-align Courier text so that it ends at ``x``."""
+    return _text(x - len(str(text)) * size * COURIER_WIDTH, y, text, 'F3', size)
+
+
+def _line(x1, y1, x2, y2, width=0.5):
+    return b'%.2f w %.2f %.2f m %.2f %.2f l S\n' % (width, x1, y1, x2, y2)
+
+
+def _pdf(pages, width, height):
+    """Assemble a PDF from a list of page content streams."""
+    fonts = b'<< /F1 3 0 R /F2 4 0 R /F3 5 0 R >>'
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        None,  # page tree, filled in once page object numbers are known
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>',
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>',
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>',
+    ]
+    kids = []
+    for content in pages:
+        stream = zlib.compress(content)
+        objects.append(b'<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream' % (len(stream), stream))
+        objects.append(
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %.2f %.2f] /Resources << /Font %s >> /Contents %d 0 R >>'
+            % (width, height, fonts, len(objects))
+        )
+        kids.append(b'%d 0 R' % len(objects))
+    objects[1] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (b' '.join(kids), len(kids))
+
+    output = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b'%d 0 obj\n%s\nendobj\n' % (number, body)
+    xref = len(output)
+    output += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    for offset in offsets:
+        output += b'%010d 00000 n \n' % offset
+    output += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    return bytes(output)
+
+
+# ======================
+# Layouts
+# ======================
+A4_MARGIN = 50
+A4_ROW = 16
+# x positions; price, GST and amount are right-aligned to theirs.
+A4_COLUMNS = {'item': A4_MARGIN, 'hsn': 300, 'price': 420, 'gst': 480, 'amount': 545}
+A4_TABLE_TOP = 640
+A4_ROWS_PER_PAGE = 30
+
+
+@lru_cache(maxsize=None)
+def _a4_header():
+    shop = shop_details()
+    width, height = A4
+    ops = [
+        _text(A4_MARGIN, height - 70, shop['name'], 'F2', 20),
+        _text(A4_MARGIN, height - 88, shop['address'], 'F1', 10),
+    ]
+    if shop['gstin']:
+        ops.append(_text(A4_MARGIN, height - 102, f"GSTIN: {shop['gstin']}", 'F1', 10))
+    ops += [
+        _text(width - A4_MARGIN - 90, height - 70, 'TAX INVOICE', 'F2', 14),
+        _line(A4_MARGIN, height - 115, width - A4_MARGIN, height - 115, 1),
+        _text(A4_COLUMNS['item'], A4_TABLE_TOP + 8, 'Item', 'F2', 10),
+        _text(A4_COLUMNS['hsn'], A4_TABLE_TOP + 8, 'HSN', 'F2', 10),
+        _text(A4_COLUMNS['price'] - 30, A4_TABLE_TOP + 8, 'Price', 'F2', 10),
+        _text(A4_COLUMNS['gst'] - 30, A4_TABLE_TOP + 8, 'GST %', 'F2', 10),
+        _text(A4_COLUMNS['amount'] - 40, A4_TABLE_TOP + 8, 'Amount', 'F2', 10),
+        _line(A4_MARGIN, A4_TABLE_TOP, width - A4_MARGIN, A4_TABLE_TOP),
+    ]
+    return b''.join(ops)
+
+
+def _render_a4(data):
+    width, height = A4
+    lines = data['lines']
+    chunks = [lines[i:i + A4_ROWS_PER_PAGE] for i in range(0, len(lines), A4_ROWS_PER_PAGE)] or [[]]
+    pages = []
+    for page_number, chunk in enumerate(chunks, start=1):
+        ops = [
+            _a4_header(),
+            _text(A4_MARGIN, height - 140, f"Invoice #{data['number']}", 'F2', 11),
+            _text(A4_MARGIN, height - 156, f"Date: {data['date']}", 'F1', 10),
+            _text(330, height - 140, f"Bill to: {data['customer']}", 'F1', 10),
+            _text(330, height - 156, f"Phone: {data['phone']}", 'F1', 10),
+        ]
+        y = A4_TABLE_TOP - A4_ROW
+        for line in chunk:
+            ops += [
+                _text(A4_COLUMNS['item'], y, line['name'][:40], 'F1', 10),
+                _text(A4_COLUMNS['hsn'], y, line['hsn'], 'F3', 10),
+                _text_right(A4_COLUMNS['price'], y, line['price']),
+                _text_right(A4_COLUMNS['gst'], y, line['gst']),
+                _text_right(A4_COLUMNS['amount'], y, line['amount']),
+            ]
+            y -= A4_ROW
+        if page_number == len(chunks):
+            ops.append(_line(A4_MARGIN, y + A4_ROW - 4, width - A4_MARGIN, y + A4_ROW - 4))
+            for label, value, font in (
+                ('Subtotal', data['subtotal'], 'F1'),
+                (f"Discount ({data['discount']}%)", f"-{data['discount_amount']}", 'F1'),
+                ('Total (Rs)', data['total'], 'F2'),
+            ):
+                y -= A4_ROW
+                ops.append(_text(A4_COLUMNS['gst'] - 80, y, label, font, 10))
+                ops.append(_text_right(A4_COLUMNS['amount'], y, value))
+            ops.append(_text(A4_MARGIN, y - 2 * A4_ROW, f"Paid by {data['payment_method']}", 'F1', 10))
+        ops.append(_text(width - A4_MARGIN - 60, 40, f"Page {page_number}/{len(chunks)}", 'F1', 8))
+        pages.append(b''.join(ops))
+    return _pdf(pages, width, height)
+
+
+THERMAL_MARGIN = 3 * MM
+THERMAL_SIZE = 8
+THERMAL_ROW = 10
+THERMAL_COLUMNS = int((THERMAL_WIDTH - 2 * THERMAL_MARGIN) / (THERMAL_SIZE * COURIER_WIDTH))
+
+
+def _receipt_row(left, right=''):
+    left = str(left)[:THERMAL_COLUMNS - len(str(right)) - 1]
+    return left + ' ' * (THERMAL_COLUMNS - len(left) - len(str(right))) + str(right)
+
+
+@lru_cache(maxsize=None)
+def _thermal_header():
+    shop = shop_details()
+    rows = [shop['name'].upper().center(THERMAL_COLUMNS), shop['address'].center(THERMAL_COLUMNS)]
+    if shop['gstin']:
+        rows.append(f"GSTIN {shop['gstin']}".center(THERMAL_COLUMNS))
+    rows.append('-' * THERMAL_COLUMNS)
+    return tuple(rows)
+
+
+def _render_thermal(data):
+    rows = list(_thermal_header()) + [
+        _receipt_row(f"Bill #{data['number']}", data['date']),
+        _receipt_row(data['customer'][:THERMAL_COLUMNS]),
+        '-' * THERMAL_COLUMNS,
+    ]
+    for line in data['lines']:
+        rows.append(_receipt_row(line['name'], line['amount']))
+        rows.append(_receipt_row(f"  HSN {line['hsn']}  GST {line['gst']}%"))
+    rows += [
+        '-' * THERMAL_COLUMNS,
+        _receipt_row('Subtotal', data['subtotal']),
+        _receipt_row(f"Discount {data['discount']}%", f"-{data['discount_amount']}"),
+        _receipt_row('TOTAL Rs', data['total']),
+        _receipt_row('Paid by', data['payment_method']),
+        '',
+        'Thank you!'.center(THERMAL_COLUMNS),
+    ]
+    # The roll is cut to length, so the page is exactly as tall as the receipt.
+    height = (len(rows) + 2) * THERMAL_ROW
+    ops = [
+        _text(THERMAL_MARGIN, height - (index + 1.5) * THERMAL_ROW, row, 'F3', THERMAL_SIZE)
+        for index, row in enumerate(rows)
+    ]
+    return _pdf([b''.join(ops)], THERMAL_WIDTH, height)
+
+
+def render_invoice(data, fmt='a4'):
+    """Render invoice ``data`` (see ``invoice_data``) to PDF bytes. Pure, so it can run in a worker process."""
+    if fmt == 'a4':
+        return _render_a4(data)
+    if fmt == 'thermal':
+        return _render_thermal(data)
+    raise ValueError(f"Unknown invoice format '{fmt}'")
+
+
+# ======================
+# Bills
+# ======================
+def _money(value):
+    return f"{Decimal(value or 0).quantize(Decimal('0.01'))}"
+
+
+def invoice_data(bill, prices=None):
+    """
+    Plain, picklable snapshot of everything an invoice shows. Products are
+    priced as they were when the bill was made; ``prices`` (see
+    ``pricing.bill_prices``) saves the lookup when rendering many bills.
+    """
+    if prices is None:
+        # Imported here: worker processes load this module without the app registry.
+        from .pricing import bill_prices
+        prices = bill_prices([bill.pk])
+    customer = bill.customer
+    lines = []
+    subtotal = Decimal('0')
+    for product in bill.products.all():
+        price = prices.get((bill.pk, product.pk), product.price) or Decimal('0')
+        subtotal += price
+        lines.append({
+            'name': str(product.name or ''),
+            'hsn': product.hsn_code or '',
+            'price': _money(price),
+            'gst': _money(product.gst_percentage),
+            'amount': _money(price),
+        })
+    discount = bill.discount or Decimal('0')
+    return {
+        'number': bill.pk,
+        'version': bill_version(bill),
+        'date': bill.date.strftime('%d-%m-%Y') if bill.date else '',
+        'customer': ' '.join(filter(None, [customer.first_name, customer.last_name])) or '-',
+        'phone': customer.phone or '-',
+        'payment_method': bill.get_payment_method_display(),
+        'lines': lines,
+        'subtotal': _money(subtotal),
+        'discount': _money(discount),
+        'discount_amount': _money(subtotal * discount / 100),
+        'total': _money(bill.total),
+    }
+
+
+def bill_version(bill):
+    return int(bill.updated_at.timestamp() * 1000) if bill.updated_at else 0
+
+
+def _cache_dir():
+    return getattr(settings, 'INVOICE_CACHE_DIR', settings.BASE_DIR / 'invoice_cache')
+
+
+def _cache_path(bill_id, version, fmt):
+    return os.path.join(_cache_dir(), f'bill-{bill_id}-{version}-{fmt}.pdf')
+
+
+def get_invoice_pdf(bill, fmt='a4'):
+    """Return the PDF for ``bill``, rendering it only if this version is not cached yet."""
+    path = _cache_path(bill.pk, bill_version(bill), fmt)
+    try:
+        with open(path, 'rb') as cached:
+            return cached.read()
+    except FileNotFoundError:
+        pass
+    pdf = render_invoice(invoice_data(bill), fmt)
+    _write_cache(path, pdf)
+    return pdf
+
+
+def _write_cache(path, pdf):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = f'{path}.{os.getpid()}.tmp'
+    with open(temporary, 'wb') as handle:
+        handle.write(pdf)
+    os.replace(temporary, path)
+
+
+def _render_job(args):
+    data, fmt = args
+    return data['number'], render_invoice(data, fmt)
+
+
+def render_batch(bills, archive_path, fmt='a4', workers=None):
+    """
+    Render ``bills`` into a zip at ``archive_path``. Data is read from the
+    database up front; cached PDFs are reused and the rest are rendered in a
+    process pool. Returns the number of invoices written.
+    """
+    from .pricing import bill_prices
+
+    bills = bills.select_related('customer').prefetch_related('products').order_by('date', 'id')
+    uncached = []
+    pending = []
+    written = 0
+    with zipfile.ZipFile(archive_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for bill in bills.iterator(chunk_size=500):
+            path = _cache_path(bill.pk, bill_version(bill), fmt)
+            if os.path.exists(path):
+                archive.write(path, f'invoice-{bill.pk}.pdf')
+                written += 1
+            else:
+                uncached.append(bill)
+        for start in range(0, len(uncached), 500):
+            chunk = uncached[start:start + 500]
+            prices = bill_prices(bill.pk for bill in chunk)
+            pending.extend((invoice_data(bill, prices), fmt) for bill in chunk)
+
+        if pending:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for (data, _), (number, pdf) in zip(pending, pool.map(_render_job, pending, chunksize=25)):
+                    _write_cache(_cache_path(number, data['version'], fmt), pdf)
+                    archive.writestr(f'invoice-{number}.pdf', pdf)
+                    written += 1
+    return written
+
+
+# Batch archives are built one at a time off the request thread.
+_batch_executor = ThreadPoolExecutor(max_workers=1)
+
+
+def batch_archive_path(name):
+    return os.path.join(_cache_dir(), 'batches', f'{name}.zip')
+
+
+def _batch_error_path(name):
+    return os.path.join(_cache_dir(), 'batches', f'{name}.error')
+
+
+def batch_error(name):
+    """Why the last ``start_batch`` for ``name`` failed, or ``None`` if it has not."""
+    try:
+        with open(_batch_error_path(name)) as handle:
+            return handle.read()
+    except FileNotFoundError:
+        return None
+
+
+def start_batch(bills, name, fmt='a4'):
+    """
+    Queue ``render_batch`` in the background. The archive appears at
+    ``batch_archive_path(name)`` only once it is complete; if rendering fails,
+    ``batch_error(name)`` reports why instead.
+    """
+    path = batch_archive_path(name)
+    error_path = _batch_error_path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # A rebuild must not hand out the previous archive, or error, while it runs.
+    for previous in (path, error_path):
+        try:
+            os.remove(previous)
+        except FileNotFoundError:
+            pass
+
+    def job():
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), suffix='.tmp', delete=False) as handle:
+            temporary = handle.name
+        try:
+            render_batch(bills, temporary, fmt)
+            os.replace(temporary, path)
+        except BaseException as exc:
+            os.remove(temporary)
+            with open(error_path, 'w') as marker:
+                marker.write(str(exc) or type(exc).__name__)
+            raise
+        finally:
+            connection.close()
+
+    return _batch_executor.submit(job)
@@ -0,0 +1,157 @@
+"""
+Supplier ledger: purchase invoices, payments and payables ageing.
+
+The running balance is computed by the database with a window function, the
+per-supplier totals with one conditional aggregate (cached until the next
+entry), and the outstanding balance is stored on ``Supplier.balance`` so
+credit-limit checks at stock-in are a single row read.
+"""
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max, Q, Sum, Window
+from django.utils import timezone
+
+from .models import Supplier, SupplierLedgerEntry
+
+EntryType = SupplierLedgerEntry.EntryType
+
+# (label, days overdue upper bound, inclusive); anything older is the last bucket.
+AGEING_BUCKETS = [
+    ('Not due', 0),
+    ('1-30 days', 30),
+    ('31-60 days', 60),
+    ('61-90 days', 90),
+]
+AGEING_OVERFLOW = 'Over 90 days'
+TOTALS_TIMEOUT = 60 * 60 * 24
+
+
+def ledger_with_running_balance(supplier):
+    """Ledger entries annotated with ``running_balance`` (oldest first), computed in SQL."""
+    return supplier.ledger_entries.annotate(
+        running_balance=Window(
+            expression=Sum(SupplierLedgerEntry.signed_amount_expression()),
+            order_by=['date', 'id'],
+        )
+    ).select_related('inventory__product').order_by('date', 'id')
+
+
+def _totals_key(supplier_id):
+    return f'supplier-ledger-totals:{supplier_id}'
+
+
+def supplier_totals(supplier):
+    """Invoiced, paid and debit-note totals for ``supplier`` in one aggregate, cached."""
+    key = _totals_key(supplier.pk)
+    totals = cache.get(key)
+    if totals is None:
+        totals = supplier.ledger_entries.aggregate(
+            invoiced=Sum('amount', filter=Q(entry_type=EntryType.INVOICE), default=Decimal('0')),
+            paid=Sum('amount', filter=Q(entry_type=EntryType.PAYMENT), default=Decimal('0')),
+            debit_notes=Sum('amount', filter=Q(entry_type=EntryType.DEBIT_NOTE), default=Decimal('0')),
+            entries=Count('id'),
+            last_entry=Max('date'),
+        )
+        cache.set(key, totals, TOTALS_TIMEOUT)
+    return totals
+
+
+def invalidate_supplier_totals(supplier_id):
+    cache.delete(_totals_key(supplier_id))
+
+
+def payables_ageing(supplier, as_of=None):
+    """
+    Age the outstanding balance by invoice due date. Payments settle the
+    oldest invoices first, so what is still owed is made up of the most
+    recent invoices; those are read newest-first only until the balance is covered.
+    """
+    as_of = as_of or timezone.localdate()
+    buckets = {label: Decimal('0') for label, _ in AGEING_BUCKETS}
+    buckets[AGEING_OVERFLOW] = Decimal('0')
+
+    remaining = supplier.balance
+    if remaining > 0:
+        invoices = supplier.ledger_entries.filter(entry_type=EntryType.INVOICE).order_by('-date', '-id')
+        for due_date, date, amount in invoices.values_list('due_date', 'date', 'amount').iterator():
+            outstanding = min(amount, remaining)
+            overdue = (as_of - (due_date or date)).days
+            for label, limit in AGEING_BUCKETS:
+                if overdue <= limit:
+                    buckets[label] += outstanding
+                    break
+            else:
+                buckets[AGEING_OVERFLOW] += outstanding
+            remaining -= outstanding
+            if remaining <= 0:
+                break
+
+    return [{'bucket': label, 'amount': amount} for label, amount in buckets.items()]
+
+
+def check_credit(supplier, amount):
+    """
+    Raise ``ValidationError`` if invoicing ``amount`` would exceed the
+    supplier's credit limit. Call it inside the transaction that posts the
+    invoice: the balance is re-read there, so two stock-ins cannot both pass
+    on the same stale balance.
+    """
+    current = Supplier.objects.select_for_update().only('name', 'credit_limit', 'balance').get(pk=supplier.pk)
+    available = current.available_credit()
+    if available is not None and amount > available:
+        raise ValidationError(
+            f"This stock-in of {amount} exceeds the credit available with {current} "
+            f"({available} of {current.credit_limit})."
+        )
+
+
+def _stock_in_amount(inventory):
+    return inventory.quantity * inventory.purchase_price + (inventory.import_duty or 0)
+
+
+def _stock_in_invoice(inventory):
+    if inventory.goods_receipt_id is not None:
+        return inventory.goods_receipt.ledger_entry
+    return inventory.ledger_entries.filter(entry_type=EntryType.INVOICE).first()
+
+
+def record_stock_in(inventory, user=None, previous=None):
+    """
+    Post the purchase invoice for a newly received inventory batch, or, when
+    ``previous`` (the batch as it was before an edit) is given, adjust the
+    invoice it was posted on by the change in its value. Call it in the
+    transaction that saves the batch; raises ``ValidationError`` over the
+    credit limit or when an invoiced batch is moved to another supplier.
+    """
+    amount = _stock_in_amount(inventory)
+    if previous is not None:
+        invoice = _stock_in_invoice(previous) if previous.supplier_id is not None else None
+        if invoice is None:
+            return None
+        if inventory.supplier_id != previous.supplier_id:
+            raise ValidationError(
+                f"Batch {previous.batch_number} is on an invoice from {previous.supplier}; "
+                f"post a debit note instead of changing its supplier."
+            )
+        change = amount - _stock_in_amount(previous)
+        if change:
+            if change > 0:
+                check_credit(inventory.supplier, change)
+            invoice.amount += change
+            invoice.save()
+        return invoice
+
+    if inventory.supplier_id is None:
+        return None
+    check_credit(inventory.supplier, amount)
+    return SupplierLedgerEntry.objects.create(
+        supplier=inventory.supplier,
+        entry_type=EntryType.INVOICE,
+        date=inventory.purchase_date,
+        reference=inventory.batch_number,
+        amount=amount,
+        inventory=inventory,
+        created_by=user,
+    )
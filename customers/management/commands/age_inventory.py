@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from customers.ageing import run_ageing
+
+
+class Command(BaseCommand):
+    help = "Refresh inventory expiry buckets for batches that crossed a boundary since the last run, once or every N minutes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--as-of', help="Date to age stock against (YYYY-MM-DD); defaults to today.")
+        parser.add_argument('--full', action='store_true', help="Recompute every batch instead of only the changed ones.")
+        parser.add_argument('--every', type=int, metavar='MINUTES',
+                            help="Keep running and age the stock every MINUTES minutes.")
+
+    def handle(self, *args, **options):
+        as_of = None
+        if options['as_of']:
+            as_of = parse_date(options['as_of'])
+            if as_of is None:
+                raise CommandError("--as-of must be a date in YYYY-MM-DD format.")
+
+        while True:
+            run = run_ageing(as_of=as_of, full=options['full'])
+            self.stdout.write(self.style.SUCCESS(
+                f"Aged inventory as of {run.as_of}: checked {run.batches_checked}, updated {run.batches_updated}."
+            ))
+            if not options['every']:
+                break
+            time.sleep(options['every'] * 60)
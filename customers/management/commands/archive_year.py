@@ -0,0 +1,22 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from customers.archive import archive_through
+from customers.routers import ARCHIVE_DB
+
+
+class Command(BaseCommand):
+    help = "Move sales, bills, purchases and history up to the end of a closed financial year into the archive database."
+
+    def add_arguments(self, parser):
+        parser.add_argument('start_year', type=int, help="First year of the financial year, e.g. 2023 for April 2023 - March 2024.")
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        call_command('migrate', database=ARCHIVE_DB, verbosity=0)
+        try:
+            counts = archive_through(options['start_year'], batch_size=options['batch_size'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        moved = ', '.join(f"{count} {table}" for table, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Archived through FY {options['start_year']}: {moved}."))
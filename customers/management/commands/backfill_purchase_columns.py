@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from customers.models import Purchase
+
+
+class Command(BaseCommand):
+    help = "Fill the typed lens/frame columns of existing purchases from their details JSON, in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        fields = list(Purchase.DETAIL_COLUMNS) + ['updated_at']
+        last_id, scanned, updated = 0, 0, 0
+        while True:
+            batch = list(
+                Purchase.objects.filter(pk__gt=last_id).order_by('pk')
+                .only('pk', 'details', *fields)[:options['batch_size']]
+            )
+            if not batch:
+                break
+            now = timezone.now()
+            changed = []
+            for purchase in batch:
+                if purchase.fill_detail_columns():
+                    # API clients cache purchases on updated_at.
+                    purchase.updated_at = now
+                    changed.append(purchase)
+            with transaction.atomic():
+                Purchase.objects.bulk_update(changed, fields, batch_size=500)
+            last_id = batch[-1].pk
+            scanned += len(batch)
+            updated += len(changed)
+            self.stdout.write(f"  {scanned} scanned, {updated} updated")
+        self.stdout.write(self.style.SUCCESS(f"Backfilled {updated} of {scanned} purchases."))
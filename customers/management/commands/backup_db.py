@@ -0,0 +1,60 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from customers.backup import BackupError, backup_database, rotate_backups, verify_backup
+
+
+class Command(BaseCommand):
+    help = "Take an online, compressed backup of the databases and rotate old backups."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', action='append', dest='databases',
+                            help="Database alias to back up (repeatable); defaults to all of them.")
+        parser.add_argument('--keep', type=int, help="Backups to keep per database (default: BACKUP_KEEP).")
+        parser.add_argument('--force', action='store_true', help="Back up even if nothing changed since the last backup.")
+        parser.add_argument('--every', type=int, metavar='MINUTES', help="Keep running and back up every MINUTES.")
+        parser.add_argument('--verify', metavar='PATH', help="Only verify an existing backup file.")
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            try:
+                verify_backup(options['verify'])
+            except BackupError as exc:
+                raise CommandError(str(exc))
+            self.stdout.write(self.style.SUCCESS(f"{options['verify']} is intact."))
+            return
+
+        keep = options['keep'] if options['keep'] is not None else getattr(settings, 'BACKUP_KEEP', 14)
+        if keep < 1:
+            raise CommandError("--keep must be at least 1, or the backup just taken would be deleted.")
+
+        databases = options['databases'] or list(settings.DATABASES)
+        while True:
+            for alias in databases:
+                self.backup(alias, options)
+            if not options['every']:
+                break
+            time.sleep(options['every'] * 60)
+
+    def backup(self, alias, options):
+        try:
+            result = backup_database(alias, force=options['force'])
+        except BackupError as exc:
+            if options['every'] or not options['databases']:
+                # One failing database must not stop the others or the scheduler.
+                self.stderr.write(self.style.ERROR(f"{alias}: {exc}"))
+                return
+            raise CommandError(f"{alias}: {exc}")
+
+        if result is None:
+            self.stdout.write(f"{alias}: unchanged since the last backup, skipped.")
+        else:
+            path, manifest = result
+            timings = ', '.join(f"{name} {value:.2f}s" for name, value in manifest['timings'].items())
+            self.stdout.write(self.style.SUCCESS(
+                f"{alias}: {path} ({manifest['compressed_size'] / 1024:.0f} KiB; {timings})"
+            ))
+        for path in rotate_backups(alias, options['keep']):
+            self.stdout.write(f"{alias}: removed old backup {path.name}")
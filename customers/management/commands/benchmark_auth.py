@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+DEFAULT_PATHS = ['/customers/dashboard/', '/customers/', '/customers/sales/']
+AUTH_TABLES = ('django_session', 'auth_user')
+
+BASELINE = {
+    'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+    'AUTHENTICATION_BACKENDS': ['django.contrib.auth.backends.ModelBackend'],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Count the database queries an authenticated GET makes, split into "
+        "session/user lookups and the page's own queries, against Django's "
+        "default database sessions and the configured ones."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', required=True)
+        parser.add_argument('--path', action='append', dest='paths', help="Path to request (repeatable).")
+
+    def handle(self, *args, **options):
+        user = get_user_model().objects.filter(username=options['username']).first()
+        if user is None:
+            raise CommandError(f"No user named {options['username']}.")
+        paths = options['paths'] or DEFAULT_PATHS
+
+        self.stdout.write(f"{'setup':<15} {'path':<28} {'auth':>5} {'page':>5}")
+        with override_settings(**BASELINE):
+            self.run('db', user, paths)
+        self.run(settings.SESSION_STORE, user, paths)
+
+    def run(self, name, user, paths):
+        # The test client's host must pass ALLOWED_HOSTS.
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            client = Client()
+            client.force_login(user)
+            for path in paths:
+                client.get(path)  # warm the session and user caches
+                with CaptureQueriesContext(connections['default']) as queries:
+                    status = client.get(path).status_code
+                auth = sum(
+                    any(f'"{table}"' in query['sql'] for table in AUTH_TABLES)
+                    for query in queries.captured_queries
+                )
+                self.stdout.write(
+                    f"{name:<15} {path:<28} {auth:>5} {len(queries) - auth:>5}"
+                    + (f"  (HTTP {status})" if status != 200 else '')
+                )
@@ -0,0 +1,95 @@
+import re
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from http.cookiejar import CookieJar
+
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_PATHS = ['/customers/dashboard/', '/customers/sales/', '/customers/scan/?code=BENCH']
+
+
+def _login(base_url, username, password):
+    jar = CookieJar()
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
+    page = opener.open(f'{base_url}/accounts/login/').read().decode()
+    token = re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', page)
+    if token is None:
+        raise CommandError(f"No login form at {base_url}/accounts/login/.")
+    data = urllib.parse.urlencode({
+        'username': username, 'password': password, 'csrfmiddlewaretoken': token.group(1),
+    }).encode()
+    opener.open(urllib.request.Request(
+        f'{base_url}/accounts/login/', data=data, headers={'Referer': f'{base_url}/accounts/login/'}
+    ))
+    if not any(cookie.name == 'sessionid' for cookie in jar):
+        raise CommandError(f"Could not log in to {base_url} as {username}.")
+    return opener
+
+
+def _fetch(opener, url):
+    """Request ``url``; client errors (a 404 for an unknown scan code) are valid answers."""
+    try:
+        opener.open(url).read()
+    except urllib.error.HTTPError as exc:
+        return exc.code < 500
+    except OSError:
+        return False
+    return True
+
+
+def _client(opener, url, count, latencies, errors):
+    for _ in range(count):
+        started = time.perf_counter()
+        if not _fetch(opener, url):
+            errors.append(url)
+        latencies.append(time.perf_counter() - started)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare view latency under concurrent clients between running servers, "
+        "e.g. the WSGI runserver and the same app under an ASGI server."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('targets', nargs='+', metavar='NAME=URL',
+                            help="Servers to compare, e.g. wsgi=http://127.0.0.1:8000 asgi=http://127.0.0.1:8001")
+        parser.add_argument('--username', required=True)
+        parser.add_argument('--password', required=True)
+        parser.add_argument('--path', action='append', dest='paths', help="Path to request (repeatable).")
+        parser.add_argument('--clients', type=int, default=16, help="Concurrent clients.")
+        parser.add_argument('--requests', type=int, default=20, help="Requests per client and path.")
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or DEFAULT_PATHS
+        self.stdout.write(f"{'server':<8} {'path':<36} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+        for target in options['targets']:
+            name, _, base_url = target.partition('=')
+            base_url = base_url.rstrip('/')
+            openers = [_login(base_url, options['username'], options['password']) for _ in range(options['clients'])]
+            for path in paths:
+                self.run(name, base_url + path, path, openers, options['requests'])
+
+    def run(self, name, url, path, openers, count):
+        _fetch(openers[0], url)  # warm up
+        latencies, errors = [], []
+        threads = [
+            threading.Thread(target=_client, args=(opener, url, count, latencies, errors))
+            for opener in openers
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        cuts = statistics.quantiles(latencies, n=100)
+        self.stdout.write(
+            f"{name:<8} {path:<36} {len(latencies) / elapsed:>8.1f} {cuts[49] * 1000:>8.1f} "
+            f"{cuts[94] * 1000:>8.1f} {cuts[98] * 1000:>8.1f} {len(errors):>7}"
+        )
@@ -0,0 +1,47 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from customers.dedupe import DEFAULT_THRESHOLD, clusters, find_duplicates, merge_all
+from customers.models import Customer
+
+
+class Command(BaseCommand):
+    help = "Find likely duplicate customers and, with --merge, merge each group into its oldest record."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="Only this user's customers (username).")
+        parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help="Minimum match score (0-1).")
+        parser.add_argument('--merge', action='store_true', help="Merge the groups found instead of only listing them.")
+        parser.add_argument('--show', type=int, default=20, help="Groups to list in a dry run.")
+
+    def handle(self, *args, **options):
+        customers = Customer.objects.all()
+        if options['user']:
+            user = get_user_model().objects.filter(username=options['user']).first()
+            if user is None:
+                raise CommandError(f"No user named {options['user']}.")
+            customers = customers.for_user(user)
+
+        started = time.perf_counter()
+        pairs = find_duplicates(customers, threshold=options['threshold'])
+        groups = clusters(pairs)
+        self.stdout.write(
+            f"{len(pairs)} matching pairs in {len(groups)} groups "
+            f"({time.perf_counter() - started:.1f}s)."
+        )
+
+        if not options['merge']:
+            names = customers.in_bulk([pk for group in groups[:options['show']] for pk in group])
+            for group in groups[:options['show']]:
+                self.stdout.write('  ' + ' | '.join(
+                    f"#{pk} {names[pk]} {names[pk].phone or ''}".strip() for pk in group
+                ))
+            return
+
+        started = time.perf_counter()
+        merged = merge_all(pairs)
+        self.stdout.write(self.style.SUCCESS(
+            f"Merged {merged} duplicate customers in {time.perf_counter() - started:.1f}s."
+        ))
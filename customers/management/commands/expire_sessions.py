@@ -0,0 +1,23 @@
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Delete expired sessions, once or every N minutes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=int, metavar='MINUTES',
+                            help="Keep running and clean up every MINUTES minutes.")
+
+    def handle(self, *args, **options):
+        store = import_module(settings.SESSION_ENGINE).SessionStore
+        while True:
+            # A no-op for signed-cookie sessions, which expire in the browser.
+            store.clear_expired()
+            self.stdout.write(f"Cleared expired sessions ({settings.SESSION_STORE}).")
+            if not options['every']:
+                break
+            time.sleep(options['every'] * 60)
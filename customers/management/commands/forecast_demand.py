@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from customers.forecasting import refresh_forecasts
+
+
+class Command(BaseCommand):
+    help = "Forecast product demand from sales history and refresh reorder points, once or every N minutes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--as-of', help="Forecast from the weeks before this date (YYYY-MM-DD); defaults to today.")
+        parser.add_argument('--every', type=int, metavar='MINUTES',
+                            help="Keep running and refresh every MINUTES minutes.")
+
+    def handle(self, *args, **options):
+        as_of = None
+        if options['as_of']:
+            as_of = parse_date(options['as_of'])
+            if as_of is None:
+                raise CommandError("--as-of must be a date in YYYY-MM-DD format.")
+            if options['every']:
+                raise CommandError("--as-of cannot be combined with --every.")
+
+        while True:
+            run = refresh_forecasts(as_of=as_of)
+            self.stdout.write(self.style.SUCCESS(
+                f"Forecast demand as of {run.as_of}: {run.products_forecast} product(s), "
+                f"updated {run.forecasts_updated}."
+            ))
+            if not options['every']:
+                break
+            time.sleep(options['every'] * 60)
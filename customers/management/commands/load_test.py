@@ -0,0 +1,294 @@
+import json
+import os
+import random
+import re
+import shutil
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import date
+from decimal import Decimal
+from http.cookiejar import CookieJar
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from customers import search, stock
+from customers.models import Customer, Inventory, Product, ProductCategory, Sale, StockMovement
+
+USERNAME = 'loadtest-{}'
+PASSWORD = 'loadtest-password'
+CUSTOMERS_PER_USER = 200
+PRODUCTS = 200
+LOCKED = 'database is locked'
+STEPS = ['search', 'details', 'prescription', 'bill', 'report']
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # A mutation answers with a redirect; following it would time the next page too.
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class CounterSession:
+    """One simulated counter: a logged-in staff user with its own cookies."""
+
+    def __init__(self, base_url, username, password):
+        self.base_url = base_url
+        self.jar = CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.jar), _NoRedirect)
+        page = self.request('/accounts/login/')[1]
+        token = re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', page)
+        if token is None:
+            raise CommandError(f"No login form at {base_url}/accounts/login/.")
+        self.request('/accounts/login/', {
+            'username': username, 'password': password, 'csrfmiddlewaretoken': token.group(1),
+        })
+        if not any(cookie.name == 'sessionid' for cookie in self.jar):
+            raise CommandError(f"Could not log in to {base_url} as {username}.")
+
+    def _csrf_token(self):
+        return next((cookie.value for cookie in self.jar if cookie.name == 'csrftoken'), '')
+
+    def request(self, path, data=None):
+        """Return ``(status, body)``; redirects count as answers, not failures."""
+        url = self.base_url + path
+        headers = {}
+        if data is not None:
+            data = urllib.parse.urlencode(data, doseq=True).encode()
+            headers = {'X-CSRFToken': self._csrf_token(), 'Referer': url}
+        try:
+            with self.opener.open(urllib.request.Request(url, data=data, headers=headers), timeout=60) as response:
+                return response.status, response.read().decode(errors='replace')
+        except urllib.error.HTTPError as exc:
+            return exc.code, exc.read().decode(errors='replace')
+        except OSError as exc:
+            return 0, str(exc)
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {step: [] for step in STEPS}
+        self.errors = {step: 0 for step in STEPS}
+        self.locked = {step: 0 for step in STEPS}
+
+    def record(self, step, elapsed, status, body):
+        with self.lock:
+            self.latencies[step].append(elapsed)
+            if status == 0 or status >= 500:
+                self.errors[step] += 1
+                if LOCKED in body:
+                    self.locked[step] += 1
+
+
+def _copy_database(target):
+    """Copy the working database to ``target`` with SQLite's online backup."""
+    source = sqlite3.connect(str(settings.DATABASES['default']['NAME']))
+    copy = sqlite3.connect(target)
+    try:
+        source.backup(copy)
+    finally:
+        copy.close()
+        source.close()
+
+
+def _use_database(path):
+    """Point this process's default connection at ``path``."""
+    connections['default'].close()
+    connections['default'].settings_dict['NAME'] = path
+
+
+def _seed(users):
+    """Create the staff users with their customers, plus shared products and stock (idempotent)."""
+    User = get_user_model()
+    with transaction.atomic():
+        category, _ = ProductCategory.objects.get_or_create(name='Load test')
+        products = list(Product.objects.filter(category=category))
+        if not products:
+            products = Product.objects.bulk_create([
+                Product(name=f'Load test frame {i}', brand='LT', category=category,
+                        sku=f'LT-{i:05d}', price=Decimal(500 + i))
+                for i in range(PRODUCTS)
+            ])
+            # bulk_create skips the save signals that keep the search index current.
+            search.index_products([product.pk for product in products])
+        owner = None
+        for i in range(1, users + 1):
+            user = User.objects.filter(username=USERNAME.format(i)).first()
+            if user is None:
+                user = User.objects.create_user(USERNAME.format(i), password=PASSWORD, is_staff=True)
+                Customer.objects.bulk_create([
+                    Customer(user=user, first_name=f'Load{c}', last_name=f'Test{i}', phone=f'7{i:03d}{c:06d}')
+                    for c in range(CUSTOMERS_PER_USER)
+                ])
+                Sale.objects.bulk_create([
+                    Sale(date=date.today(), product=random.choice(products), quantity=1,
+                         price=Decimal('500'), total=Decimal('500'), created_by=user)
+                    for _ in range(50)
+                ])
+            owner = owner or user
+        if not Inventory.objects.filter(product__category=category).exists():
+            batches = Inventory.objects.bulk_create([
+                Inventory(product=product, batch_number=f'LT-B{product.pk}', quantity=1000,
+                          purchase_price=Decimal('300'), selling_price=product.price,
+                          purchase_date=date.today(), created_by=owner)
+                for product in products
+            ])
+            stock.record(batches, StockMovement.Kind.RECEIPT, user=owner)
+            Product.refresh_stock([product.pk for product in products])
+
+
+def _counter(session, customers, products, stop, stats, think_time):
+    while not stop.is_set():
+        customer_id, phone = random.choice(customers)
+        steps = [
+            ('search', f'/customers/?q={phone[:6]}', None),
+            ('details', f'/customers/customers/{customer_id}/', None),
+            ('prescription', f'/customers/customers/{customer_id}/transaction/', {
+                'product_type': 'spectacles',
+                'details': json.dumps({'lens_type': 'Single Vision', 'lens_price': 1200, 'frame_price': 800}),
+                'date_of_purchase': date.today().isoformat(),
+                'customer': customer_id,
+                'sph_left': '-1.25', 'sph_right': '-1.00',
+                'date': date.today().isoformat(),
+            }),
+            ('bill', '/customers/billing/create/', {
+                'customer': customer_id,
+                'products': random.sample(products, 2),
+                'discount': '0',
+                'payment_method': 'CASH',
+            }),
+            ('report', '/customers/sales/', None),
+        ]
+        for step, path, data in steps:
+            if stop.is_set():
+                return
+            started = time.perf_counter()
+            status, body = session.request(path, data)
+            stats.record(step, time.perf_counter() - started, status, body)
+            if think_time:
+                time.sleep(think_time)
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulate N counters against a local server: each logs in as its own staff user and "
+        "repeats search customer, open details, add prescription, create bill, sales report. "
+        "Reports throughput, latency percentiles and SQLite lock errors per step. The server "
+        "and the seeded users and data run on a temporary copy of the database, which is "
+        "removed afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=8, help="Concurrent counters (staff users).")
+        parser.add_argument('--duration', type=int, default=30, help="Seconds to run.")
+        parser.add_argument('--think-time', type=float, default=0, help="Seconds each counter pauses between steps.")
+        parser.add_argument('--port', type=int, default=8765, help="Free port to start runserver on.")
+
+    def handle(self, *args, **options):
+        if settings.DATABASES['default']['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError("load_test copies the SQLite database; it does not support other engines.")
+        port = options['port']
+        # A server already listening would answer in place of ours and be loaded with test data.
+        with socket.socket() as probe:
+            try:
+                probe.bind(('127.0.0.1', port))
+            except OSError:
+                raise CommandError(f"Port {port} is already in use; pass a free --port.")
+
+        workdir = tempfile.mkdtemp(prefix='load-test-')
+        database = os.path.join(workdir, 'db.sqlite3')
+        original = connections['default'].settings_dict['NAME']
+        server, log = None, None
+        try:
+            _copy_database(database)
+            _use_database(database)
+            call_command('migrate', database='default', verbosity=0)
+            _seed(options['users'])
+            server, log = self.start_server(port, database)
+            self.run(f"http://127.0.0.1:{port}", options)
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+                log.seek(0)
+                locked = log.read().count(f'OperationalError: {LOCKED}')
+                self.stdout.write(f"Server log: {locked} '{LOCKED}' error(s).")
+                log.close()
+            _use_database(original)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def start_server(self, port, database):
+        log = tempfile.TemporaryFile(mode='w+')
+        server = subprocess.Popen(
+            [sys.executable, str(settings.BASE_DIR / 'manage.py'), 'runserver', '--noreload', f'127.0.0.1:{port}'],
+            stdout=log, stderr=subprocess.STDOUT, env={**os.environ, 'DJANGO_DB_PATH': database},
+        )
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f"runserver exited with code {server.returncode}.")
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                return server, log
+            except OSError:
+                time.sleep(0.2)
+        server.terminate()
+        raise CommandError(f"runserver did not start on port {port}.")
+
+    def run(self, base_url, options):
+        User = get_user_model()
+        products = list(Product.objects.filter(category__name='Load test').values_list('pk', flat=True))
+        if len(products) < 2:
+            raise CommandError("No load-test products were seeded.")
+
+        counters = []
+        for i in range(1, options['users'] + 1):
+            user = User.objects.filter(username=USERNAME.format(i)).first()
+            if user is None:
+                raise CommandError(f"No user {USERNAME.format(i)} was seeded.")
+            customers = list(Customer.objects.for_user(user).values_list('pk', 'phone'))
+            counters.append((CounterSession(base_url, user.username, PASSWORD), customers))
+
+        stats, stop = Stats(), threading.Event()
+        threads = [
+            threading.Thread(target=_counter, args=(session, customers, products, stop, stats, options['think_time']))
+            for session, customers in counters
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(options['duration'])
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f"{options['users']} counters for {elapsed:.0f}s against {base_url}\n"
+            f"{'step':<14} {'requests':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7} {'locked':>7}"
+        )
+        for step in STEPS:
+            latencies = stats.latencies[step]
+            if len(latencies) < 2:
+                self.stdout.write(f"{step:<14} {len(latencies):>8}")
+                continue
+            cuts = statistics.quantiles(latencies, n=100)
+            self.stdout.write(
+                f"{step:<14} {len(latencies):>8} {len(latencies) / elapsed:>8.1f} {cuts[49] * 1000:>8.1f} "
+                f"{cuts[94] * 1000:>8.1f} {cuts[98] * 1000:>8.1f} {stats.errors[step]:>7} {stats.locked[step]:>7}"
+            )
+        completed = min(len(stats.latencies[step]) for step in STEPS)
+        self.stdout.write(f"Completed visits: {completed} ({completed / elapsed:.1f}/s)")
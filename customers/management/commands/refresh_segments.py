@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from customers.segments import refresh_segments
+
+
+class Command(BaseCommand):
+    help = "Rescore customers by recency, frequency and spend and update the segments that changed, once or every N minutes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=int, metavar='MINUTES',
+                            help="Keep running and refresh every MINUTES minutes.")
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.perf_counter()
+            run = refresh_segments()
+            self.stdout.write(self.style.SUCCESS(
+                f"Scored {run.customers_scored} customers, updated {run.segments_updated} segments "
+                f"({time.perf_counter() - started:.1f}s)."
+            ))
+            if not options['every']:
+                break
+            time.sleep(options['every'] * 60)
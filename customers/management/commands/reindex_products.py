@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from customers.models import Product
+from customers.search import rebuild
+
+
+class Command(BaseCommand):
+    help = "Rebuild the product search index, e.g. after products were written outside the app."
+
+    def handle(self, *args, **options):
+        rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {Product.objects.count()} product(s)."))
@@ -0,0 +1,43 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from customers.invoices import FORMATS, render_batch
+from customers.models import Bill
+
+
+class Command(BaseCommand):
+    help = "Render the invoices for a day or a month into one zip archive."
+
+    def add_arguments(self, parser):
+        period = parser.add_mutually_exclusive_group(required=True)
+        period.add_argument('--date', help="Render bills from this day (YYYY-MM-DD).")
+        period.add_argument('--month', help="Render bills from this month (YYYY-MM).")
+        parser.add_argument('--format', choices=FORMATS, default='a4')
+        parser.add_argument('--workers', type=int, default=None, help="Renderer processes (defaults to CPU count).")
+        parser.add_argument('--output', help="Archive path; defaults to invoices-<period>-<format>.zip.")
+
+    def handle(self, *args, **options):
+        bills = Bill.objects.all()
+        if options['date']:
+            day = parse_date(options['date'])
+            if day is None:
+                raise CommandError("--date must be in YYYY-MM-DD format.")
+            bills = bills.filter(date__date=day)
+            period = options['date']
+        else:
+            month = parse_date(f"{options['month']}-01")
+            if month is None:
+                raise CommandError("--month must be in YYYY-MM format.")
+            bills = bills.filter(date__year=month.year, date__month=month.month)
+            period = options['month']
+
+        output = options['output'] or f"invoices-{period}-{options['format']}.zip"
+        started = time.perf_counter()
+        count = render_batch(bills, output, fmt=options['format'], workers=options['workers'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {count} invoices to {os.path.abspath(output)} in {elapsed:.2f}s."
+        ))
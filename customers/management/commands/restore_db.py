@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from customers.backup import BackupError, restore_backup
+
+
+class Command(BaseCommand):
+    help = "Verify a backup and restore it over a database (a safety backup is taken first)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Backup file created by backup_db.")
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        try:
+            restore_backup(options['path'], options['database'])
+        except BackupError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(f"Restored {options['database']} from {options['path']}."))
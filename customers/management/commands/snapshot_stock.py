@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from customers.stock import drift, take_snapshot
+
+
+class Command(BaseCommand):
+    help = "Snapshot stock per product from the stock movement ledger, once or every N minutes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=int, metavar='MINUTES',
+                            help="Keep running and take a snapshot every MINUTES minutes.")
+
+    def handle(self, *args, **options):
+        while True:
+            snapshot = take_snapshot()
+            self.stdout.write(self.style.SUCCESS(
+                f"Stock snapshot at {snapshot.taken_at:%Y-%m-%d %H:%M}: {snapshot.products} product(s), "
+                f"{snapshot.units} unit(s), {snapshot.value} at cost."
+            ))
+            mismatched = drift(snapshot)
+            if mismatched:
+                self.stdout.write(self.style.WARNING(
+                    f"{len(mismatched)} product(s) differ from their batches: "
+                    f"{', '.join(map(str, mismatched[:20]))}"
+                ))
+            if not options['every']:
+                break
+            time.sleep(options['every'] * 60)
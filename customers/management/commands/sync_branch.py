@@ -0,0 +1,63 @@
+import time
+from urllib.error import URLError
+
+from django.core.management.base import BaseCommand, CommandError
+
+from customers import replication
+from customers.models import SyncPeer
+
+
+class Command(BaseCommand):
+    help = "Exchange customer and catalog changes with another branch over HTTP or through files."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', action='store_true', help="Log existing rows that have never been replicated.")
+        parser.add_argument('--peer', help="Branch id of the other branch.")
+        parser.add_argument('--url', help="The other branch's sync endpoint, e.g. http://branch2:8000/customers/sync/changes/.")
+        parser.add_argument('--export', metavar='PATH', help="Write changes the peer has not seen yet to PATH.")
+        parser.add_argument('--since', type=int, help="With --export: start after this sequence instead of the peer's.")
+        parser.add_argument('--import', dest='import_path', metavar='PATH', help="Apply a change file exported by another branch.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        if options['seed']:
+            self.stdout.write(f"Logged {replication.seed_log()} existing rows.")
+
+        if options['import_path']:
+            counts = replication.import_changes(options['import_path'])
+            self.report('Imported', counts, started)
+
+        if options['export']:
+            peer = self.get_peer(options)
+            since = options['since'] if options['since'] is not None else (peer.last_sent if peer else 0)
+            last_seq = replication.export_changes(options['export'], since, exclude_origin=peer and peer.branch)
+            if peer and options['since'] is None:
+                peer.last_sent = last_seq
+                peer.save(update_fields=['last_sent'])
+            self.stdout.write(self.style.SUCCESS(f"Exported changes {since + 1}-{last_seq} to {options['export']}."))
+
+        if options['url']:
+            peer = self.get_peer(options)
+            if peer is None:
+                raise CommandError("--url needs --peer.")
+            try:
+                received, sent = replication.sync_with(peer)
+            except (URLError, ValueError) as exc:
+                raise CommandError(f"Sync with {peer} failed: {exc}")
+            self.report('Received', received, started)
+            self.report('Sent', sent, started)
+
+    def get_peer(self, options):
+        if not options['peer']:
+            return None
+        peer, _ = SyncPeer.objects.get_or_create(branch=options['peer'])
+        if options['url'] and peer.url != options['url']:
+            peer.url = options['url']
+            peer.save(update_fields=['url'])
+        return peer
+
+    def report(self, label, counts, started):
+        summary = ', '.join(f"{value} {key}" for key, value in counts.items()) or 'nothing'
+        self.stdout.write(self.style.SUCCESS(
+            f"{label}: {summary} in {time.perf_counter() - started:.2f}s."
+        ))
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0017_updated_at_timestamps'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['user', '-created_at'], name='customer_user_created_idx'),
+        ),
+    ]
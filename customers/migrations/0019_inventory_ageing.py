@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:20
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0018_customer_user_created_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventoryAgeingRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('run_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('as_of', models.DateField()),
+                ('batches_checked', models.PositiveIntegerField(default=0)),
+                ('batches_updated', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-run_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='inventory',
+            name='expiry_bucket',
+            field=models.CharField(blank=True, choices=[('expired', 'Expired'), ('critical', 'Expires within 30 days'), ('near', 'Expires within 90 days'), ('ok', 'OK')], editable=False, max_length=10, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='inventory',
+            index=models.Index(fields=['is_active', 'expiry_date'], name='inventory_active_expiry_idx'),
+        ),
+    ]
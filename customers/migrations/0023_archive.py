@@ -0,0 +1,98 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:27
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0022_autocomplete_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedFinancialYear',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_year', models.PositiveIntegerField(unique=True)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('counts', models.JSONField(default=dict)),
+            ],
+            options={
+                'ordering': ['-start_year'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedBill',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_id', models.BigIntegerField(unique=True)),
+                ('financial_year', models.PositiveIntegerField()),
+                ('date', models.DateTimeField()),
+                ('customer_id', models.BigIntegerField()),
+                ('customer_name', models.CharField(blank=True, max_length=201, null=True)),
+                ('customer_user_id', models.BigIntegerField(null=True)),
+                ('product_ids', models.JSONField(default=list)),
+                ('discount', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('total', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('payment_method', models.CharField(max_length=4)),
+                ('created_by_id', models.BigIntegerField(null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['customer_user_id', 'date'], name='archived_bill_user_date_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedCustomerHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_id', models.BigIntegerField(unique=True)),
+                ('financial_year', models.PositiveIntegerField()),
+                ('customer_id', models.BigIntegerField()),
+                ('customer_user_id', models.BigIntegerField(null=True)),
+                ('date', models.DateTimeField()),
+                ('description', models.CharField(max_length=255)),
+                ('details', models.JSONField(default=dict)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['customer_id', 'date'], name='archived_history_cust_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedPurchase',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_id', models.BigIntegerField(unique=True)),
+                ('financial_year', models.PositiveIntegerField()),
+                ('customer_id', models.BigIntegerField(null=True)),
+                ('customer_user_id', models.BigIntegerField(null=True)),
+                ('product_type', models.CharField(blank=True, max_length=50, null=True)),
+                ('details', models.JSONField(default=dict)),
+                ('date_of_purchase', models.DateField(null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['customer_id', 'date_of_purchase'], name='archived_purchase_cust_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedSale',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_id', models.BigIntegerField(unique=True)),
+                ('financial_year', models.PositiveIntegerField()),
+                ('date', models.DateField()),
+                ('product_id', models.BigIntegerField(null=True)),
+                ('product_name', models.CharField(blank=True, max_length=100, null=True)),
+                ('category_id', models.BigIntegerField(null=True)),
+                ('category_name', models.CharField(blank=True, max_length=100, null=True)),
+                ('quantity', models.PositiveIntegerField()),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('total', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('created_by_id', models.BigIntegerField(null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['created_by_id', 'date'], name='archived_sale_user_date_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,97 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:36
+
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+REPLICATED = ['customer', 'product', 'productcategory', 'supplier']
+
+
+def populate_sync_uids(apps, schema_editor):
+    # A column default is evaluated once, so existing rows get their own uuid here.
+    for model_name in REPLICATED:
+        model = apps.get_model('customers', model_name)
+        rows = list(model.objects.only('pk'))
+        for row in rows:
+            row.sync_uid = uuid.uuid4()
+        model.objects.bulk_update(rows, ['sync_uid'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0023_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncPeer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('branch', models.CharField(max_length=32, unique=True)),
+                ('url', models.URLField(blank=True)),
+                ('last_received', models.BigIntegerField(default=0)),
+                ('last_sent', models.BigIntegerField(default=0)),
+                ('last_synced_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='sync_uid',
+            field=models.UUIDField(null=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='sync_uid',
+            field=models.UUIDField(null=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='productcategory',
+            name='sync_uid',
+            field=models.UUIDField(null=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='supplier',
+            name='sync_uid',
+            field=models.UUIDField(null=True, editable=False),
+        ),
+        migrations.RunPython(populate_sync_uids, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='customer',
+            name='sync_uid',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='sync_uid',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='productcategory',
+            name='sync_uid',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='supplier',
+            name='sync_uid',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+        ),
+        migrations.CreateModel(
+            name='ChangeLogEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('origin', models.CharField(max_length=32)),
+                ('origin_seq', models.BigIntegerField(blank=True, null=True)),
+                ('model', models.CharField(max_length=50)),
+                ('uid', models.UUIDField()),
+                ('op', models.CharField(choices=[('S', 'Save'), ('D', 'Delete')], max_length=1)),
+                ('data', models.JSONField(default=dict)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['model', 'uid', '-changed_at'], name='changelog_object_idx')],
+                'constraints': [models.UniqueConstraint(fields=('origin', 'origin_seq'), name='unique_changelog_origin_seq')],
+            },
+        ),
+    ]
@@ -0,0 +1,140 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:49
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+from django.utils import timezone
+
+PRESCRIPTION_FIELDS = (
+    'sph_left', 'cyl_left', 'axis_left', 'add_left', 'vision_left',
+    'sph_right', 'cyl_right', 'axis_right', 'add_right', 'vision_right',
+)
+BATCH_SIZE = 2000
+
+
+def populate_sync_uids(apps, schema_editor):
+    Prescription = apps.get_model('customers', 'Prescription')
+    rows = list(Prescription.objects.only('pk'))
+    for row in rows:
+        row.sync_uid = uuid.uuid4()
+    Prescription.objects.bulk_update(rows, ['sync_uid'], batch_size=500)
+
+
+def _refresh_latest(Customer, Prescription):
+    newest = Prescription.objects.filter(customer=OuterRef('pk')).order_by(
+        F('date').desc(nulls_last=True), '-id'
+    ).values('id')[:1]
+    Customer.objects.update(latest_prescription=Subquery(newest))
+
+
+def move_prescriptions(apps, schema_editor):
+    """Turn the readings stored on each customer into a Prescription row, unless one already matches."""
+    Customer = apps.get_model('customers', 'Customer')
+    Prescription = apps.get_model('customers', 'Prescription')
+    rows = (
+        Customer.objects.exclude(**{f'{name}__isnull': True for name in PRESCRIPTION_FIELDS})
+        .values('id', 'prescription_date', 'created_at', *PRESCRIPTION_FIELDS)
+        .order_by('id')
+    )
+    batch = []
+    for row in rows.iterator(chunk_size=BATCH_SIZE):
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            _create_prescriptions(Prescription, batch)
+            batch = []
+    _create_prescriptions(Prescription, batch)
+    _refresh_latest(Customer, Prescription)
+
+
+def _create_prescriptions(Prescription, rows):
+    existing = set(
+        Prescription.objects.filter(customer_id__in=[row['id'] for row in rows])
+        .values_list('customer_id', *PRESCRIPTION_FIELDS)
+    )
+    Prescription.objects.bulk_create([
+        Prescription(
+            customer_id=row['id'],
+            date=row['prescription_date'] or (row['created_at'] or timezone.now()).date(),
+            sync_uid=uuid.uuid4(),
+            **{name: row[name] for name in PRESCRIPTION_FIELDS},
+        )
+        for row in rows
+        if (row['id'], *(row[name] for name in PRESCRIPTION_FIELDS)) not in existing
+    ], batch_size=500)
+
+
+def restore_customer_columns(apps, schema_editor):
+    Customer = apps.get_model('customers', 'Customer')
+    Prescription = apps.get_model('customers', 'Prescription')
+    for name in PRESCRIPTION_FIELDS:
+        Customer.objects.update(**{name: Subquery(
+            Prescription.objects.filter(pk=OuterRef('latest_prescription')).values(name)[:1]
+        )})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0024_replication'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='latest_prescription',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='customers.prescription'),
+        ),
+        migrations.AddField(
+            model_name='prescription',
+            name='sync_uid',
+            field=models.UUIDField(null=True, editable=False),
+        ),
+        migrations.RunPython(populate_sync_uids, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='prescription',
+            name='sync_uid',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+        ),
+        migrations.RunPython(move_prescriptions, restore_customer_columns),
+        migrations.RemoveField(
+            model_name='customer',
+            name='add_left',
+        ),
+        migrations.RemoveField(
+            model_name='customer',
+            name='add_right',
+        ),
+        migrations.RemoveField(
+            model_name='customer',
+            name='axis_left',
+        ),
+        migrations.RemoveField(
+            model_name='customer',
+            name='axis_right',
+        ),
+        migrations.RemoveField(
+            model_name='customer',
+            name='cyl_left',
+        ),
+        migrations.RemoveField(
+            model_name='customer',
+            name='cyl_right',
+        ),
+        migrations.RemoveField(
+            model_name='customer',
+            name='sph_left',
+        ),
+        migrations.RemoveField(
+            model_name='customer',
+            name='sph_right',
+        ),
+        migrations.RemoveField(
+            model_name='customer',
+            name='vision_left',
+        ),
+        migrations.RemoveField(
+            model_name='customer',
+            name='vision_right',
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:58
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0027_admin_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SegmentRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('run_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('customers_scored', models.PositiveIntegerField(default=0)),
+                ('segments_updated', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-run_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='CustomerSegment',
+            fields=[
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='segment', serialize=False, to='customers.customer')),
+                ('segment', models.CharField(choices=[('champion', 'Champions'), ('loyal', 'Loyal'), ('recent', 'Recent'), ('at_risk', 'At risk'), ('lapsed', 'Lapsed'), ('prospect', 'No purchases yet')], max_length=10)),
+                ('last_activity', models.DateField(blank=True, null=True)),
+                ('frequency', models.PositiveIntegerField(default=0)),
+                ('monetary', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('recency_score', models.PositiveSmallIntegerField(default=0)),
+                ('frequency_score', models.PositiveSmallIntegerField(default=0)),
+                ('monetary_score', models.PositiveSmallIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'segment'], name='segment_user_segment_idx')],
+            },
+        ),
+    ]
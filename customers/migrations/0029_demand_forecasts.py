@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:01
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0028_customer_segments'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ForecastRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('run_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('as_of', models.DateField()),
+                ('products_forecast', models.PositiveIntegerField(default=0)),
+                ('forecasts_updated', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-run_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='supplier',
+            name='lead_time_days',
+            field=models.PositiveIntegerField(default=7),
+        ),
+        migrations.CreateModel(
+            name='ProductForecast',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='forecast', serialize=False, to='customers.product')),
+                ('lead_time_days', models.PositiveIntegerField()),
+                ('weekly_demand', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('demand_error', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('reorder_point', models.PositiveIntegerField()),
+                ('order_up_to', models.PositiveIntegerField()),
+                ('updated_at', models.DateTimeField()),
+                ('supplier', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='customers.supplier')),
+            ],
+        ),
+    ]
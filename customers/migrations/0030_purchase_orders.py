@@ -0,0 +1,90 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:06
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def populate_stock_on_hand(apps, schema_editor):
+    Inventory = apps.get_model('customers', 'Inventory')
+    Product = apps.get_model('customers', 'Product')
+    units = Inventory.objects.filter(product=OuterRef('pk'), is_active=True).values(
+        'product'
+    ).annotate(units=Sum('quantity')).values('units')
+    Product.objects.update(stock_on_hand=Coalesce(Subquery(units), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0029_demand_forecasts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='stock_on_hand',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='GoodsReceipt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('received_date', models.DateField(default=django.utils.timezone.localdate)),
+                ('reference', models.CharField(blank=True, max_length=50, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('ledger_entry', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='customers.supplierledgerentry')),
+                ('supplier', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='goods_receipts', to='customers.supplier')),
+            ],
+            options={
+                'ordering': ['-received_date', '-id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='inventory',
+            name='goods_receipt',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='batches', to='customers.goodsreceipt'),
+        ),
+        migrations.CreateModel(
+            name='PurchaseOrder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('draft', 'Draft'), ('ordered', 'Ordered'), ('partial', 'Partially received'), ('received', 'Received'), ('cancelled', 'Cancelled')], default='draft', max_length=10)),
+                ('order_date', models.DateField(default=django.utils.timezone.localdate)),
+                ('expected_date', models.DateField(blank=True, null=True)),
+                ('notes', models.CharField(blank=True, max_length=255, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('supplier', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='purchase_orders', to='customers.supplier')),
+            ],
+            options={
+                'ordering': ['-order_date', '-id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='goodsreceipt',
+            name='purchase_order',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='receipts', to='customers.purchaseorder'),
+        ),
+        migrations.CreateModel(
+            name='PurchaseOrderLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity_ordered', models.PositiveIntegerField()),
+                ('quantity_received', models.PositiveIntegerField(default=0)),
+                ('unit_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='customers.purchaseorder')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='customers.product')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['supplier', 'status'], name='po_supplier_status_idx'),
+        ),
+        migrations.RunPython(populate_stock_on_hand, migrations.RunPython.noop),
+    ]
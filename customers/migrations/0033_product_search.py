@@ -0,0 +1,23 @@
+from django.db import migrations
+
+INDEXED = 'name, brand, model_number, sku, description, hsn_code'
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0032_stock_movements'),
+    ]
+
+    operations = [
+        # Full-text index of the product catalog, kept current by customers.search.
+        migrations.RunSQL(
+            [
+                f"CREATE VIRTUAL TABLE customers_product_search USING fts5("
+                f"{INDEXED}, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+                f"INSERT INTO customers_product_search (rowid, {INDEXED}) "
+                f"SELECT id, {INDEXED} FROM customers_product",
+            ],
+            "DROP TABLE customers_product_search",
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:19
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0033_product_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('mrp', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('previous_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('previous_mrp', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('effective_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('reason', models.CharField(blank=True, max_length=100, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_history', to='customers.product')),
+            ],
+            options={
+                'ordering': ['-effective_at', '-id'],
+                'indexes': [models.Index(fields=['product', 'effective_at'], name='price_history_product_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:38
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0034_price_history'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ParkedChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('origin', models.CharField(max_length=32)),
+                ('origin_seq', models.BigIntegerField()),
+                ('change', models.JSONField()),
+                ('error', models.CharField(max_length=255)),
+                ('parked_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['id'],
+                'constraints': [models.UniqueConstraint(fields=('origin', 'origin_seq'), name='unique_parked_change')],
+            },
+        ),
+    ]
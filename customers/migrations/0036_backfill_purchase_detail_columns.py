@@ -0,0 +1,54 @@
+from decimal import Decimal, InvalidOperation
+
+from django.db import migrations
+
+BATCH_SIZE = 2000
+
+
+# Copies of the parsers in customers.models as they were when this migration was written.
+def _parse_price(value):
+    """Form input arrives as numbers or strings like '1,250' or ''; anything else is None."""
+    if isinstance(value, str):
+        value = value.replace(',', '').strip()
+    if value in (None, '') or isinstance(value, bool):
+        return None
+    try:
+        price = Decimal(str(value)).quantize(Decimal('0.01'))
+    except (InvalidOperation, ValueError):
+        return None
+    return price if price.is_finite() and abs(price) < Decimal('1e8') else None
+
+
+def _parse_text(value, max_length):
+    value = str(value).strip() if value is not None else ''
+    return value[:max_length] or None
+
+
+def fill_detail_columns(apps, schema_editor):
+    # 0026 added the typed columns empty; rows saved before it only have ``details``.
+    Purchase = apps.get_model('customers', 'Purchase')
+    fields = ['lens_price', 'frame_price', 'lens_type', 'frame_model']
+    last_id = 0
+    while True:
+        batch = list(Purchase.objects.filter(pk__gt=last_id).order_by('pk').only('pk', 'details', *fields)[:BATCH_SIZE])
+        if not batch:
+            return
+        for purchase in batch:
+            details = purchase.details if isinstance(purchase.details, dict) else {}
+            purchase.lens_price = _parse_price(details.get('lens_price'))
+            purchase.frame_price = _parse_price(details.get('frame_price'))
+            purchase.lens_type = _parse_text(details.get('lens_type'), 50)
+            purchase.frame_model = _parse_text(details.get('frame_model'), 100)
+        Purchase.objects.bulk_update(batch, fields, batch_size=500)
+        last_id = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0035_parked_change'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_detail_columns, migrations.RunPython.noop),
+    ]
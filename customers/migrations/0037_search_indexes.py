@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:46
+
+import django.db.models.functions.comparison
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0036_backfill_purchase_detail_columns'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(django.db.models.functions.comparison.Collate('phone', 'NOCASE'), name='customer_phone_nocase_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(django.db.models.functions.comparison.Collate('first_name', 'NOCASE'), name='customer_first_nocase_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(django.db.models.functions.comparison.Collate('last_name', 'NOCASE'), name='customer_last_nocase_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='goodsreceipt',
+            index=models.Index(fields=['reference'], name='receipt_reference_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(django.db.models.functions.comparison.Collate('name', 'NOCASE'), name='product_name_nocase_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(django.db.models.functions.comparison.Collate('brand', 'NOCASE'), name='product_brand_nocase_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchase',
+            index=models.Index(django.db.models.functions.comparison.Collate('frame_model', 'NOCASE'), name='purchase_frame_nocase_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['reference'], name='movement_reference_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supplier',
+            index=models.Index(django.db.models.functions.comparison.Collate('name', 'NOCASE'), name='supplier_name_nocase_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supplierledgerentry',
+            index=models.Index(fields=['reference'], name='ledger_reference_idx'),
+        ),
+    ]
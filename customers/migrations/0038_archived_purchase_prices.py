@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:48
+
+from django.db import migrations, models
+
+from customers.models import _parse_price
+
+BATCH_SIZE = 2000
+
+
+def fill_prices(apps, schema_editor):
+    # Runs on the archive database (see the hints below); rows archived before
+    # this migration only have the prices inside ``details``.
+    ArchivedPurchase = apps.get_model('customers', 'ArchivedPurchase')
+    rows = ArchivedPurchase.objects.using(schema_editor.connection.alias)
+    last_id = 0
+    while True:
+        batch = list(rows.filter(pk__gt=last_id).order_by('pk').only('pk', 'details')[:BATCH_SIZE])
+        if not batch:
+            return
+        for purchase in batch:
+            details = purchase.details if isinstance(purchase.details, dict) else {}
+            purchase.lens_price = _parse_price(details.get('lens_price'))
+            purchase.frame_price = _parse_price(details.get('frame_price'))
+        rows.bulk_update(batch, ['lens_price', 'frame_price'], batch_size=500)
+        last_id = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0037_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedpurchase',
+            name='frame_price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='archivedpurchase',
+            name='lens_price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.RunPython(fill_prices, migrations.RunPython.noop, hints={'model_name': 'archivedpurchase'}),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0038_archived_purchase_prices'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stocktake',
+            name='last_batch_id',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
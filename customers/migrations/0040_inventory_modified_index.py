@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:06
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0039_stock_take_last_batch'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inventory',
+            index=models.Index(fields=['last_modified'], name='inventory_modified_idx'),
+        ),
+    ]
@@ -1,9 +1,29 @@
-from django.db import models
+import uuid
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+from django.db import models, transaction
 from django.utils import timezone
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator, RegexValidator
+from django.db.models.functions import Coalesce, Collate
 from django.db.models import JSONField  # For PostgreSQL, or use models.JSONField in Django 3.1+
 
+
+# Tenant scoping
+class TenantQuerySet(models.QuerySet):
+    """
+    Restricts rows to those owned by a user. Each model names the lookup that
+    leads to the owning user in ``owner_lookup`` so the ownership check is part
+    of the same SQL query (a join through ``customer__user`` where needed)
+    instead of a fetch followed by a Python comparison.
+    """
+    def for_user(self, user):
+        return self.filter(**{self.model.owner_lookup: getattr(user, 'pk', user)})
+
+
+TenantManager = models.Manager.from_queryset(TenantQuerySet)
+
+
 # Customer Model
 class Customer(models.Model):
     class Gender(models.TextChoices):
@@ -23,31 +43,46 @@ class Customer(models.Model):
     prescription_date = models.DateField(null=True, blank=True)
     additional_info = models.TextField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True,null=True,blank=True)
+    updated_at = models.DateTimeField(auto_now=True, null=True, blank=True)
 
-    # Prescription Details
-    sph_left = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
-    sph_right = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
-    cyl_left = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
-    cyl_right = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
-    axis_left = models.IntegerField(
-        null=True, blank=True,
-        validators=[MinValueValidator(0), MaxValueValidator(180)]
-    )
-    axis_right = models.IntegerField(
-        null=True, blank=True,
-        validators=[MinValueValidator(0), MaxValueValidator(180)]
+    # Newest of the customer's prescriptions, kept current by customers.signals.
+    latest_prescription = models.ForeignKey(
+        'Prescription', on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
     )
-    add_left = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
-    add_right = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
-    vision_left = models.CharField(max_length=255, null=True, blank=True)
-    vision_right = models.CharField(max_length=255, null=True, blank=True)
+    # Identifies the row across branches (see customers.replication).
+    sync_uid = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+
+    owner_lookup = 'user'
+    objects = TenantManager()
 
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
 
+    def full_name(self):
+        return " ".join(filter(None, [self.first_name, self.last_name]))
+
+    @staticmethod
+    def refresh_latest_prescription(customer_ids):
+        """Point each customer at their newest prescription (by date, then id)."""
+        newest = Prescription.objects.filter(customer=models.OuterRef('pk')).order_by(
+            models.F('date').desc(nulls_last=True), '-id'
+        ).values('id')[:1]
+        Customer.objects.filter(pk__in=customer_ids).update(latest_prescription=models.Subquery(newest))
+
     class Meta:
         unique_together = ('user', 'phone')
         ordering = ['-prescription_date']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='customer_user_created_idx'),
+            models.Index(fields=['user', 'first_name'], name='customer_user_first_name_idx'),
+            models.Index(fields=['user', 'last_name'], name='customer_user_last_name_idx'),
+            models.Index(fields=['phone'], name='customer_phone_idx'),
+            # Admin '^' searches are case-insensitive LIKE 'term%', which SQLite
+            # only answers from an index with the NOCASE collation.
+            models.Index(Collate('phone', 'NOCASE'), name='customer_phone_nocase_idx'),
+            models.Index(Collate('first_name', 'NOCASE'), name='customer_first_nocase_idx'),
+            models.Index(Collate('last_name', 'NOCASE'), name='customer_last_nocase_idx'),
+        ]
 
         
 # Purchase Model
@@ -56,18 +91,86 @@ class Purchase(models.Model):
     product_type = models.CharField(max_length=50,null=True,blank=True)  # e.g., spectacles, sunglasses, lenses, etc.
     details = JSONField(default=dict)  # Provide a default value
     date_of_purchase = models.DateField(default=timezone.now, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, null=True, blank=True)
+
+    # Typed copies of the commonly queried ``details`` keys, filled on save
+    # (older rows by migration 0036, or ``manage.py backfill_purchase_columns``).
+    lens_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    frame_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    lens_type = models.CharField(max_length=50, null=True, blank=True)
+    frame_model = models.CharField(max_length=100, null=True, blank=True)
+
+    DETAIL_COLUMNS = ('lens_price', 'frame_price', 'lens_type', 'frame_model')
+
+    owner_lookup = 'customer__user'
+    objects = TenantManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['date_of_purchase'], name='purchase_date_idx'),
+            models.Index(fields=['lens_type'], name='purchase_lens_type_idx'),
+            models.Index(fields=['frame_model'], name='purchase_frame_model_idx'),
+            models.Index(Collate('frame_model', 'NOCASE'), name='purchase_frame_nocase_idx'),
+        ]
 
     def __str__(self):
         return f"Purchase for {self.customer.full_name()} on {self.date_of_purchase}"
-    
+
+    def save(self, *args, **kwargs):
+        self.fill_detail_columns()
+        super().save(*args, **kwargs)
+
+    def fill_detail_columns(self):
+        """Copy the typed keys out of ``details``; returns True if a column changed."""
+        details = self.details if isinstance(self.details, dict) else {}
+        values = {
+            'lens_price': _parse_price(details.get('lens_price')),
+            'frame_price': _parse_price(details.get('frame_price')),
+            'lens_type': _parse_text(details.get('lens_type'), 50),
+            'frame_model': _parse_text(details.get('frame_model'), 100),
+        }
+        changed = any(getattr(self, name) != value for name, value in values.items())
+        for name, value in values.items():
+            setattr(self, name, value)
+        return changed
+
     def total_cost(self):
-        # Calculate total cost based on details (e.g., lens_price + frame_price)
-        lens_price = self.details.get('lens_price', 0) or 0
-        frame_price = self.details.get('frame_price', 0) or 0
-        return lens_price + frame_price
+        return (self.lens_price or 0) + (self.frame_price or 0)
+
+    @classmethod
+    def revenue_expression(cls):
+        money = models.DecimalField(max_digits=12, decimal_places=2)
+        return (
+            Coalesce('lens_price', models.Value(Decimal('0')), output_field=money)
+            + Coalesce('frame_price', models.Value(Decimal('0')), output_field=money)
+        )
+
+
+def _parse_price(value):
+    """Form input arrives as numbers or strings like '1,250' or ''; anything else is None."""
+    if isinstance(value, str):
+        value = value.replace(',', '').strip()
+    if value in (None, '') or isinstance(value, bool):
+        return None
+    try:
+        price = Decimal(str(value)).quantize(Decimal('0.01'))
+    except (InvalidOperation, ValueError):
+        return None
+    return price if price.is_finite() and abs(price) < Decimal('1e8') else None
+
+
+def _parse_text(value, max_length):
+    value = str(value).strip() if value is not None else ''
+    return value[:max_length] or None
 
 
 # Prescription Model
+PRESCRIPTION_FIELDS = (
+    'sph_left', 'cyl_left', 'axis_left', 'add_left', 'vision_left',
+    'sph_right', 'cyl_right', 'axis_right', 'add_right', 'vision_right',
+)
+
+
 class Prescription(models.Model):
     customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='prescriptions')
     sph_left = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
@@ -81,6 +184,11 @@ class Prescription(models.Model):
     vision_left = models.CharField(max_length=255, null=True, blank=True)
     vision_right = models.CharField(max_length=255, null=True, blank=True)
     date = models.DateField(default=timezone.now, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, null=True, blank=True)
+    sync_uid = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+
+    owner_lookup = 'customer__user'
+    objects = TenantManager()
 
     def __str__(self):
         return f"Prescription for {self.customer.full_name()} on {self.date}"
@@ -93,6 +201,9 @@ class CustomerHistory(models.Model):
     description = models.CharField(max_length=255)
     details = models.JSONField(default=dict)
 
+    owner_lookup = 'customer__user'
+    objects = TenantManager()
+
     def __str__(self):
         return f"{self.customer.full_name()} - {self.description} on {self.date}"
 
@@ -100,6 +211,8 @@ class CustomerHistory(models.Model):
 # Product Category Model
 class ProductCategory(models.Model):
     name = models.CharField(max_length=100, unique=True)
+    # Identifies the row across branches (see customers.replication).
+    sync_uid = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
 
     def __str__(self):
         return self.name
@@ -126,10 +239,38 @@ class Supplier(models.Model):
     address = models.TextField(null=True, blank=True)
     payment_terms = models.CharField(max_length=100, blank=True, null=True)
     credit_limit = models.DecimalField(max_digits=12, decimal_places=2, default=0, null=True, blank=True)
+    # Days from placing an order to receiving it; sizes the forecast reorder points.
+    lead_time_days = models.PositiveIntegerField(default=7)
+    # Amount owed to the supplier, kept current by SupplierLedgerEntry so
+    # credit-limit checks never have to sum the ledger.
+    balance = models.DecimalField(max_digits=14, decimal_places=2, default=0, editable=False)
+    # Identifies the row across branches (see customers.replication).
+    sync_uid = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+
+    class Meta:
+        # For case-insensitive prefix searches (see Customer.Meta).
+        indexes = [models.Index(Collate('name', 'NOCASE'), name='supplier_name_nocase_idx')]
 
     def __str__(self):
         return self.name
 
+    @property
+    def credit_days(self):
+        """Days of credit implied by ``payment_terms`` ('COD' -> 0, '30D' -> 30)."""
+        digits = ''.join(ch for ch in (self.payment_terms or '') if ch.isdigit())
+        return int(digits) if digits else 0
+
+    def available_credit(self):
+        if not self.credit_limit:
+            return None
+        return self.credit_limit - self.balance
+
+    def recalculate_balance(self):
+        """Rebuild ``balance`` from the ledger in one aggregate query."""
+        self.balance = SupplierLedgerEntry.balance_for(self.ledger_entries.all())
+        Supplier.objects.filter(pk=self.pk).update(balance=self.balance)
+        return self.balance
+
 
 # Product Model
 class Product(models.Model):
@@ -148,6 +289,8 @@ class Product(models.Model):
     category = models.ForeignKey(ProductCategory, on_delete=models.CASCADE, null=True, blank=True)
     brand = models.CharField(max_length=100, null=True, blank=True)
     model_number = models.CharField(max_length=50, null=True, blank=True)
+    sku = models.CharField(max_length=32, unique=True, null=True, blank=True)
+    barcode = models.CharField(max_length=32, unique=True, null=True, blank=True)
     description = models.TextField(null=True, blank=True)
     price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     gst_percentage = models.DecimalField(max_digits=5, decimal_places=2, default=18.0)
@@ -160,6 +303,19 @@ class Product(models.Model):
     frame_material = models.CharField(max_length=2, choices=FRAME_MATERIALS, blank=True, null=True)
     base_curve = models.DecimalField(max_digits=4, decimal_places=2, blank=True, null=True)
     diameter = models.DecimalField(max_digits=4, decimal_places=2, blank=True, null=True)
+    # Units across active batches, kept current by refresh_stock().
+    stock_on_hand = models.PositiveIntegerField(default=0, editable=False)
+    # Identifies the row across branches (see customers.replication).
+    sync_uid = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['name'], name='product_name_idx'),
+            models.Index(fields=['brand'], name='product_brand_idx'),
+            # For case-insensitive prefix searches (see Customer.Meta).
+            models.Index(Collate('name', 'NOCASE'), name='product_name_nocase_idx'),
+            models.Index(Collate('brand', 'NOCASE'), name='product_brand_nocase_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.brand})"
@@ -167,12 +323,70 @@ class Product(models.Model):
     def total_cost(self):
         return self.price * (1 + (self.gst_percentage / 100))
 
+    def save(self, *args, **kwargs):
+        # Every change of price or MRP is kept in PriceHistory.
+        with transaction.atomic():
+            previous = None
+            if self.pk:
+                previous = Product.objects.filter(pk=self.pk).values('price', 'mrp').first()
+            super().save(*args, **kwargs)
+            if previous is not None and (previous['price'], previous['mrp']) != (self.price, self.mrp):
+                PriceHistory.objects.create(
+                    product=self,
+                    price=self.price,
+                    mrp=self.mrp,
+                    previous_price=previous['price'],
+                    previous_mrp=previous['mrp'],
+                )
+
+    @staticmethod
+    def refresh_stock(product_ids):
+        """Recompute ``stock_on_hand`` from the active batches of the given products."""
+        units = Inventory.objects.filter(product=models.OuterRef('pk'), is_active=True).values(
+            'product'
+        ).annotate(units=models.Sum('quantity')).values('units')
+        Product.objects.filter(pk__in=product_ids).update(
+            stock_on_hand=Coalesce(models.Subquery(units), 0)
+        )
+
+
+# Price History Model
+class PriceHistory(models.Model):
+    """
+    One row per change of a product's price or MRP, effective from
+    ``effective_at``. Bills and reports resolve past prices through
+    customers.pricing.price_at.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='price_history')
+    price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    mrp = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    previous_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    previous_mrp = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    effective_at = models.DateTimeField(default=timezone.now)
+    reason = models.CharField(max_length=100, blank=True, null=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+
+    class Meta:
+        ordering = ['-effective_at', '-id']
+        indexes = [
+            models.Index(fields=['product', 'effective_at'], name='price_history_product_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}: {self.previous_price} -> {self.price} from {self.effective_at}"
+
 
 # Inventory Model
 class Inventory(models.Model):
+    class ExpiryBucket(models.TextChoices):
+        EXPIRED = 'expired', 'Expired'
+        CRITICAL = 'critical', 'Expires within 30 days'
+        NEAR = 'near', 'Expires within 90 days'
+        OK = 'ok', 'OK'
+
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     supplier = models.ForeignKey(Supplier, on_delete=models.SET_NULL, null=True, blank=True)
-    batch_number = models.CharField(max_length=50, null=True, blank=True)
+    batch_number = models.CharField(max_length=50, null=True, blank=True, db_index=True)
     quantity = models.PositiveIntegerField()
     purchase_price = models.DecimalField(max_digits=10, decimal_places=2)
     selling_price = models.DecimalField(max_digits=10, decimal_places=2)
@@ -182,7 +396,19 @@ class Inventory(models.Model):
     mfg_date = models.DateField(null=True, blank=True)
     import_duty = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
+    goods_receipt = models.ForeignKey('GoodsReceipt', on_delete=models.SET_NULL, null=True, blank=True, related_name='batches')
     last_modified = models.DateTimeField(auto_now=True)
+    # Maintained by the ageing job (customers.ageing), not edited by hand.
+    expiry_bucket = models.CharField(max_length=10, choices=ExpiryBucket.choices, null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['is_active', 'expiry_date'], name='inventory_active_expiry_idx'),
+            models.Index(fields=['last_modified'], name='inventory_modified_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'batch_number'], name='unique_product_batch'),
+        ]
 
     def __str__(self):
         return f"{self.product.name} - Batch: {self.batch_number}"
@@ -193,6 +419,395 @@ class Inventory(models.Model):
     def total_value(self):
         return self.quantity * self.selling_price
 
+    def save(self, *args, **kwargs):
+        # Every change of quantity is posted to the stock movement ledger.
+        with transaction.atomic():
+            previous = None
+            if self.pk:
+                previous = Inventory.objects.filter(pk=self.pk).values_list('quantity', flat=True).first()
+            super().save(*args, **kwargs)
+            change = self.quantity - (previous or 0)
+            if change:
+                StockMovement.objects.create(
+                    product_id=self.product_id,
+                    inventory=self,
+                    kind=StockMovement.Kind.RECEIPT if previous is None else StockMovement.Kind.ADJUSTMENT,
+                    quantity=change,
+                    unit_cost=self.purchase_price,
+                    reference=self.batch_number,
+                    created_by_id=self.created_by_id if previous is None else None,
+                )
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            if self.quantity:
+                StockMovement.objects.create(
+                    product_id=self.product_id,
+                    inventory=self,
+                    kind=StockMovement.Kind.ADJUSTMENT,
+                    quantity=-self.quantity,
+                    unit_cost=self.purchase_price,
+                    reference=self.batch_number,
+                )
+            return super().delete(*args, **kwargs)
+
+
+# Stock Movement Model
+class StockMovement(models.Model):
+    """
+    Append-only ledger of stock changes. ``quantity`` is signed: receipts and
+    returns are positive, sales negative, adjustments and transfers either.
+    Stock at any moment is the nearest ``StockSnapshot`` plus the movements
+    after it (see customers.stock).
+    """
+    class Kind(models.TextChoices):
+        OPENING = 'opening', 'Opening balance'
+        RECEIPT = 'receipt', 'Receipt'
+        SALE = 'sale', 'Sale'
+        RETURN = 'return', 'Return'
+        ADJUSTMENT = 'adjustment', 'Adjustment'
+        TRANSFER = 'transfer', 'Transfer'
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_movements')
+    inventory = models.ForeignKey(Inventory, on_delete=models.SET_NULL, null=True, blank=True, related_name='movements')
+    kind = models.CharField(max_length=10, choices=Kind.choices)
+    quantity = models.IntegerField()
+    unit_cost = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    occurred_at = models.DateTimeField(default=timezone.now)
+    # Batch, goods receipt, stock take or bill the movement came from.
+    reference = models.CharField(max_length=50, blank=True, null=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+
+    class Meta:
+        ordering = ['occurred_at', 'id']
+        indexes = [
+            models.Index(fields=['occurred_at'], name='movement_occurred_idx'),
+            models.Index(fields=['product', 'occurred_at'], name='movement_product_occurred_idx'),
+            models.Index(fields=['reference'], name='movement_reference_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.quantity:+d} of {self.product_id}"
+
+    def save(self, *args, **kwargs):
+        if self.pk:
+            raise ValueError("Stock movements cannot be changed; post a new movement instead.")
+        super().save(*args, **kwargs)
+
+
+# Stock Snapshot Model
+class StockSnapshot(models.Model):
+    # Movements up to and including this id are folded into the snapshot lines.
+    last_movement_id = models.PositiveBigIntegerField(default=0)
+    taken_at = models.DateTimeField(default=timezone.now, db_index=True)
+    products = models.PositiveIntegerField(default=0)
+    units = models.IntegerField(default=0)
+    value = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['-taken_at']
+
+    def __str__(self):
+        return f"Stock snapshot at {self.taken_at} ({self.units} units)"
+
+
+# Stock Snapshot Line Model
+class StockSnapshotLine(models.Model):
+    snapshot = models.ForeignKey(StockSnapshot, on_delete=models.CASCADE, related_name='lines')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    units = models.IntegerField()
+    value = models.DecimalField(max_digits=14, decimal_places=2)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['snapshot', 'product'], name='unique_snapshot_product'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}: {self.units}"
+
+
+# Supplier Ledger Entry Model
+class SupplierLedgerEntry(models.Model):
+    class EntryType(models.TextChoices):
+        INVOICE = 'INV', 'Purchase Invoice'
+        PAYMENT = 'PAY', 'Payment'
+        DEBIT_NOTE = 'DBN', 'Debit Note'
+
+    supplier = models.ForeignKey(Supplier, on_delete=models.PROTECT, related_name='ledger_entries')
+    entry_type = models.CharField(max_length=3, choices=EntryType.choices)
+    date = models.DateField(default=timezone.localdate)
+    due_date = models.DateField(null=True, blank=True)
+    reference = models.CharField(max_length=50, blank=True, null=True)
+    amount = models.DecimalField(max_digits=12, decimal_places=2, validators=[MinValueValidator(0)])
+    inventory = models.ForeignKey(Inventory, on_delete=models.SET_NULL, null=True, blank=True, related_name='ledger_entries')
+    notes = models.CharField(max_length=255, blank=True, null=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['date', 'id']
+        indexes = [
+            models.Index(fields=['supplier', 'date', 'id'], name='ledger_supplier_date_idx'),
+            models.Index(fields=['reference'], name='ledger_reference_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_entry_type_display()} {self.reference or ''} - {self.amount}"
+
+    def signed_amount(self):
+        """Invoices increase what we owe; payments and debit notes reduce it."""
+        return self.amount if self.entry_type == self.EntryType.INVOICE else -self.amount
+
+    @classmethod
+    def signed_amount_expression(cls):
+        return models.Case(
+            models.When(entry_type=cls.EntryType.INVOICE, then=models.F('amount')),
+            default=-models.F('amount'),
+            output_field=models.DecimalField(max_digits=14, decimal_places=2),
+        )
+
+    @classmethod
+    def balance_for(cls, queryset):
+        return queryset.aggregate(balance=models.Sum(cls.signed_amount_expression()))['balance'] or 0
+
+    def save(self, *args, **kwargs):
+        if self.entry_type == self.EntryType.INVOICE and self.due_date is None:
+            self.due_date = self.date + timedelta(days=self.supplier.credit_days)
+        with transaction.atomic():
+            previous = None
+            if self.pk:
+                previous = SupplierLedgerEntry.objects.filter(pk=self.pk).first()
+            super().save(*args, **kwargs)
+            if previous is not None:
+                Supplier.objects.filter(pk=previous.supplier_id).update(
+                    balance=models.F('balance') - previous.signed_amount()
+                )
+            Supplier.objects.filter(pk=self.supplier_id).update(
+                balance=models.F('balance') + self.signed_amount()
+            )
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            Supplier.objects.filter(pk=self.supplier_id).update(
+                balance=models.F('balance') - self.signed_amount()
+            )
+            return super().delete(*args, **kwargs)
+
+
+# Purchase Order Model
+class PurchaseOrder(models.Model):
+    class Status(models.TextChoices):
+        DRAFT = 'draft', 'Draft'
+        ORDERED = 'ordered', 'Ordered'
+        PARTIAL = 'partial', 'Partially received'
+        RECEIVED = 'received', 'Received'
+        CANCELLED = 'cancelled', 'Cancelled'
+
+    supplier = models.ForeignKey(Supplier, on_delete=models.PROTECT, related_name='purchase_orders')
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.DRAFT)
+    order_date = models.DateField(default=timezone.localdate)
+    expected_date = models.DateField(null=True, blank=True)
+    notes = models.CharField(max_length=255, blank=True, null=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-order_date', '-id']
+        indexes = [
+            models.Index(fields=['supplier', 'status'], name='po_supplier_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.number} - {self.supplier}"
+
+    @property
+    def number(self):
+        return f"PO-{self.pk:05d}"
+
+    def refresh_status(self):
+        """Set ``status`` from how much of each line has been received."""
+        lines = self.lines.aggregate(
+            open=models.Count('id', filter=models.Q(quantity_received__lt=models.F('quantity_ordered'))),
+            received=models.Sum('quantity_received', default=0),
+        )
+        if lines['open'] == 0:
+            self.status = self.Status.RECEIVED
+        elif lines['received']:
+            self.status = self.Status.PARTIAL
+        PurchaseOrder.objects.filter(pk=self.pk).update(status=self.status)
+
+
+# Purchase Order Line Model
+class PurchaseOrderLine(models.Model):
+    order = models.ForeignKey(PurchaseOrder, on_delete=models.CASCADE, related_name='lines')
+    product = models.ForeignKey(Product, on_delete=models.PROTECT)
+    quantity_ordered = models.PositiveIntegerField()
+    quantity_received = models.PositiveIntegerField(default=0)
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.product} x {self.quantity_ordered}"
+
+    @property
+    def outstanding(self):
+        return max(self.quantity_ordered - self.quantity_received, 0)
+
+
+# Goods Receipt Model
+class GoodsReceipt(models.Model):
+    supplier = models.ForeignKey(Supplier, on_delete=models.PROTECT, related_name='goods_receipts')
+    purchase_order = models.ForeignKey(PurchaseOrder, on_delete=models.SET_NULL, null=True, blank=True, related_name='receipts')
+    received_date = models.DateField(default=timezone.localdate)
+    # The supplier's invoice or delivery challan number.
+    reference = models.CharField(max_length=50, blank=True, null=True)
+    # The purchase invoice posted to the supplier ledger for the whole delivery.
+    ledger_entry = models.OneToOneField(SupplierLedgerEntry, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-received_date', '-id']
+        indexes = [models.Index(fields=['reference'], name='receipt_reference_idx')]
+
+    def __str__(self):
+        return f"{self.number} - {self.supplier}"
+
+    @property
+    def number(self):
+        return f"GRN-{self.pk:05d}"
+
+
+# Stock Take Model
+class StockTake(models.Model):
+    class Status(models.TextChoices):
+        OPEN = 'open', 'Counting'
+        APPLIED = 'applied', 'Applied'
+        CANCELLED = 'cancelled', 'Cancelled'
+
+    name = models.CharField(max_length=100)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.OPEN)
+    started_at = models.DateTimeField(default=timezone.now)
+    applied_at = models.DateTimeField(null=True, blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    # Newest batch when counting started; a full count only zeroes batches up to it.
+    last_batch_id = models.PositiveBigIntegerField(null=True, blank=True, editable=False)
+
+    class Meta:
+        ordering = ['-started_at']
+
+    def __str__(self):
+        return f"{self.name} ({self.get_status_display()})"
+
+
+# Stock Count Model
+class StockCount(models.Model):
+    stock_take = models.ForeignKey(StockTake, on_delete=models.CASCADE, related_name='counts')
+    inventory = models.ForeignKey(Inventory, on_delete=models.CASCADE, related_name='stock_counts')
+    counted_quantity = models.PositiveIntegerField()
+    # Book quantity when the batch was counted; applying adds the difference, so
+    # sales between counting and applying are kept.
+    expected_quantity = models.PositiveIntegerField(null=True, blank=True)
+    counted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['stock_take', 'inventory'], name='unique_stock_take_batch'),
+        ]
+
+    def __str__(self):
+        return f"{self.inventory_id}: {self.counted_quantity}"
+
+
+# Customer Segment Model
+class CustomerSegment(models.Model):
+    """RFM scores and segment per customer, maintained by customers.segments."""
+    class Segment(models.TextChoices):
+        CHAMPION = 'champion', 'Champions'
+        LOYAL = 'loyal', 'Loyal'
+        RECENT = 'recent', 'Recent'
+        AT_RISK = 'at_risk', 'At risk'
+        LAPSED = 'lapsed', 'Lapsed'
+        PROSPECT = 'prospect', 'No purchases yet'
+
+    customer = models.OneToOneField(Customer, on_delete=models.CASCADE, primary_key=True, related_name='segment')
+    # Copied from the customer so campaigns filter on one index.
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    segment = models.CharField(max_length=10, choices=Segment.choices)
+    last_activity = models.DateField(null=True, blank=True)
+    frequency = models.PositiveIntegerField(default=0)
+    monetary = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    recency_score = models.PositiveSmallIntegerField(default=0)
+    frequency_score = models.PositiveSmallIntegerField(default=0)
+    monetary_score = models.PositiveSmallIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    owner_lookup = 'user'
+    objects = TenantManager()
+
+    class Meta:
+        indexes = [models.Index(fields=['user', 'segment'], name='segment_user_segment_idx')]
+
+    def __str__(self):
+        return f"{self.customer_id}: {self.get_segment_display()}"
+
+
+# Customer Segment Run Model
+class SegmentRun(models.Model):
+    run_at = models.DateTimeField(default=timezone.now)
+    customers_scored = models.PositiveIntegerField(default=0)
+    segments_updated = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-run_at']
+
+    def __str__(self):
+        return f"Segment run at {self.run_at} ({self.segments_updated} updated)"
+
+
+# Inventory Ageing Run Model
+class InventoryAgeingRun(models.Model):
+    run_at = models.DateTimeField(default=timezone.now)
+    as_of = models.DateField()
+    batches_checked = models.PositiveIntegerField(default=0)
+    batches_updated = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-run_at']
+
+    def __str__(self):
+        return f"Ageing run for {self.as_of} ({self.batches_updated} updated)"
+
+
+# Product Forecast Model
+class ProductForecast(models.Model):
+    # Written by the forecasting job (customers.forecasting), not edited by hand.
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='forecast')
+    supplier = models.ForeignKey(Supplier, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    lead_time_days = models.PositiveIntegerField()
+    weekly_demand = models.DecimalField(max_digits=10, decimal_places=2)
+    demand_error = models.DecimalField(max_digits=10, decimal_places=2)
+    reorder_point = models.PositiveIntegerField()
+    order_up_to = models.PositiveIntegerField()
+    updated_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Forecast for {self.product_id}: reorder at {self.reorder_point}"
+
+
+# Forecast Run Model
+class ForecastRun(models.Model):
+    run_at = models.DateTimeField(default=timezone.now)
+    as_of = models.DateField()
+    products_forecast = models.PositiveIntegerField(default=0)
+    forecasts_updated = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-run_at']
+
+    def __str__(self):
+        return f"Forecast run for {self.as_of} ({self.forecasts_updated} updated)"
+
 
 # Sale Model
 class Sale(models.Model):
@@ -202,6 +817,13 @@ class Sale(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2)
     total = models.DecimalField(max_digits=10, decimal_places=2, editable=False)
     created_by = models.ForeignKey(User, on_delete=models.PROTECT,null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, null=True, blank=True)
+
+    owner_lookup = 'created_by'
+    objects = TenantManager()
+
+    class Meta:
+        indexes = [models.Index(fields=['date'], name='sale_date_idx')]
 
     def save(self, *args, **kwargs):
         self.total = self.quantity * self.price
@@ -226,6 +848,184 @@ class Bill(models.Model):
     total = models.DecimalField(max_digits=10, decimal_places=2)
     payment_method = models.CharField(max_length=4, choices=PAYMENT_METHODS)
     created_by = models.ForeignKey(User, on_delete=models.PROTECT)
+    updated_at = models.DateTimeField(auto_now=True, null=True, blank=True)
+
+    owner_lookup = 'customer__user'
+    objects = TenantManager()
+
+    class Meta:
+        indexes = [models.Index(fields=['date'], name='bill_date_idx')]
+
+    def __str__(self):
+        return f"Bill #{self.id} - {self.customer.full_name()}"
+
+# ======================
+# Archive Models
+# ======================
+# Rows from closed financial years are moved into the 'archive' database (see
+# customers.archive and customers.routers). They keep the original ids and
+# denormalise the names reports need, since foreign keys cannot cross databases.
+class ArchivedFinancialYear(models.Model):
+    start_year = models.PositiveIntegerField(unique=True)  # 2023 means April 2023 - March 2024
+    archived_at = models.DateTimeField(default=timezone.now)
+    counts = models.JSONField(default=dict)
+
+    class Meta:
+        ordering = ['-start_year']
+
+    def __str__(self):
+        return f"FY {self.start_year}-{str(self.start_year + 1)[-2:]}"
+
+
+class ArchivedSale(models.Model):
+    original_id = models.BigIntegerField(unique=True)
+    financial_year = models.PositiveIntegerField()
+    date = models.DateField()
+    product_id = models.BigIntegerField(null=True)
+    product_name = models.CharField(max_length=100, null=True, blank=True)
+    category_id = models.BigIntegerField(null=True)
+    category_name = models.CharField(max_length=100, null=True, blank=True)
+    quantity = models.PositiveIntegerField()
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    total = models.DecimalField(max_digits=10, decimal_places=2)
+    created_by_id = models.BigIntegerField(null=True)
+
+    owner_lookup = 'created_by_id'
+    objects = TenantManager()
+
+    class Meta:
+        indexes = [models.Index(fields=['created_by_id', 'date'], name='archived_sale_user_date_idx')]
+
+    def __str__(self):
+        return f"{self.product_name} - {self.quantity} units on {self.date} (archived)"
+
+
+class ArchivedBill(models.Model):
+    original_id = models.BigIntegerField(unique=True)
+    financial_year = models.PositiveIntegerField()
+    date = models.DateTimeField()
+    customer_id = models.BigIntegerField()
+    customer_name = models.CharField(max_length=201, null=True, blank=True)
+    customer_user_id = models.BigIntegerField(null=True)
+    product_ids = models.JSONField(default=list)
+    discount = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    total = models.DecimalField(max_digits=10, decimal_places=2)
+    payment_method = models.CharField(max_length=4)
+    created_by_id = models.BigIntegerField(null=True)
+
+    owner_lookup = 'customer_user_id'
+    objects = TenantManager()
+
+    class Meta:
+        indexes = [models.Index(fields=['customer_user_id', 'date'], name='archived_bill_user_date_idx')]
+
+    def __str__(self):
+        return f"Bill #{self.original_id} (archived)"
+
+
+class ArchivedPurchase(models.Model):
+    original_id = models.BigIntegerField(unique=True)
+    financial_year = models.PositiveIntegerField()
+    customer_id = models.BigIntegerField(null=True)
+    customer_user_id = models.BigIntegerField(null=True)
+    product_type = models.CharField(max_length=50, null=True, blank=True)
+    details = models.JSONField(default=dict)
+    date_of_purchase = models.DateField(null=True)
+    # Copied from Purchase so archived spend can be summed in SQL.
+    lens_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    frame_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+
+    owner_lookup = 'customer_user_id'
+    objects = TenantManager()
+
+    class Meta:
+        indexes = [models.Index(fields=['customer_id', 'date_of_purchase'], name='archived_purchase_cust_idx')]
+
+    def __str__(self):
+        return f"Purchase #{self.original_id} (archived)"
+
+
+class ArchivedCustomerHistory(models.Model):
+    original_id = models.BigIntegerField(unique=True)
+    financial_year = models.PositiveIntegerField()
+    customer_id = models.BigIntegerField()
+    customer_user_id = models.BigIntegerField(null=True)
+    date = models.DateTimeField()
+    description = models.CharField(max_length=255)
+    details = models.JSONField(default=dict)
+
+    owner_lookup = 'customer_user_id'
+    objects = TenantManager()
+
+    class Meta:
+        indexes = [models.Index(fields=['customer_id', 'date'], name='archived_history_cust_idx')]
+
+    def __str__(self):
+        return f"{self.description} on {self.date} (archived)"
+
+
+# Branch replication
+class ChangeLogEntry(models.Model):
+    """
+    Append-only log of changes to replicated models. The primary key is this
+    branch's sequence number; entries received from other branches keep their
+    origin branch and sequence so they are applied once and can be forwarded.
+    """
+    class Operation(models.TextChoices):
+        SAVE = 'S', 'Save'
+        DELETE = 'D', 'Delete'
+
+    origin = models.CharField(max_length=32)
+    origin_seq = models.BigIntegerField(null=True, blank=True)  # None for local changes
+    model = models.CharField(max_length=50)
+    uid = models.UUIDField()
+    op = models.CharField(max_length=1, choices=Operation.choices)
+    data = models.JSONField(default=dict)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['id']
+        constraints = [
+            models.UniqueConstraint(fields=['origin', 'origin_seq'], name='unique_changelog_origin_seq'),
+        ]
+        indexes = [models.Index(fields=['model', 'uid', '-changed_at'], name='changelog_object_idx')]
+
+    def __str__(self):
+        return f"{self.origin}#{self.sequence} {self.get_op_display()} {self.model} {self.uid}"
+
+    @property
+    def sequence(self):
+        return self.origin_seq if self.origin_seq is not None else self.id
+
+
+class ParkedChange(models.Model):
+    """
+    A change received from another branch that could not be applied yet (a
+    foreign key to a row this branch does not have, or a unique clash). It is
+    retried on every later sync until it applies.
+    """
+    origin = models.CharField(max_length=32)
+    origin_seq = models.BigIntegerField()
+    change = models.JSONField()
+    error = models.CharField(max_length=255)
+    parked_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['id']
+        constraints = [
+            models.UniqueConstraint(fields=['origin', 'origin_seq'], name='unique_parked_change'),
+        ]
+
+    def __str__(self):
+        return f"{self.origin}#{self.origin_seq} {self.change.get('model')}: {self.error}"
+
+
+class SyncPeer(models.Model):
+    branch = models.CharField(max_length=32, unique=True)
+    url = models.URLField(blank=True)
+    last_received = models.BigIntegerField(default=0)  # the peer's sequence we have applied up to
+    last_sent = models.BigIntegerField(default=0)  # our sequence the peer has applied up to
+    last_synced_at = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
-        return f"Bill #{self.id} - {self.customer.full_name()}"
\ No newline at end of file
+        return self.branch
@@ -0,0 +1,239 @@
+"""
+Bulk price and MRP revision, and prices as they were.
+
+A revision is planned first: a formula over a scope of products (by brand,
+category or supplier) or a pasted or uploaded sheet gives a list of changes
+that can be previewed. The preview carries the planned changes as a signed
+token, and applying that token writes exactly what was previewed: a batched
+``bulk_update`` of the products and one ``PriceHistory`` row per product with
+``bulk_create``, all in one transaction. Products whose price or MRP changed
+since the preview are skipped, so submitting a revision twice cannot compound.
+
+``PriceHistory`` also answers what a product cost at a given moment:
+``price_at`` is a subquery expression over its ``(product, effective_at)``
+index, so bills and reports resolve past prices in the same query that reads
+their rows.
+"""
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+from django.core import signing
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import replication, stock
+from .models import Bill, ChangeLogEntry, Inventory, PriceHistory, Product
+from .receiving import resolve_products
+from .sheets import read_sheet
+
+BATCH_SIZE = 500
+MAX_ERRORS = 20
+# What a formula can set, and what it can start from.
+TARGETS = [('price', 'Selling price'), ('mrp', 'MRP')]
+BASES = [('price', 'Selling price'), ('mrp', 'MRP'), ('cost', 'Latest purchase cost')]
+ROUNDING = [('0.01', 'To the paisa'), ('1', 'To the rupee'), ('10', 'To 10 rupees')]
+PLAN_SALT = 'customers.pricing.plan'
+# How long a previewed revision can still be applied, in seconds.
+PLAN_MAX_AGE = 60 * 60
+
+
+def price_at(moment, field='price', product=None, current=None):
+    """
+    Expression for a product's ``field`` ('price' or 'mrp') at ``moment``: the
+    latest change on or before it, else the value before the first change
+    after it, else the current value. ``moment``, ``product`` (default the
+    outer product's pk) and ``current`` may be ``OuterRef``/``F`` expressions,
+    so the expression also works on rows that point at a product.
+    """
+    changes = PriceHistory.objects.filter(product=product if product is not None else OuterRef('pk'))
+    return Coalesce(
+        Subquery(changes.filter(effective_at__lte=moment).order_by('-effective_at', '-id').values(field)[:1]),
+        Subquery(changes.filter(effective_at__gt=moment).order_by('effective_at', 'id').values(f'previous_{field}')[:1]),
+        current if current is not None else F(field),
+    )
+
+
+def bill_prices(bill_ids):
+    """``{(bill_id, product_id): price}`` as each product was priced when its bill was made, in one query."""
+    lines = Bill.products.through.objects.filter(bill_id__in=list(bill_ids)).annotate(
+        price=price_at(OuterRef('bill__date'), product=OuterRef('product_id'), current=F('product__price')),
+    )
+    return {(bill_id, product_id): price for bill_id, product_id, price in lines.values_list('bill_id', 'product_id', 'price')}
+
+
+def scope(brand=None, category=None, supplier=None):
+    """Products of ``brand`` and ``category`` that ``supplier`` has delivered; any may be omitted."""
+    products = Product.objects.all()
+    if brand:
+        products = products.filter(brand__iexact=brand)
+    if category:
+        products = products.filter(category=category)
+    if supplier:
+        products = products.filter(pk__in=Inventory.objects.filter(supplier=supplier).values('product'))
+    return products
+
+
+def _round(value, step):
+    step = Decimal(step)
+    return ((value / step).quantize(Decimal('1'), ROUND_HALF_UP) * step).quantize(Decimal('0.01'))
+
+
+def _change(product, **new):
+    """The change setting ``product``'s price and/or MRP, or None if nothing changes."""
+    price = new.get('price', product.price)
+    mrp = new.get('mrp', product.mrp)
+    if (price, mrp) == (product.price, product.mrp):
+        return None
+    error = None
+    if price is not None and mrp is not None and price > mrp:
+        error = f"Selling price {price} would be above the MRP {mrp}."
+    return {
+        'product': product,
+        'price': price,
+        'mrp': mrp,
+        'previous_price': product.price,
+        'previous_mrp': product.mrp,
+        'error': error,
+    }
+
+
+def plan_formula(products, percent, target='price', base='price', round_to='0.01'):
+    """
+    Changes setting ``target`` to ``base`` plus ``percent`` (negative for a
+    cut) for each of ``products``, rounded to ``round_to``.
+    """
+    factor = 1 + Decimal(percent) / 100
+    if base == 'cost':
+        products = products.annotate(cost=Subquery(
+            Inventory.objects.filter(product=OuterRef('pk')).order_by('-purchase_date', '-id').values('purchase_price')[:1]
+        ))
+    changes = []
+    for product in products.order_by('name', 'pk'):
+        value = getattr(product, base)
+        if value is None:
+            continue
+        change = _change(product, **{target: _round(value * factor, round_to)})
+        if change:
+            changes.append(change)
+    return changes
+
+
+def _amount(text):
+    try:
+        value = Decimal(text.replace(',', ''))
+    except InvalidOperation:
+        return None
+    return value.quantize(Decimal('0.01')) if value.is_finite() and value >= 0 else None
+
+
+def plan_sheet(text):
+    """
+    Changes from ``code, price[, mrp]`` lines (SKU, barcode or product id;
+    comma- or tab-separated, optional header row). A blank price or MRP is
+    left as it is. Returns ``(changes, errors)``.
+    """
+    rows = read_sheet(text, 1, 2)
+
+    products = resolve_products(row[0].strip() for row in rows)
+    changes, errors, seen = [], [], set()
+    for number, row in enumerate(rows, start=1):
+        code = row[0].strip()
+        product = products.get(code)
+        new = {}
+        for field, value in zip(('price', 'mrp'), (value.strip() for value in row[1:3])):
+            if value:
+                new[field] = _amount(value)
+        if product is None:
+            errors.append(f"Line {number}: no product has the SKU, barcode or id '{code}'.")
+        elif None in new.values():
+            errors.append(f"Line {number}: prices must be amounts like 1499 or 1499.50.")
+        elif product.pk in seen:
+            errors.append(f"Line {number}: {code} is already on an earlier line.")
+        else:
+            seen.add(product.pk)
+            change = _change(product, **new)
+            if change:
+                changes.append(change)
+    return changes, errors[:MAX_ERRORS]
+
+
+def _text(value):
+    return None if value is None else str(value)
+
+
+def _decimal(text):
+    return None if text is None else Decimal(text)
+
+
+def sign_plan(changes):
+    """A signed token of the valid ``changes``, to post back from the preview to ``load_plan``."""
+    return signing.dumps([
+        [change['product'].pk, *map(_text, (change['previous_price'], change['previous_mrp'], change['price'], change['mrp']))]
+        for change in changes if not change['error']
+    ], salt=PLAN_SALT, compress=True)
+
+
+def load_plan(token):
+    """
+    The changes signed by ``sign_plan``, with their products as they are now.
+    Raises ``signing.BadSignature`` for a tampered or expired token.
+    """
+    rows = signing.loads(token, salt=PLAN_SALT, max_age=PLAN_MAX_AGE)
+    products = Product.objects.in_bulk([row[0] for row in rows])
+    return [
+        {
+            'product': products[product_id],
+            'price': _decimal(price),
+            'mrp': _decimal(mrp),
+            'previous_price': _decimal(previous_price),
+            'previous_mrp': _decimal(previous_mrp),
+            'error': None,
+        }
+        for product_id, previous_price, previous_mrp, price, mrp in rows
+        if product_id in products
+    ]
+
+
+def apply(changes, user=None, reason=None):
+    """
+    Write the valid ``changes`` and their price history in one transaction,
+    skipping products whose price or MRP is no longer the one the change was
+    planned from. Returns the number of products repriced.
+    """
+    changes = [change for change in changes if not change['error']]
+    now = timezone.now()
+
+    with transaction.atomic():
+        current = {
+            pk: (price, mrp) for pk, price, mrp in Product.objects.filter(
+                pk__in=[change['product'].pk for change in changes],
+            ).values_list('pk', 'price', 'mrp')
+        }
+        changes = [
+            change for change in changes
+            if current.get(change['product'].pk) == (change['previous_price'], change['previous_mrp'])
+        ]
+        products = []
+        for change in changes:
+            product = change['product']
+            product.price, product.mrp, product.updated_at = change['price'], change['mrp'], now
+            products.append(product)
+
+        Product.objects.bulk_update(products, ['price', 'mrp', 'updated_at'], batch_size=BATCH_SIZE)
+        PriceHistory.objects.bulk_create([
+            PriceHistory(
+                product=change['product'],
+                price=change['price'],
+                mrp=change['mrp'],
+                previous_price=change['previous_price'],
+                previous_mrp=change['previous_mrp'],
+                effective_at=now,
+                reason=reason[:100] if reason else None,
+                created_by=user,
+            )
+            for change in changes
+        ], batch_size=BATCH_SIZE)
+        replication.record_changes(products, ChangeLogEntry.Operation.SAVE)
+        stock.after_bulk_change([product.pk for product in products], quantities=False)
+    return len(products)
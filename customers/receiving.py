@@ -0,0 +1,158 @@
+"""
+Purchase orders and goods receipt.
+
+A delivery is received in one request. The receipt lines are validated
+together: product codes are resolved and clashing batch numbers found with
+one query each, however many lines there are. Every batch is then written
+with a single ``bulk_create`` inside one transaction. The same transaction
+posts the receipt movements to the stock ledger, refreshes the stock totals of the products received, posts one purchase
+invoice for the whole delivery to the supplier ledger, and advances the
+purchase order the goods were received against.
+"""
+from collections import defaultdict
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+
+from . import stock
+from .ledger import check_credit
+from .models import GoodsReceipt, Inventory, Product, PurchaseOrderLine, StockMovement, SupplierLedgerEntry
+from .sheets import read_sheet
+
+# Columns of a pasted or uploaded receipt sheet, in order; expiry is optional.
+SHEET_COLUMNS = ('product', 'batch_number', 'quantity', 'purchase_price', 'selling_price', 'expiry_date')
+MAX_LINES = 1000
+
+
+def product_code(product):
+    """The code a receipt line uses for ``product``: its SKU, barcode or id."""
+    return product.sku or product.barcode or str(product.pk)
+
+
+def resolve_products(codes):
+    """Map each code (SKU, barcode or product id) to its product with one query."""
+    codes = {code for code in codes if code}
+    ids = [int(code) for code in codes if code.isdigit()]
+    products = Product.objects.filter(Q(sku__in=codes) | Q(barcode__in=codes) | Q(pk__in=ids))
+    by_code = {}
+    # SKUs win over barcodes, which win over ids, when a code matches more than one.
+    for product in products:
+        for code in (str(product.pk), product.barcode, product.sku):
+            if code in codes:
+                by_code[code] = product
+    return by_code
+
+
+def existing_batches(pairs):
+    """The ``(product_id, batch_number)`` pairs among ``pairs`` that already exist, in one query."""
+    pairs = set(pairs)
+    if not pairs:
+        return set()
+    rows = Inventory.objects.filter(
+        product_id__in={product_id for product_id, _ in pairs},
+        batch_number__in={batch for _, batch in pairs},
+    ).values_list('product_id', 'batch_number')
+    return pairs & set(rows)
+
+
+def sheet_to_data(text, prefix):
+    """
+    Turn a pasted or uploaded sheet (comma- or tab-separated, one line per
+    batch, optional header row) into formset POST data under ``prefix``.
+    """
+    rows = read_sheet(text, SHEET_COLUMNS.index('quantity'))
+
+    data = {
+        f'{prefix}-TOTAL_FORMS': str(len(rows)),
+        f'{prefix}-INITIAL_FORMS': '0',
+    }
+    for index, row in enumerate(rows):
+        for column, value in zip(SHEET_COLUMNS, row):
+            data[f'{prefix}-{index}-{column}'] = value.strip()
+    return data
+
+
+def outstanding_lines(order):
+    """Initial receipt lines for what is still to come on ``order``."""
+    lines = order.lines.select_related('product').filter(
+        quantity_received__lt=F('quantity_ordered')
+    ).order_by('id')
+    return [
+        {
+            'product': product_code(line.product),
+            'quantity': line.outstanding,
+            'purchase_price': line.unit_price,
+            'selling_price': line.product.price,
+        }
+        for line in lines
+    ]
+
+
+def _apply_to_order(order, quantities):
+    """Count received units against the order's lines, oldest line first."""
+    lines = list(order.lines.filter(product_id__in=quantities).order_by('id'))
+    remaining = dict(quantities)
+    for line in lines:
+        taken = min(line.outstanding, remaining[line.product_id])
+        line.quantity_received += taken
+        remaining[line.product_id] -= taken
+    PurchaseOrderLine.objects.bulk_update(lines, ['quantity_received'], batch_size=500)
+    order.refresh_status()
+
+
+def receive(supplier, lines, user=None, purchase_order=None, received_date=None, reference=None):
+    """
+    Receive a delivery from ``supplier``. ``lines`` are dicts of ``Inventory``
+    field values (``product``, ``batch_number``, ``quantity``, prices and
+    optional dates). Raises ``ValidationError`` if the delivery would exceed
+    the supplier's credit limit, or if another receipt saved one of its
+    batches first. Returns the ``GoodsReceipt``.
+    """
+    amount = sum(line['quantity'] * line['purchase_price'] + (line.get('import_duty') or 0) for line in lines)
+
+    try:
+        with transaction.atomic():
+            check_credit(supplier, amount)
+            receipt = GoodsReceipt(supplier=supplier, purchase_order=purchase_order, reference=reference, created_by=user)
+            if received_date:
+                receipt.received_date = received_date
+            receipt.save()
+
+            batches = Inventory.objects.bulk_create([
+                Inventory(
+                    supplier=supplier, purchase_date=receipt.received_date,
+                    goods_receipt=receipt, created_by=user, **line,
+                )
+                for line in lines
+            ], batch_size=500)
+            stock.record(batches, StockMovement.Kind.RECEIPT, reference=receipt.number, user=user)
+
+            quantities = defaultdict(int)
+            for line in lines:
+                quantities[line['product'].pk] += line['quantity']
+            stock.after_bulk_change(quantities)
+
+            receipt.ledger_entry = SupplierLedgerEntry.objects.create(
+                supplier=supplier,
+                entry_type=SupplierLedgerEntry.EntryType.INVOICE,
+                date=receipt.received_date,
+                reference=reference or receipt.number,
+                amount=amount,
+                notes=f"{receipt.number}: {len(lines)} batch(es)",
+                created_by=user,
+            )
+            receipt.save(update_fields=['ledger_entry'])
+
+            if purchase_order is not None:
+                _apply_to_order(purchase_order, quantities)
+    except IntegrityError:
+        # The batch numbers were checked before this transaction; a concurrent receipt got there first.
+        clashes = existing_batches((line['product'].pk, line['batch_number']) for line in lines)
+        if not clashes:
+            raise
+        raise ValidationError([
+            f"Batch {line['batch_number']} of {line['product'].name} was received by someone else meanwhile."
+            for line in lines if (line['product'].pk, line['batch_number']) in clashes
+        ])
+    return receipt
@@ -0,0 +1,364 @@
+"""
+Change-log replication between branches.
+
+Every save or delete of a replicated model appends a ``ChangeLogEntry``
+(see ``customers.signals``); its id is this branch's monotonic sequence
+number. Syncing with another branch exchanges only the entries after the last
+sequence each side has seen, as JSON, over a file or the ``sync/changes/``
+endpoint, so the cost is proportional to the number of changes.
+
+Rows are identified across branches by ``sync_uid``; foreign keys travel as
+the related row's ``sync_uid`` (or username for users). A row created
+independently in two branches is matched on its natural key (``(user, phone)``
+for customers). Concurrent edits are resolved last-writer-wins on the change
+timestamp; the losing side only fills fields the winner left blank.
+"""
+import json
+import threading
+import urllib.request
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import (
+    ChangeLogEntry, Customer, ParkedChange, Prescription, Product, ProductCategory, Supplier, SyncPeer,
+)
+
+Operation = ChangeLogEntry.Operation
+
+# Replicated models in dependency order. ``natural_key`` matches rows created
+# separately in two branches; ``exclude`` lists branch-local or derived fields.
+REPLICATED = {
+    'productcategory': {'model': ProductCategory, 'natural_key': ('name',), 'exclude': ()},
+    # The balance is derived from this branch's own supplier ledger.
+    'supplier': {'model': Supplier, 'natural_key': ('name',), 'exclude': ('balance',)},
+    'product': {'model': Product, 'natural_key': ('sku',), 'exclude': ('created_at', 'updated_at', 'stock_on_hand')},
+    # The latest prescription pointer is recomputed by each branch's signals.
+    'customer': {
+        'model': Customer, 'natural_key': ('user', 'phone'),
+        'exclude': ('created_at', 'updated_at', 'latest_prescription'),
+    },
+    'prescription': {'model': Prescription, 'natural_key': (), 'exclude': ('updated_at',)},
+}
+MODEL_NAMES = {spec['model']: name for name, spec in REPLICATED.items()}
+BATCH_SIZE = 500
+
+_state = threading.local()
+
+
+class _Unresolved(Exception):
+    """A foreign key points at a row this branch does not have."""
+
+
+def branch_id():
+    return settings.BRANCH_ID
+
+
+def _fields(spec):
+    return [
+        field for field in spec['model']._meta.concrete_fields
+        if not field.primary_key and field.name != 'sync_uid' and field.name not in spec['exclude']
+    ]
+
+
+# ======================
+# Capturing changes
+# ======================
+def _related_key(field, value):
+    if value is None:
+        return None
+    if field.related_model is User:
+        return User.objects.filter(pk=value).values_list('username', flat=True).first()
+    return field.related_model.objects.filter(pk=value).values_list('sync_uid', flat=True).first()
+
+
+def serialize(instance, related_keys=None):
+    """``related_keys`` caches foreign keys already looked up, when serializing many rows."""
+    spec = REPLICATED[MODEL_NAMES[type(instance)]]
+    data = {}
+    for field in _fields(spec):
+        value = getattr(instance, field.attname)
+        if field.is_relation and related_keys is not None:
+            if (field, value) not in related_keys:
+                related_keys[field, value] = _related_key(field, value)
+            data[field.name] = related_keys[field, value]
+        else:
+            data[field.name] = _related_key(field, value) if field.is_relation else value
+    return json.loads(json.dumps(data, cls=DjangoJSONEncoder))
+
+
+def record_change(instance, op):
+    """Append ``instance``'s save or delete to the change log (not while applying remote changes)."""
+    if getattr(_state, 'applying', False):
+        return
+    ChangeLogEntry.objects.create(
+        origin=branch_id(),
+        model=MODEL_NAMES[type(instance)],
+        uid=instance.sync_uid,
+        op=op,
+        data=serialize(instance) if op == Operation.SAVE else {},
+    )
+
+
+def record_changes(instances, op):
+    """``record_change`` for many rows at once (after a bulk write), with one ``bulk_create``."""
+    if getattr(_state, 'applying', False):
+        return
+    related_keys = {}
+    ChangeLogEntry.objects.bulk_create([
+        ChangeLogEntry(
+            origin=branch_id(),
+            model=MODEL_NAMES[type(instance)],
+            uid=instance.sync_uid,
+            op=op,
+            data=serialize(instance, related_keys) if op == Operation.SAVE else {},
+        )
+        for instance in instances
+    ], batch_size=BATCH_SIZE)
+
+
+def seed_log():
+    """Log every replicated row that has no entry yet, so a first sync carries existing data."""
+    logged = 0
+    for name, spec in REPLICATED.items():
+        seen = set(ChangeLogEntry.objects.filter(model=name).values_list('uid', flat=True))
+        for instance in spec['model'].objects.exclude(sync_uid__in=seen).iterator():
+            record_change(instance, Operation.SAVE)
+            logged += 1
+    return logged
+
+
+# ======================
+# Exchanging deltas
+# ======================
+def changes_since(since, exclude_origin=None, limit=BATCH_SIZE):
+    """
+    The next ``limit`` log entries after sequence ``since``. Entries that came
+    from ``exclude_origin`` are left out (the requester already has them), but
+    ``last_seq`` still advances past them.
+    """
+    entries = list(ChangeLogEntry.objects.filter(id__gt=since).order_by('id')[:limit])
+    return {
+        'branch': branch_id(),
+        'last_seq': entries[-1].id if entries else since,
+        'more': len(entries) == limit,
+        'changes': [
+            {
+                'origin': entry.origin,
+                'seq': entry.sequence,
+                'model': entry.model,
+                'uid': str(entry.uid),
+                'op': entry.op,
+                'data': entry.data,
+                'changed_at': entry.changed_at.isoformat(),
+            }
+            for entry in entries if entry.origin != exclude_origin
+        ],
+    }
+
+
+def _resolve(field, value):
+    if value is None:
+        return None
+    if field.related_model is User:
+        pk = User.objects.filter(username=value).values_list('pk', flat=True).first()
+    else:
+        pk = field.related_model.objects.filter(sync_uid=value).values_list('pk', flat=True).first()
+    if pk is None:
+        raise _Unresolved(f"{field.related_model.__name__} {value}")
+    return pk
+
+
+def _deserialize(spec, data):
+    values = {}
+    for field in _fields(spec):
+        if field.name in data:
+            value = data[field.name]
+            values[field.attname] = _resolve(field, value) if field.is_relation else field.to_python(value)
+    return values
+
+
+def _natural_match(spec, values):
+    if not spec['natural_key']:
+        return None
+    lookup = {}
+    for name in spec['natural_key']:
+        attname = spec['model']._meta.get_field(name).attname
+        if values.get(attname) in (None, ''):
+            return None
+        lookup[attname] = values[attname]
+    return spec['model'].objects.filter(**lookup).first()
+
+
+def _changed_locally_after(name, uid, changed_at):
+    return ChangeLogEntry.objects.filter(model=name, uid=uid, changed_at__gt=changed_at).exists()
+
+
+def _apply(change):
+    if change['origin'] == branch_id() or ChangeLogEntry.objects.filter(
+        origin=change['origin'], origin_seq=change['seq']
+    ).exists():
+        return 'skipped'
+    spec = REPLICATED.get(change['model'])
+    if spec is None:
+        return 'skipped'
+
+    model = spec['model']
+    changed_at = parse_datetime(change['changed_at'])
+    instance = model.objects.filter(sync_uid=change['uid']).first()
+    result = 'applied'
+
+    if change['op'] == Operation.DELETE:
+        if instance is not None:
+            if _changed_locally_after(change['model'], instance.sync_uid, changed_at):
+                result = 'conflicts'
+            else:
+                instance.delete()
+    else:
+        values = _deserialize(spec, change['data'])
+        diverged = False
+        if instance is None:
+            instance = _natural_match(spec, values)
+        if instance is None:
+            instance = model(sync_uid=change['uid'])
+        else:
+            if _changed_locally_after(change['model'], instance.sync_uid, changed_at):
+                # The local edit is newer: keep it and only fill in what it left blank.
+                values = {
+                    attname: value for attname, value in values.items()
+                    if getattr(instance, attname) in (None, '') and value not in (None, '')
+                }
+                diverged = bool(values)
+                result = 'conflicts'
+            if str(instance.sync_uid) != change['uid']:
+                # The same row was created in both branches; both settle on the smaller uid.
+                instance.sync_uid = min(str(instance.sync_uid), change['uid'])
+                diverged = True
+        for attname, value in values.items():
+            setattr(instance, attname, value)
+        instance.save()
+
+    ChangeLogEntry.objects.create(
+        origin=change['origin'], origin_seq=change['seq'], model=change['model'],
+        uid=change['uid'], op=change['op'], data=change['data'], changed_at=changed_at,
+    )
+    if change['op'] == Operation.SAVE and diverged:
+        # The merged row matches neither side; log it so the other branch converges too.
+        _state.applying = False
+        try:
+            record_change(instance, Operation.SAVE)
+        finally:
+            _state.applying = True
+    return result
+
+
+def _apply_or_park(change):
+    """Apply ``change``, or park it for a later sync if it cannot be applied yet."""
+    try:
+        with transaction.atomic():
+            return _apply(change)
+    except (_Unresolved, IntegrityError) as exc:
+        ParkedChange.objects.update_or_create(
+            origin=change['origin'], origin_seq=change['seq'],
+            defaults={'change': change, 'error': str(exc)[:255]},
+        )
+        return 'parked'
+
+
+def apply_changes(payload):
+    """
+    Apply a ``changes_since`` payload from another branch and remember how far
+    that branch has been received. Changes that cannot be applied yet are
+    parked and retried, in order, after each later batch, so advancing past
+    them loses nothing. Returns counts of applied, conflicting and skipped
+    changes and of those still parked.
+    """
+    counts = {'applied': 0, 'conflicts': 0, 'skipped': 0}
+    _state.applying = True
+    try:
+        for change in payload['changes']:
+            result = _apply_or_park(change)
+            if result != 'parked':
+                counts[result] += 1
+        # This batch may have brought what earlier parked changes were waiting for.
+        for parked in ParkedChange.objects.order_by('id'):
+            result = _apply_or_park(parked.change)
+            if result != 'parked':
+                parked.delete()
+                counts[result] += 1
+    finally:
+        _state.applying = False
+    counts['parked'] = ParkedChange.objects.count()
+
+    peer, _ = SyncPeer.objects.get_or_create(branch=payload['branch'])
+    if payload['last_seq'] > peer.last_received:
+        SyncPeer.objects.filter(pk=peer.pk).update(last_received=payload['last_seq'], last_synced_at=timezone.now())
+    return counts
+
+
+def _merge(total, counts):
+    for key, value in counts.items():
+        # 'parked' is how many changes are waiting now, not a count per batch.
+        total[key] = value if key == 'parked' else total.get(key, 0) + value
+    return total
+
+
+# ======================
+# Transports
+# ======================
+def _request(url, data=None):
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(data, cls=DjangoJSONEncoder).encode() if data is not None else None,
+        headers={'X-Sync-Token': settings.SYNC_TOKEN, 'Content-Type': 'application/json'},
+    )
+    with urllib.request.urlopen(request, timeout=60) as response:
+        return json.loads(response.read())
+
+
+def sync_with(peer):
+    """Pull the peer's new changes, then push ours, over HTTP. Returns (received, sent) counts."""
+    received = {}
+    while True:
+        since = peer.last_received
+        payload = _request(f'{peer.url}?since={since}&branch={branch_id()}')
+        _merge(received, apply_changes(payload))
+        peer.refresh_from_db()
+        # A peer that keeps answering 'more' without moving forward would loop forever.
+        if not payload['more'] or peer.last_received <= since:
+            break
+
+    sent = {}
+    while True:
+        payload = changes_since(peer.last_sent, exclude_origin=peer.branch)
+        _merge(sent, _request(peer.url, payload))
+        peer.last_sent = payload['last_seq']
+        peer.last_synced_at = timezone.now()
+        peer.save(update_fields=['last_sent', 'last_synced_at'])
+        if not payload['more']:
+            break
+    return received, sent
+
+
+def export_changes(path, since, exclude_origin=None):
+    """Write every change after ``since`` to ``path``; returns the payload's ``last_seq``."""
+    changes = []
+    while True:
+        payload = changes_since(since, exclude_origin=exclude_origin)
+        changes += payload['changes']
+        since = payload['last_seq']
+        if not payload['more']:
+            break
+    payload.update(changes=changes, more=False)
+    with open(path, 'w') as fh:
+        json.dump(payload, fh)
+    return since
+
+
+def import_changes(path):
+    with open(path) as fh:
+        return apply_changes(json.load(fh))
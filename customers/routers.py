@@ -0,0 +1,27 @@
+ARCHIVE_DB = 'archive'
+ARCHIVE_MODELS = {'archivedsale', 'archivedbill', 'archivedpurchase', 'archivedcustomerhistory'}
+
+
+def _is_archive_model(app_label, model_name):
+    return app_label == 'customers' and model_name in ARCHIVE_MODELS
+
+
+class ArchiveRouter:
+    """Send the Archived* models to the archive database and everything else to default."""
+
+    def db_for_read(self, model, **hints):
+        if _is_archive_model(model._meta.app_label, model._meta.model_name):
+            return ARCHIVE_DB
+        return None
+
+    def db_for_write(self, model, **hints):
+        return self.db_for_read(model, **hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if model_name is None:
+            # RunPython/RunSQL without a model belong to the main database.
+            return db != ARCHIVE_DB
+        return _is_archive_model(app_label, model_name) == (db == ARCHIVE_DB)
@@ -0,0 +1,171 @@
+"""
+Product catalog search.
+
+Products are indexed in an SQLite FTS5 table (created by migration 0033)
+whose rowid is the product id. Product saves and deletes keep it current
+through the signals in ``customers.signals``; code that writes products in
+bulk calls ``index_products`` itself.
+
+A search returns its page of ranked product ids and the facet counts
+(category, lens type, frame material, in stock) from one compound query over
+the full-text matches. Each facet is counted with every filter applied except
+its own, so choosing a lens type still shows how many frames the other lens
+types would give.
+"""
+import math
+import re
+
+from django.db import connection
+
+from .models import Product, ProductCategory
+
+TABLE = 'customers_product_search'
+# Indexed columns and their bm25 weights: a hit in the name counts most.
+COLUMNS = {
+    'name': 10.0,
+    'brand': 5.0,
+    'model_number': 5.0,
+    'sku': 5.0,
+    'description': 1.0,
+    'hsn_code': 1.0,
+}
+FACETS = ('category', 'lens_type', 'frame_material', 'in_stock')
+PAGE_SIZE = 25
+# Far past any real catalog; keeps the OFFSET inside SQLite's integer range.
+MAX_PAGE = 100_000
+BATCH_SIZE = 500
+
+
+def index_products(product_ids):
+    """Re-index the given products; ids of deleted products are dropped from the index."""
+    product_ids = list(product_ids)
+    columns = ', '.join(COLUMNS)
+    with connection.cursor() as cursor:
+        for start in range(0, len(product_ids), BATCH_SIZE):
+            batch = product_ids[start:start + BATCH_SIZE]
+            placeholders = ', '.join(['%s'] * len(batch))
+            cursor.execute(f"DELETE FROM {TABLE} WHERE rowid IN ({placeholders})", batch)
+            cursor.execute(
+                f"INSERT INTO {TABLE} (rowid, {columns}) "
+                f"SELECT id, {columns} FROM {Product._meta.db_table} WHERE id IN ({placeholders})",
+                batch,
+            )
+
+
+def rebuild():
+    """Rebuild the whole index from the product table."""
+    columns = ', '.join(COLUMNS)
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE}")
+        cursor.execute(
+            f"INSERT INTO {TABLE} (rowid, {columns}) SELECT id, {columns} FROM {Product._meta.db_table}"
+        )
+
+
+def match_expression(text):
+    """An FTS5 query matching every word of ``text`` as a prefix, or '' if it has none."""
+    return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', text.lower()))
+
+
+def _filters(category=None, lens_type=None, frame_material=None, in_stock=False):
+    filters = {}
+    if category:
+        filters['category'] = ('m.category_id = %s', [category])
+    if lens_type:
+        filters['lens_type'] = ('m.lens_type = %s', [lens_type])
+    if frame_material:
+        filters['frame_material'] = ('m.frame_material = %s', [frame_material])
+    if in_stock:
+        filters['in_stock'] = ('m.stock_on_hand > 0', [])
+    return filters
+
+
+def _where(filters, exclude=None):
+    conditions = [(sql, params) for facet, (sql, params) in filters.items() if facet != exclude]
+    if not conditions:
+        return '', []
+    return 'WHERE ' + ' AND '.join(sql for sql, _ in conditions), [p for _, params in conditions for p in params]
+
+
+def search(text='', page=1, **chosen):
+    """
+    Products matching ``text`` (best first; by name when there is no text)
+    and the filters ``category`` (id), ``lens_type``, ``frame_material`` and
+    ``in_stock``. Returns ``{'products', 'total', 'page', 'pages', 'facets'}``
+    where ``facets`` maps each facet to ``[(value, label, count)]``. A page
+    past the last one returns the last page.
+    """
+    product_table = Product._meta.db_table
+    expression = match_expression(text)
+    if expression:
+        weights = ', '.join(str(weight) for weight in COLUMNS.values())
+        matched = (
+            f"SELECT p.id, p.name, p.category_id, p.lens_type, p.frame_material, p.stock_on_hand, "
+            f"bm25({TABLE}, {weights}) AS rank "
+            f"FROM {TABLE} JOIN {product_table} p ON p.id = {TABLE}.rowid WHERE {TABLE} MATCH %s"
+        )
+        params = [expression]
+    else:
+        matched = (
+            f"SELECT id, name, category_id, lens_type, frame_material, stock_on_hand, 0 AS rank "
+            f"FROM {product_table}"
+        )
+        params = []
+
+    filters = _filters(**chosen)
+    page = min(max(int(page), 1), MAX_PAGE)
+    where, where_params = _where(filters)
+    parts = [
+        f"SELECT * FROM (SELECT 'hit', m.id, m.rank, NULL FROM matched m {where} "
+        f"ORDER BY m.rank, m.name, m.id LIMIT %s OFFSET %s)",
+        f"SELECT 'total', NULL, COUNT(*), NULL FROM matched m {where}",
+    ]
+    params += where_params + [PAGE_SIZE, (page - 1) * PAGE_SIZE] + where_params
+    for facet, value in [
+        ('category', 'm.category_id'),
+        ('lens_type', 'm.lens_type'),
+        ('frame_material', 'm.frame_material'),
+        ('in_stock', 'm.stock_on_hand > 0'),
+    ]:
+        facet_where, facet_params = _where(filters, exclude=facet)
+        # Category names come from the same query, so the facet list needs no lookup.
+        label, join = 'NULL', ''
+        if facet == 'category':
+            label, join = 'c.name', f"LEFT JOIN {ProductCategory._meta.db_table} c ON c.id = m.category_id"
+        parts.append(
+            f"SELECT '{facet}', {value}, COUNT(*), {label} FROM matched m {join} {facet_where} GROUP BY {value}"
+        )
+        params += facet_params
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"WITH matched AS MATERIALIZED ({matched}) " + ' UNION ALL '.join(parts), params)
+        rows = cursor.fetchall()
+
+    ids, total, facets = [], 0, {facet: [] for facet in FACETS}
+    labels = {
+        'lens_type': dict(Product.LENS_TYPES),
+        'frame_material': dict(Product.FRAME_MATERIALS),
+        'in_stock': {1: 'In stock', 0: 'Out of stock'},
+    }
+    for kind, value, number, label in rows:
+        if kind == 'hit':
+            ids.append(value)
+        elif kind == 'total':
+            total = number
+        elif value is not None:
+            facets[kind].append((value, label or labels[kind].get(value, value), number))
+    for counts in facets.values():
+        counts.sort(key=lambda count: (-count[2], str(count[1])))
+
+    pages = math.ceil(total / PAGE_SIZE)
+    if page > pages > 0:
+        return search(text, page=pages, **chosen)
+
+    products = Product.objects.select_related('category').in_bulk(ids)
+    return {
+        'products': [products[pk] for pk in ids if pk in products],
+        'total': total,
+        'page': page,
+        'pages': pages,
+        'facets': facets,
+    }
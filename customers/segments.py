@@ -0,0 +1,169 @@
+"""
+RFM (recency, frequency, monetary) customer segmentation.
+
+Activity per customer comes from grouped queries over bills and optical
+purchases, and over their archived copies once a financial year has been
+archived; the rows are combined per customer id. Sales are not linked to
+customers and do not count.
+Each shop's customers are scored 1-5 on each dimension by rank with NumPy
+(customers tied on a value share the lower score), and a segment is picked
+from the scores. Results live in ``CustomerSegment``. A refresh only writes
+the rows whose scores or segment changed, so campaigns can select a segment
+through the ``(user, segment)`` index.
+"""
+from datetime import date
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .archive import archive_boundary
+from .models import (
+    ArchivedBill, ArchivedPurchase, Bill, Customer, CustomerSegment, Purchase, SegmentRun,
+)
+
+Segment = CustomerSegment.Segment
+
+FIELDS = (
+    'user_id', 'segment', 'last_activity', 'frequency', 'monetary',
+    'recency_score', 'frequency_score', 'monetary_score',
+)
+BATCH_SIZE = 1000
+
+
+def _activity():
+    """(customer_id, last activity date, visits, spend) rows from bills and purchases, live and archived."""
+    sources = [(Bill.objects, Purchase.objects.exclude(customer=None))]
+    if archive_boundary() is not None:
+        sources.append((ArchivedBill.objects, ArchivedPurchase.objects.exclude(customer_id=None)))
+    for bills, purchases in sources:
+        yield from bills.values('customer_id').annotate(
+            last=Max(TruncDate('date')), visits=Count('id'), spent=Sum('total'),
+        ).order_by().values_list('customer_id', 'last', 'visits', 'spent').iterator()
+        yield from purchases.values('customer_id').annotate(
+            last=Max('date_of_purchase'), visits=Count('id'), spent=Sum(Purchase.revenue_expression()),
+        ).order_by().values_list('customer_id', 'last', 'visits', 'spent').iterator()
+
+
+def rank_scores(values):
+    """Score each value 1-5 by the share of values strictly below it, in fifths."""
+    if not len(values):
+        return np.zeros(0, dtype=np.int64)
+    below = np.searchsorted(np.sort(values), values, side='left')
+    return np.minimum(below * 5 // len(values) + 1, 5)
+
+
+def assign_segments(recency, frequency, monetary):
+    """Vectorised segment choice from 1-5 score arrays (0 means no activity)."""
+    return np.select(
+        [
+            frequency == 0,
+            (recency >= 4) & (frequency >= 4),
+            (recency >= 3) & (frequency >= 3),
+            recency >= 4,
+            frequency >= 3,
+        ],
+        [Segment.PROSPECT, Segment.CHAMPION, Segment.LOYAL, Segment.RECENT, Segment.AT_RISK],
+        default=Segment.LAPSED,
+    )
+
+
+def score_customers():
+    """Compute every customer's RFM row; returns ``{customer_id: {field: value}}``."""
+    customers = list(Customer.objects.order_by('id').values_list('id', 'user_id'))
+    ids = np.array([pk for pk, _ in customers], dtype=np.int64)
+    users = np.array([user_id or 0 for _, user_id in customers], dtype=np.int64)
+
+    activity = list(_activity())
+    customer_ids = np.array([row[0] for row in activity], dtype=np.int64)
+    days = np.array([row[1].toordinal() if row[1] else 0 for row in activity], dtype=np.int64)
+    counts = np.array([row[2] for row in activity], dtype=np.int64)
+    amounts = np.array([float(row[3] or 0) for row in activity], dtype=np.float64)
+    # Customers added after the list above was read are scored on the next run.
+    known = np.isin(customer_ids, ids)
+    rows = np.searchsorted(ids, customer_ids[known])
+
+    last = np.zeros(len(ids), dtype=np.int64)
+    visits = np.zeros(len(ids), dtype=np.int64)
+    spent = np.zeros(len(ids), dtype=np.float64)
+    np.maximum.at(last, rows, days[known])
+    np.add.at(visits, rows, counts[known])
+    np.add.at(spent, rows, amounts[known])
+
+    recency = np.zeros(len(ids), dtype=np.int64)
+    frequency = np.zeros(len(ids), dtype=np.int64)
+    monetary = np.zeros(len(ids), dtype=np.int64)
+    # Scores are relative to the other customers of the same shop.
+    for user in np.unique(users):
+        shop = np.flatnonzero((users == user) & (visits > 0))
+        recency[shop] = rank_scores(last[shop])
+        frequency[shop] = rank_scores(visits[shop])
+        monetary[shop] = rank_scores(spent[shop])
+    segments = assign_segments(recency, frequency, monetary)
+
+    return {
+        int(ids[i]): {
+            'user_id': int(users[i]) or None,
+            'segment': str(segments[i]),
+            'last_activity': date.fromordinal(int(last[i])) if last[i] else None,
+            'frequency': int(visits[i]),
+            'monetary': Decimal(f'{spent[i]:.2f}'),
+            'recency_score': int(recency[i]),
+            'frequency_score': int(frequency[i]),
+            'monetary_score': int(monetary[i]),
+        }
+        for i in range(len(ids))
+    }
+
+
+def refresh_segments():
+    """
+    Rescore all customers and write only the ``CustomerSegment`` rows that
+    changed. Returns the ``SegmentRun`` recorded for this pass.
+    """
+    started = timezone.now()
+    scored = score_customers()
+    stored = {row[0]: dict(zip(FIELDS, row[1:])) for row in CustomerSegment.objects.values_list('pk', *FIELDS)}
+
+    created, changed = [], []
+    for customer_id, values in scored.items():
+        current = stored.get(customer_id)
+        if current == values:
+            continue
+        row = CustomerSegment(customer_id=customer_id, updated_at=started, **values)
+        (changed if current is not None else created).append(row)
+
+    with transaction.atomic():
+        CustomerSegment.objects.bulk_create(created, batch_size=BATCH_SIZE)
+        CustomerSegment.objects.bulk_update(changed, [*FIELDS, 'updated_at'], batch_size=BATCH_SIZE)
+        return SegmentRun.objects.create(
+            run_at=started,
+            customers_scored=len(scored),
+            segments_updated=len(created) + len(changed),
+        )
+
+
+def segment_counts(user):
+    """Customers per segment for ``user``, in display order, from one grouped query."""
+    counts = dict(
+        CustomerSegment.objects.for_user(user).values('segment')
+        .annotate(customers=Count('pk')).order_by().values_list('segment', 'customers')
+    )
+    return [
+        {'segment': value, 'label': label, 'customers': counts.get(value, 0)}
+        for value, label in Segment.choices
+    ]
+
+
+def segment_customers(user, segment):
+    """
+    The user's customers in ``segment``, with only the contact columns. Both
+    filters are on the segment's copy of the owner, so the query reads the
+    ``(user, segment)`` index instead of every customer of the user.
+    """
+    return Customer.objects.filter(segment__user=getattr(user, 'pk', user), segment__segment=segment).only(
+        'first_name', 'last_name', 'phone', 'email'
+    )
@@ -0,0 +1,31 @@
+"""
+Rows pasted or uploaded from a spreadsheet.
+
+Goods receipts, stock-take counts and price revisions all accept the same
+kind of sheet: comma- or tab-separated lines, blank lines ignored, with an
+optional header row.
+"""
+import csv
+import io
+from decimal import Decimal, InvalidOperation
+
+
+def _is_number(value):
+    try:
+        return Decimal(value.strip().replace(',', '')).is_finite()
+    except InvalidOperation:
+        return False
+
+
+def read_sheet(text, *numeric_columns):
+    """
+    The rows of ``text`` as lists of cells. The delimiter is a tab if the
+    first line has one, else a comma. The first row is dropped as a header
+    when none of ``numeric_columns`` (0-based) holds a number in it.
+    """
+    lines = [line for line in text.splitlines() if line.strip()]
+    delimiter = '\t' if lines and '\t' in lines[0] else ','
+    rows = list(csv.reader(io.StringIO('\n'.join(lines)), delimiter=delimiter))
+    if rows and not any(column < len(rows[0]) and _is_number(rows[0][column]) for column in numeric_columns):
+        rows = rows[1:]
+    return rows
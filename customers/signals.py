@@ -0,0 +1,85 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import auth, ledger, replication, search
+from .catalog import catalog
+from .models import Bill, ChangeLogEntry, Customer, Inventory, Prescription, Product, SupplierLedgerEntry
+
+
+@receiver([post_save, post_delete], sender=User)
+def user_changed(sender, instance, **kwargs):
+    auth.invalidate_user(instance.pk)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def user_access_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action.startswith('post_'):
+            auth.invalidate_user(instance.pk)
+    elif action == 'pre_clear':
+        # Changed from the group/permission side; after a clear the users are unknown.
+        for user_id in instance.user_set.values_list('pk', flat=True):
+            auth.invalidate_user(user_id)
+    elif action in ('post_add', 'post_remove'):
+        for user_id in pk_set:
+            auth.invalidate_user(user_id)
+
+
+@receiver([post_save, post_delete], sender=SupplierLedgerEntry)
+def ledger_entry_changed(sender, instance, **kwargs):
+    ledger.invalidate_supplier_totals(instance.supplier_id)
+
+
+@receiver([post_save, post_delete], sender=Product)
+def product_changed(sender, instance, **kwargs):
+    product_id = instance.pk
+    search.index_products([product_id])
+    transaction.on_commit(lambda: catalog.refresh_product(product_id))
+
+
+@receiver([post_save, post_delete], sender=Inventory)
+def inventory_changed(sender, instance, **kwargs):
+    product_id = instance.product_id
+    Product.refresh_stock([product_id])
+    transaction.on_commit(lambda: catalog.refresh_product(product_id))
+
+
+@receiver(post_save, sender=Prescription)
+def prescription_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        Customer.refresh_latest_prescription([instance.customer_id])
+
+
+@receiver(post_delete, sender=Prescription)
+def prescription_deleted(sender, instance, **kwargs):
+    Customer.refresh_latest_prescription([instance.customer_id])
+
+
+@receiver(m2m_changed, sender=Bill.products.through)
+def bill_products_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # Cached invoice PDFs are keyed on updated_at, which m2m edits don't touch.
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    now = timezone.now()
+    if reverse:
+        if pk_set:
+            Bill.objects.filter(pk__in=pk_set).update(updated_at=now)
+    else:
+        instance.updated_at = now
+        Bill.objects.filter(pk=instance.pk).update(updated_at=now)
+
+
+@receiver(post_save)
+def replicated_model_saved(sender, instance, raw=False, **kwargs):
+    if sender in replication.MODEL_NAMES and not raw:
+        replication.record_change(instance, ChangeLogEntry.Operation.SAVE)
+
+
+@receiver(post_delete)
+def replicated_model_deleted(sender, instance, **kwargs):
+    if sender in replication.MODEL_NAMES:
+        replication.record_change(instance, ChangeLogEntry.Operation.DELETE)
@@ -0,0 +1,44 @@
+// Progressive enhancement for selects rendered by customers.widgets: a search
+// box above the select queries the prefix-search endpoint (debounced) and
+// replaces the unselected options with the results.
+(function () {
+    const DEBOUNCE_MS = 250;
+
+    function enhance(select) {
+        const search = document.createElement('input');
+        search.type = 'search';
+        search.className = 'form-control mb-1';
+        search.placeholder = 'Type to search...';
+        select.parentNode.insertBefore(search, select);
+
+        let timer = null;
+        let controller = null;
+        search.addEventListener('input', () => {
+            clearTimeout(timer);
+            timer = setTimeout(() => {
+                const term = search.value.trim();
+                if (!term) { return; }
+                if (controller) { controller.abort(); }
+                controller = new AbortController();
+                fetch(`${select.dataset.autocompleteUrl}?q=${encodeURIComponent(term)}`, { signal: controller.signal })
+                    .then(response => response.json())
+                    .then(data => {
+                        Array.from(select.options).forEach(option => {
+                            if (!option.selected && option.value) { option.remove(); }
+                        });
+                        const present = new Set(Array.from(select.options).map(option => option.value));
+                        data.results.forEach(result => {
+                            if (!present.has(String(result.id))) {
+                                select.add(new Option(result.text, result.id));
+                            }
+                        });
+                    })
+                    .catch(() => {});
+            }, DEBOUNCE_MS);
+        });
+    }
+
+    document.addEventListener('DOMContentLoaded', () => {
+        document.querySelectorAll('select[data-autocomplete-url]').forEach(enhance);
+    });
+})();
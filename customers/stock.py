@@ -0,0 +1,180 @@
+"""
+Stock movement ledger, snapshots and point-in-time stock.
+
+Every change of a batch's quantity is posted as a signed ``StockMovement``.
+``Inventory.save`` and ``Inventory.delete`` post their own; the bulk paths
+(goods receipt, stock take) post theirs with one ``bulk_create``. Movements
+are never edited. A ``StockSnapshot`` folds every movement up to an id into
+one line per product, so stock at any moment is the nearest snapshot before
+it plus the movements posted since, read with one grouped query over the
+``occurred_at`` index instead of the whole ledger.
+"""
+from collections import defaultdict
+from datetime import datetime, time
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Max, Sum
+from django.utils import timezone
+
+from .catalog import catalog
+from .models import Inventory, Product, StockMovement, StockSnapshot, StockSnapshotLine
+
+BATCH_SIZE = 500
+
+
+def _totals(movements):
+    """``{product_id: [units, value at cost]}`` for ``movements``, in one grouped query."""
+    value = ExpressionWrapper(F('quantity') * F('unit_cost'), output_field=DecimalField(max_digits=14, decimal_places=2))
+    totals = defaultdict(lambda: [0, 0])
+    for product_id, units, amount in movements.order_by().values('product').annotate(
+        units=Sum('quantity'), amount=Sum(value),
+    ).values_list('product', 'units', 'amount'):
+        totals[product_id][0] += units
+        totals[product_id][1] += amount
+    return totals
+
+
+def after_bulk_change(product_ids, quantities=True):
+    """
+    Bring what the save signals maintain up to date after products or batches
+    were written with ``bulk_create``, ``bulk_update`` or ``update()``, which
+    skip those signals: the products' stock totals (unless ``quantities`` is
+    false, e.g. after a price change) and, once the transaction commits, the
+    scan index.
+    """
+    if quantities:
+        Product.refresh_stock(product_ids)
+    transaction.on_commit(catalog.invalidate)
+
+
+def movements_for(batches, kind, changes=None, reference=None, user=None, occurred_at=None):
+    """
+    Unsaved movements for ``batches``. ``changes`` maps a batch id to its
+    signed change; without it each batch's whole quantity is posted.
+    """
+    occurred_at = occurred_at or timezone.now()
+    return [
+        StockMovement(
+            product_id=batch.product_id,
+            inventory_id=batch.pk,
+            kind=kind,
+            quantity=batch.quantity if changes is None else changes[batch.pk],
+            unit_cost=batch.purchase_price,
+            occurred_at=occurred_at,
+            reference=reference or batch.batch_number,
+            created_by=user,
+        )
+        for batch in batches
+        if changes is None or changes.get(batch.pk)
+    ]
+
+
+def record(batches, kind, changes=None, reference=None, user=None):
+    """Post the movements for ``batches`` with one ``bulk_create``."""
+    return StockMovement.objects.bulk_create(
+        movements_for(batches, kind, changes, reference=reference, user=user),
+        batch_size=BATCH_SIZE,
+    )
+
+
+def move(batch, quantity, kind, reference=None, user=None):
+    """
+    Change ``batch`` by ``quantity`` units (negative for sales and transfers
+    out) and post the movement. Raises ``ValidationError`` rather than take
+    the batch below zero. Returns the ``StockMovement``.
+    """
+    with transaction.atomic():
+        updated = Inventory.objects.filter(pk=batch.pk, quantity__gte=-quantity).update(
+            quantity=F('quantity') + quantity, last_modified=timezone.now(),
+        )
+        if not updated:
+            raise ValidationError(f"Batch {batch.batch_number} has fewer than {-quantity} unit(s) in stock.")
+        batch.refresh_from_db(fields=['quantity', 'last_modified'])
+        movement = StockMovement.objects.create(
+            product_id=batch.product_id,
+            inventory=batch,
+            kind=kind,
+            quantity=quantity,
+            unit_cost=batch.purchase_price,
+            reference=reference or batch.batch_number,
+            created_by=user,
+        )
+        after_bulk_change([batch.product_id])
+    return movement
+
+
+def take_snapshot():
+    """
+    Fold the movements since the last snapshot into a new one. Returns the
+    new ``StockSnapshot``, or the last one if nothing has moved since.
+    """
+    with transaction.atomic():
+        previous = StockSnapshot.objects.order_by('-last_movement_id').first()
+        after = previous.last_movement_id if previous else 0
+        last = StockMovement.objects.aggregate(last=Max('pk'))['last'] or 0
+        if previous is not None and last == after:
+            return previous
+
+        totals = defaultdict(lambda: [0, 0])
+        if previous is not None:
+            for product_id, units, value in previous.lines.values_list('product', 'units', 'value'):
+                totals[product_id] = [units, value]
+        for product_id, (units, value) in _totals(StockMovement.objects.filter(pk__gt=after, pk__lte=last)).items():
+            totals[product_id][0] += units
+            totals[product_id][1] += value
+
+        lines = {product_id: total for product_id, total in totals.items() if any(total)}
+        snapshot = StockSnapshot.objects.create(
+            last_movement_id=last,
+            products=len(lines),
+            units=sum(units for units, _ in lines.values()),
+            value=sum(value for _, value in lines.values()),
+        )
+        StockSnapshotLine.objects.bulk_create([
+            StockSnapshotLine(snapshot=snapshot, product_id=product_id, units=units, value=value)
+            for product_id, (units, value) in lines.items()
+        ], batch_size=BATCH_SIZE)
+    return snapshot
+
+
+def stock_at(moment, product_ids=None):
+    """
+    Units and value at cost per product at ``moment`` (a datetime, or a date
+    meaning the end of that day): ``{product_id: {'units', 'value'}}``.
+    """
+    if not isinstance(moment, datetime):
+        moment = timezone.make_aware(datetime.combine(moment, time.max))
+
+    snapshot = StockSnapshot.objects.filter(taken_at__lte=moment).order_by('-taken_at').first()
+    lines = snapshot.lines.all() if snapshot else StockSnapshotLine.objects.none()
+    movements = StockMovement.objects.filter(occurred_at__lte=moment)
+    if snapshot is not None:
+        movements = movements.filter(pk__gt=snapshot.last_movement_id)
+    if product_ids is not None:
+        lines = lines.filter(product_id__in=product_ids)
+        movements = movements.filter(product_id__in=product_ids)
+
+    totals = defaultdict(lambda: [0, 0])
+    for product_id, units, value in lines.values_list('product', 'units', 'value'):
+        totals[product_id] = [units, value]
+    for product_id, (units, value) in _totals(movements).items():
+        totals[product_id][0] += units
+        totals[product_id][1] += value
+    return {
+        product_id: {'units': units, 'value': value}
+        for product_id, (units, value) in totals.items()
+        if units or value
+    }
+
+
+def drift(snapshot):
+    """Products whose units in ``snapshot`` differ from their batches now, e.g. after a raw update."""
+    batches = dict(Inventory.objects.order_by().values('product').annotate(units=Sum('quantity')).filter(
+        units__gt=0,
+    ).values_list('product', 'units'))
+    lines = dict(snapshot.lines.values_list('product', 'units'))
+    return sorted(
+        product_id for product_id in batches.keys() | lines.keys()
+        if batches.get(product_id, 0) != lines.get(product_id, 0)
+    )
@@ -0,0 +1,170 @@
+"""
+Stock takes (cycle counts) and reconciliation.
+
+Counts are recorded per batch from a pasted or uploaded sheet and upserted in
+one statement, so a sheet can be re-sent to correct it; each count keeps the
+book quantity at the moment it was recorded. The variance report joins every
+batch to its count for the stock take in a single query. Applying a stock take
+adds each batch's variance (counted less book at counting time) to its current
+quantity with one ``bulk_update`` inside a transaction, so sales and receipts
+between counting and applying are not overwritten, and posts the variances to
+the stock ledger as adjustments.
+"""
+from collections import defaultdict
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F, FilteredRelation, IntegerField, Max, Q
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
+
+from . import stock
+from .models import Inventory, StockCount, StockMovement, StockTake
+from .sheets import read_sheet
+
+BATCH_SIZE = 500
+MAX_ERRORS = 20
+
+
+def parse_counts(text):
+    """
+    Read ``batch, counted quantity[, product SKU or barcode]`` lines (comma-
+    or tab-separated, optional header row). The product is only needed when
+    two products share a batch number. A batch listed more than once (stock
+    counted on two shelves) is summed. Returns ``({inventory_id: quantity}, errors)``.
+    """
+    rows = read_sheet(text, 1)
+
+    batches = defaultdict(list)
+    for pk, batch, sku, barcode in Inventory.objects.filter(
+        batch_number__in={row[0].strip() for row in rows if row}
+    ).values_list('pk', 'batch_number', 'product__sku', 'product__barcode'):
+        batches[batch].append((pk, sku, barcode))
+
+    counts, errors = defaultdict(int), []
+    for number, row in enumerate(rows, start=1):
+        batch = row[0].strip() if row else ''
+        quantity = row[1].strip() if len(row) > 1 else ''
+        code = row[2].strip() if len(row) > 2 else ''
+        matches = [pk for pk, sku, barcode in batches.get(batch, ()) if not code or code in (sku, barcode)]
+        if not quantity.isdigit():
+            errors.append(f"Line {number}: '{quantity}' is not a whole number.")
+        elif not matches:
+            errors.append(f"Line {number}: no batch '{batch}'{f' of {code}' if code else ''}.")
+        elif len(matches) > 1:
+            errors.append(f"Line {number}: batch '{batch}' exists for several products; add the SKU.")
+        else:
+            counts[matches[0]] += int(quantity)
+    return dict(counts), errors[:MAX_ERRORS]
+
+
+def start(name, user=None):
+    """Open a stock take, noting the newest batch so later receipts are not zeroed by a full count."""
+    return StockTake.objects.create(
+        name=name, created_by=user, last_batch_id=Inventory.objects.aggregate(last=Max('pk'))['last'],
+    )
+
+
+def record_counts(stock_take, counts):
+    """Insert or replace the counts for the given batches, with their book quantities now, in one upsert."""
+    now = timezone.now()
+    book = dict(Inventory.objects.filter(pk__in=list(counts)).values_list('pk', 'quantity'))
+    StockCount.objects.bulk_create(
+        [
+            StockCount(stock_take=stock_take, inventory_id=inventory_id, counted_quantity=quantity,
+                       expected_quantity=book.get(inventory_id), counted_at=now)
+            for inventory_id, quantity in counts.items()
+        ],
+        batch_size=BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['stock_take', 'inventory'],
+        update_fields=['counted_quantity', 'expected_quantity', 'counted_at'],
+    )
+    return len(counts)
+
+
+def variance_report(stock_take):
+    """
+    Every counted batch, plus (while counting) every uncounted batch with stock,
+    with its book and counted quantity and the variance at cost. One query.
+    """
+    applied = stock_take.status == StockTake.Status.APPLIED
+    batches = Inventory.objects.annotate(
+        count=FilteredRelation('stock_counts', condition=Q(stock_counts__stock_take=stock_take)),
+    )
+    if applied:
+        batches = batches.filter(count__isnull=False)
+    else:
+        batches = batches.filter(Q(count__isnull=False) | Q(is_active=True, quantity__gt=0))
+    # Counts recorded before book quantities were kept compare with the batch now.
+    batches = batches.annotate(expected=Coalesce('count__expected_quantity', 'quantity'))
+    rows = list(batches.annotate(
+        counted=F('count__counted_quantity'),
+        variance=Cast(F('count__counted_quantity'), IntegerField()) - Cast(F('expected'), IntegerField()),
+    ).values(
+        'pk', 'product__name', 'product__sku', 'batch_number', 'purchase_price', 'expected', 'counted', 'variance',
+    ).order_by('product__name', 'batch_number'))
+
+    summary = {'batches': len(rows), 'counted': 0, 'uncounted': 0, 'matched': 0,
+               'over': 0, 'short': 0, 'value': 0}
+    for row in rows:
+        if row['counted'] is None:
+            summary['uncounted'] += 1
+            continue
+        summary['counted'] += 1
+        row['value'] = row['variance'] * row['purchase_price']
+        summary['value'] += row['value']
+        if row['variance'] > 0:
+            summary['over'] += row['variance']
+        elif row['variance'] < 0:
+            summary['short'] -= row['variance']
+        else:
+            summary['matched'] += 1
+    return {
+        'rows': [row for row in rows if row['counted'] is None or row['variance']],
+        'summary': summary,
+    }
+
+
+def apply(stock_take, zero_uncounted=False):
+    """
+    Add each counted batch's variance to its quantity in one transaction.
+    With ``zero_uncounted`` (a full count) active batches that existed when the
+    stock take started and were not counted are recorded as counted at zero
+    first. Returns the number of batches changed.
+    """
+    with transaction.atomic():
+        stock_take = StockTake.objects.select_for_update().get(pk=stock_take.pk)
+        if stock_take.status != StockTake.Status.OPEN:
+            raise ValidationError(f"{stock_take.name} has already been {stock_take.get_status_display().lower()}.")
+
+        if zero_uncounted:
+            uncounted = Inventory.objects.filter(is_active=True, quantity__gt=0).exclude(
+                stock_counts__stock_take=stock_take
+            )
+            if stock_take.last_batch_id is not None:
+                uncounted = uncounted.filter(pk__lte=stock_take.last_batch_id)
+            record_counts(stock_take, dict.fromkeys(uncounted.values_list('pk', flat=True), 0))
+
+        now = timezone.now()
+        changed, changes = [], {}
+        for count in stock_take.counts.select_related('inventory'):
+            batch = count.inventory
+            expected = batch.quantity if count.expected_quantity is None else count.expected_quantity
+            # Stock sold since the count cannot take the batch below zero.
+            quantity = max(batch.quantity + count.counted_quantity - expected, 0)
+            if quantity == batch.quantity:
+                continue
+            changes[batch.pk] = quantity - batch.quantity
+            batch.quantity = quantity
+            batch.last_modified = now
+            changed.append(batch)
+        Inventory.objects.bulk_update(changed, ['quantity', 'last_modified'], batch_size=BATCH_SIZE)
+        stock.record(changed, StockMovement.Kind.ADJUSTMENT, changes, reference=stock_take.name[:50])
+
+        stock.after_bulk_change({batch.product_id for batch in changed})
+
+        stock_take.status = StockTake.Status.APPLIED
+        stock_take.applied_at = now
+        stock_take.save(update_fields=['status', 'applied_at'])
+    return len(changed)
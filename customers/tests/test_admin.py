@@ -0,0 +1,67 @@
+from decimal import Decimal
+
+from django.contrib.admin.sites import site
+from django.contrib.auth.models import User
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from customers.models import Customer, Product
+
+
+class AdminSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('owner', password='secret')
+        cls.customer = Customer.objects.create(user=cls.admin, first_name='Asha', phone='9800000001')
+
+    def search(self, model, term):
+        request = RequestFactory().get('/', {'q': term})
+        request.user = self.admin
+        queryset, _ = site._registry[model].get_search_results(request, model.objects.order_by(), term)
+        return queryset
+
+    def test_prefix_search_is_case_insensitive_and_uses_the_nocase_indexes(self):
+        queryset = self.search(Customer, 'asha')
+        self.assertEqual(list(queryset), [self.customer])
+        plan = queryset.explain()
+        for index in ('customer_phone_nocase_idx', 'customer_first_nocase_idx', 'customer_last_nocase_idx'):
+            self.assertIn(index, plan)
+        self.assertIn('product_name_nocase_idx', self.search(Product, 'avi').explain())
+
+    def test_exact_searches_accept_any_term(self):
+        self.client.force_login(self.admin)
+        for name in ('bill', 'goodsreceipt', 'product'):
+            with self.subTest(name=name):
+                response = self.client.get(reverse(f'admin:customers_{name}_changelist'), {'q': 'abc'})
+                self.assertEqual(response.status_code, 200)
+
+    def test_customer_changelist_is_ordered_by_primary_key(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('admin:customers_customer_changelist'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['cl'].get_ordering(response.wsgi_request, Customer.objects.all())[0], '-pk')
+
+
+class AdminRepriceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('owner', password='secret')
+        cls.product = Product.objects.create(name='Aviator', sku='AV-1', price=100)
+
+    def reprice(self, percent):
+        self.client.force_login(self.admin)
+        return self.client.post(reverse('admin:customers_product_changelist'), {
+            'action': 'reprice', '_selected_action': [self.product.pk], 'percent': percent,
+        })
+
+    def test_valid_percentage_reprices(self):
+        self.assertEqual(self.reprice('10').status_code, 302)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.price, Decimal('110.00'))
+
+    def test_invalid_percentages_are_rejected_without_an_error_page(self):
+        for percent in ('NaN', 'Infinity', '-100', 'ten'):
+            with self.subTest(percent=percent):
+                self.assertEqual(self.reprice(percent).status_code, 302)
+                self.product.refresh_from_db()
+                self.assertEqual(self.product.price, Decimal('100.00'))
@@ -0,0 +1,66 @@
+from datetime import date, timedelta
+
+from django.test import TestCase
+
+from customers import ageing
+from customers.models import Inventory, InventoryAgeingRun, Product
+
+Bucket = Inventory.ExpiryBucket
+TODAY = date(2024, 6, 1)
+
+
+class AgeingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(name='Daily lenses', price=500)
+
+    def batch(self, number, expiry_date):
+        return Inventory.objects.create(
+            product=self.product, batch_number=number, quantity=10, purchase_price=300,
+            selling_price=500, purchase_date=TODAY - timedelta(days=30), expiry_date=expiry_date,
+        )
+
+    def test_expiry_bucket_thresholds(self):
+        self.assertEqual(ageing.expiry_bucket_for(TODAY - timedelta(days=1), TODAY), Bucket.EXPIRED)
+        self.assertEqual(ageing.expiry_bucket_for(TODAY + timedelta(days=30), TODAY), Bucket.CRITICAL)
+        self.assertEqual(ageing.expiry_bucket_for(TODAY + timedelta(days=90), TODAY), Bucket.NEAR)
+        self.assertEqual(ageing.expiry_bucket_for(TODAY + timedelta(days=91), TODAY), Bucket.OK)
+        self.assertIsNone(ageing.expiry_bucket_for(None, TODAY))
+
+    def test_incremental_run_only_moves_batches_that_crossed_a_boundary(self):
+        crossing = self.batch('B1', TODAY + timedelta(days=31))
+        steady = self.batch('B2', TODAY + timedelta(days=200))
+        ageing.run_ageing(as_of=TODAY)
+        crossing.refresh_from_db()
+        self.assertEqual(crossing.expiry_bucket, Bucket.NEAR)
+
+        run = ageing.run_ageing(as_of=TODAY + timedelta(days=1))
+        self.assertEqual(run.batches_updated, 1)
+        self.assertEqual(run.batches_checked, 1)
+        crossing.refresh_from_db()
+        steady.refresh_from_db()
+        self.assertEqual(crossing.expiry_bucket, Bucket.CRITICAL)
+        self.assertEqual(steady.expiry_bucket, Bucket.OK)
+        self.assertEqual(InventoryAgeingRun.objects.count(), 2)
+
+    def test_incremental_candidates_are_read_through_indexes(self):
+        ageing.run_ageing(as_of=TODAY)
+        plan = ageing._crossing_batches(InventoryAgeingRun.objects.first(), TODAY + timedelta(days=1)).explain()
+        self.assertIn('inventory_active_expiry_idx', plan)
+        self.assertIn('inventory_modified_idx', plan)
+        self.assertNotIn('SCAN customers_inventory', plan)
+
+    def test_running_as_of_an_earlier_date_recomputes_every_batch(self):
+        batch = self.batch('B1', TODAY + timedelta(days=20))
+        ageing.run_ageing(as_of=TODAY)
+        run = ageing.run_ageing(as_of=TODAY - timedelta(days=30))
+        self.assertEqual(run.batches_checked, 1)
+        batch.refresh_from_db()
+        self.assertEqual(batch.expiry_bucket, Bucket.NEAR)
+
+    def test_markdown_proposals_discount_near_expiry_stock(self):
+        self.batch('B1', TODAY + timedelta(days=10))
+        ageing.run_ageing(as_of=TODAY)
+        [proposal] = ageing.markdown_proposals(as_of=TODAY)
+        self.assertEqual(proposal['days_to_expiry'], 10)
+        self.assertEqual(str(proposal['proposed_price']), '350.00')
@@ -0,0 +1,57 @@
+from datetime import date
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from customers import analytics
+from customers.models import Product, ProductCategory, Sale
+
+
+class SeriesTests(SimpleTestCase):
+    def test_revenue_series_fills_gaps_with_zeros(self):
+        dates = np.array(['2024-01-01', '2024-01-03', '2024-01-03'], dtype='datetime64[D]')
+        buckets, revenue = analytics.revenue_series(dates, np.array([10.0, 5.0, 5.0]), 'day')
+        self.assertEqual([str(b) for b in buckets], ['2024-01-01', '2024-01-02', '2024-01-03'])
+        self.assertEqual(list(revenue), [10.0, 0.0, 10.0])
+
+    def test_weeks_start_on_monday(self):
+        dates = np.array(['2024-01-07', '2024-01-08'], dtype='datetime64[D]')  # Sunday, Monday
+        self.assertEqual([str(d) for d in analytics.bucket_dates(dates, 'week')], ['2024-01-01', '2024-01-08'])
+
+    def test_moving_average_averages_what_is_available(self):
+        self.assertEqual(list(analytics.moving_average(np.array([2.0, 4.0, 6.0, 8.0]), 2)), [2.0, 3.0, 5.0, 7.0])
+
+
+class SalesAnalyticsViewTests(TestCase):
+    databases = {'default', 'archive'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('counter', password='secret')
+        category = ProductCategory.objects.create(name='Frames')
+        cls.product = Product.objects.create(name='<img src=x onerror=alert(1)>', category=category, price=100)
+        for day in (1, 2):
+            Sale.objects.create(date=date(2024, 4, day), product=cls.product, quantity=2, price=100, created_by=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_totals_and_top_products(self):
+        data = self.client.get(reverse('customers:sales_analytics'), {'period': 'day'}).json()
+        self.assertEqual(data['total_revenue'], 400.0)
+        self.assertEqual(data['units_sold'], 4)
+        self.assertEqual(data['top_products'][0]['id'], self.product.pk)
+        self.assertEqual(data['top_categories'][0]['name'], 'Frames')
+
+    def test_unknown_period_is_rejected(self):
+        self.assertEqual(self.client.get(reverse('customers:sales_analytics'), {'period': 'year'}).status_code, 400)
+
+    def test_product_names_reach_the_report_only_as_json_data(self):
+        response = self.client.get(reverse('customers:sales_report'))
+        self.assertNotContains(response, self.product.name)
+        data = self.client.get(reverse('customers:sales_analytics'), {'period': 'day'}).json()
+        self.assertIn(self.product.name, data['top_products'][0]['name'])
@@ -0,0 +1,50 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from customers.models import Customer
+
+
+class ApiListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('counter', password='secret')
+        cls.other = User.objects.create_user('other', password='secret')
+        cls.customers = [
+            Customer.objects.create(user=cls.user, first_name=f'Customer {n}', phone=f'98000000{n:02d}')
+            for n in range(5)
+        ]
+        Customer.objects.create(user=cls.other, first_name='Not mine', phone='9700000000')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_projects_requested_fields_and_always_returns_id(self):
+        response = self.client.get(reverse('customers:api_list', args=['customers']), {'fields': 'phone'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()['results'][0]), {'id', 'phone'})
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get(reverse('customers:api_list', args=['customers']), {'fields': 'password'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_keyset_pages_cover_only_own_rows(self):
+        url = reverse('customers:api_list', args=['customers'])
+        first = self.client.get(url, {'limit': 3}).json()
+        self.assertEqual(len(first['results']), 3)
+        second = self.client.get(url, {'limit': 3, 'after': first['next']}).json()
+        self.assertIsNone(second['next'])
+        ids = [row['id'] for row in first['results'] + second['results']]
+        self.assertEqual(ids, [customer.pk for customer in self.customers])
+
+    def test_etag_gives_not_modified_until_a_row_changes(self):
+        url = reverse('customers:api_list', args=['customers'])
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        Customer.objects.create(user=self.user, first_name='New', phone='9800000099')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_detail_of_another_users_row_is_not_found(self):
+        other = Customer.objects.get(user=self.other)
+        response = self.client.get(reverse('customers:api_detail', args=['customers', other.pk]))
+        self.assertEqual(response.status_code, 404)
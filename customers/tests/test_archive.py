@@ -0,0 +1,71 @@
+import io
+from datetime import date, datetime
+
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from customers import archive
+from customers.models import ArchivedBill, ArchivedSale, Bill, Customer, Product, Sale
+
+
+class ArchiveTests(TestCase):
+    databases = {'default', 'archive'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('counter', password='secret')
+        cls.product = Product.objects.create(name='Aviator', price=100)
+        customer = Customer.objects.create(user=cls.user, first_name='Asha', phone='9800000001')
+        for day in (date(2022, 5, 1), date(2023, 3, 31), date(2023, 4, 1)):
+            Sale.objects.create(date=day, product=cls.product, quantity=1, price=100, created_by=cls.user)
+        bill = Bill.objects.create(customer=customer, total=100, payment_method='CASH', created_by=cls.user)
+        bill.products.add(cls.product)
+        Bill.objects.filter(pk=bill.pk).update(date=timezone.make_aware(datetime(2023, 3, 31, 12)))
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_archiving_moves_the_closed_year_and_moves_the_boundary(self):
+        self.assertIsNone(archive.archive_boundary())
+        self.assertFalse(archive.needs_archive(None))
+
+        counts = archive.archive_through(2022)
+
+        self.assertEqual(counts['sales'], 2)
+        self.assertEqual(counts['bills'], 1)
+        self.assertEqual(archive.archive_boundary(), date(2023, 4, 1))
+        self.assertTrue(archive.needs_archive(date(2023, 3, 1)))
+        self.assertFalse(archive.needs_archive(date(2023, 4, 1)))
+        self.assertEqual(list(Sale.objects.values_list('date', flat=True)), [date(2023, 4, 1)])
+        self.assertEqual(ArchivedBill.objects.get().product_ids, [self.product.pk])
+        self.assertEqual(archive.archived_sales(self.user, date(2023, 1, 1)).count(), 1)
+        self.assertFalse(archive.archived_sales(self.user, date(2023, 4, 1)).exists())
+
+    def test_open_year_cannot_be_archived(self):
+        with self.assertRaises(ValueError):
+            archive.archive_through(timezone.localdate().year)
+
+    def test_archive_year_command_moves_the_boundary(self):
+        call_command('archive_year', '2022', stdout=io.StringIO())
+        self.assertEqual(archive.archive_boundary(), date(2023, 4, 1))
+        self.assertFalse(Bill.objects.exists())
+        with self.assertRaises(CommandError):
+            call_command('archive_year', str(timezone.localdate().year), stdout=io.StringIO())
+
+    def test_report_pages_archived_sales(self):
+        archive.archive_through(2022)
+        ArchivedSale.objects.bulk_create([
+            ArchivedSale(
+                original_id=1000 + n, financial_year=2021, date=date(2021, 5, 1), product_id=self.product.pk,
+                product_name='Aviator', quantity=1, price=10, total=10, created_by_id=self.user.pk,
+            )
+            for n in range(archive.REPORT_PAGE_SIZE)
+        ])
+        response = self.client.get(reverse('customers:sales_report'))
+        self.assertEqual(len(response.context['archived_sales']), archive.REPORT_PAGE_SIZE)
+        self.assertEqual(response.context['archived_total'], 200 + 10 * archive.REPORT_PAGE_SIZE)
+        response = self.client.get(reverse('customers:sales_report'), {'archived_page': 2})
+        self.assertEqual(len(response.context['archived_sales']), 2)
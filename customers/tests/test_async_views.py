@@ -0,0 +1,45 @@
+from datetime import date
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.test import RequestFactory, TransactionTestCase
+
+from customers import async_views, views
+from customers.models import Customer, Product, Sale
+
+
+class AsyncViewTests(TransactionTestCase):
+    # The async views query from pool threads, which need committed rows.
+    databases = {'default', 'archive'}
+
+    def setUp(self):
+        self.user = User.objects.create_user('counter', password='secret')
+        Customer.objects.create(user=self.user, first_name='Asha', phone='9800000001')
+        product = Product.objects.create(name='Aviator', price=100)
+        for day, quantity in ((1, 1), (2, 3)):
+            Sale.objects.create(date=date(2024, 4, day), product=product, quantity=quantity, price=100, created_by=self.user)
+
+    def get(self, view, path, **params):
+        request = RequestFactory().get(path, params)
+        request.user = self.user
+
+        async def auser():
+            return self.user
+        request.auser = auser
+        if view.__module__ == async_views.__name__:
+            return async_to_sync(view)(request)
+        return view(request)
+
+    def test_sales_report_matches_the_sync_view(self):
+        for view in (views.sales_report, async_views.sales_report):
+            with self.subTest(view=view.__module__):
+                response = self.get(view, '/customers/sales/', start_date='2024-04-02')
+                self.assertContains(response, '<p>300 Rs</p>')
+                self.assertContains(response, '<td>2024-04-02</td>')
+                self.assertNotContains(response, '<td>2024-04-01</td>')
+
+    def test_dashboard_matches_the_sync_view(self):
+        for view in (views.dashboard, async_views.dashboard):
+            with self.subTest(view=view.__module__):
+                response = self.get(view, '/customers/dashboard/')
+                self.assertEqual(response.status_code, 200)
@@ -0,0 +1,53 @@
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+
+class CachedUserTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('counter', password='secret')
+
+    def setUp(self):
+        cache.clear()
+        self.client.login(username='counter', password='secret')
+        self.url = reverse('customers:view_customers')
+        self.client.get(self.url)  # warm the session and user caches
+
+    def auth_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        return response, [q['sql'] for q in queries.captured_queries if '"auth_user"' in q['sql']]
+
+    def test_cached_user_costs_no_query(self):
+        response, queries = self.auth_queries()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(queries, [])
+
+    def test_save_drops_the_cached_user(self):
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+
+    @override_settings(AUTH_USER_RECHECK_INTERVAL=0)
+    def test_password_changed_elsewhere_ends_the_session(self):
+        # update() skips the signals, as a change made by another process would.
+        User.objects.filter(pk=self.user.pk).update(password=make_password('changed'))
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+
+    @override_settings(AUTH_USER_RECHECK_INTERVAL=0)
+    def test_deactivation_elsewhere_ends_the_session(self):
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+
+    @override_settings(AUTH_USER_RECHECK_INTERVAL=0)
+    def test_unchanged_user_is_rechecked_with_one_narrow_query(self):
+        response, queries = self.auth_queries()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 1)
+        self.assertIn('"password"', queries[0])
+        self.assertNotIn('"username"', queries[0])
@@ -0,0 +1,76 @@
+import gzip
+import io
+import os
+import sqlite3
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, override_settings
+
+from customers import backup
+
+
+class SqliteBackupTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.source = os.path.join(directory.name, 'shop.sqlite3')
+        db = sqlite3.connect(self.source)
+        db.execute('CREATE TABLE sale (id INTEGER PRIMARY KEY, total REAL)')
+        db.executemany('INSERT INTO sale (total) VALUES (?)', [(n,) for n in range(1000)])
+        db.commit()
+        db.close()
+        backups = override_settings(BACKUP_DIR=os.path.join(directory.name, 'backups'))
+        backups.enable()
+        self.addCleanup(backups.disable)
+        databases = mock.patch.dict(settings.DATABASES, {'shop': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': self.source}})
+        databases.start()
+        self.addCleanup(databases.stop)
+
+    def test_backup_is_compressed_verified_and_skipped_when_unchanged(self):
+        path, manifest = backup.backup_database('shop')
+        self.assertEqual(manifest['engine'], 'sqlite')
+        backup.verify_backup(path)
+        with gzip.open(path) as archive:
+            self.assertTrue(archive.read(16).startswith(b'SQLite format 3'))
+        self.assertIsNone(backup.backup_database('shop'))
+        self.assertEqual(backup.list_backups('shop'), [path])
+
+    def test_corrupted_backup_fails_verification(self):
+        path, _ = backup.backup_database('shop')
+        path.write_bytes(b'not a backup')
+        with self.assertRaises(backup.BackupError):
+            backup.verify_backup(path)
+
+    def test_rotation_keeps_the_newest(self):
+        paths = []
+        for stamp in ('20240101-000000', '20240102-000000', '20240103-000000'):
+            with mock.patch.object(backup.timezone, 'localtime') as localtime:
+                localtime.return_value.strftime.return_value = stamp
+                paths.append(backup.backup_database('shop', force=True)[0])
+        removed = backup.rotate_backups('shop', keep=2)
+        self.assertEqual(removed, [paths[0]])
+        self.assertEqual(backup.list_backups('shop'), [paths[2], paths[1]])
+        self.assertFalse(os.path.exists(f'{paths[0]}.json'))
+
+    def test_copy_errors_are_backup_errors(self):
+        with mock.patch.object(backup, '_online_copy', side_effect=sqlite3.OperationalError('database is locked')):
+            with self.assertRaises(backup.BackupError):
+                backup.backup_database('shop')
+        with mock.patch.object(backup, '_online_copy', side_effect=OSError(28, 'No space left on device')):
+            with self.assertRaises(backup.BackupError):
+                backup.backup_database('shop')
+
+    def test_scheduled_run_survives_a_failed_copy(self):
+        with mock.patch.object(backup, '_online_copy', side_effect=sqlite3.OperationalError('database is locked')), \
+                mock.patch('customers.management.commands.backup_db.time.sleep', side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                call_command('backup_db', database=['shop'], every=60, stdout=io.StringIO(), stderr=io.StringIO())
+
+    def test_keeping_no_backups_is_rejected(self):
+        for keep in (0, -1):
+            with self.subTest(keep=keep), self.assertRaises(CommandError):
+                call_command('backup_db', database=['shop'], keep=keep, stdout=io.StringIO())
+        self.assertEqual(backup.list_backups('shop'), [])
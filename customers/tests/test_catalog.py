@@ -0,0 +1,85 @@
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from customers.catalog import AmbiguousCode, catalog
+from customers.models import Inventory, Product
+
+
+class CatalogScanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('counter', password='secret')
+        cls.product = Product.objects.create(name='Aviator', sku='AV-1', barcode='8900000000017', price=2000)
+        for number, expiry in [('LATE', date(2026, 1, 1)), ('SOON', date(2025, 1, 1))]:
+            Inventory.objects.create(
+                product=cls.product, batch_number=number, quantity=5, purchase_price=1000,
+                selling_price=1800, purchase_date=date(2024, 1, 1), expiry_date=expiry,
+            )
+
+    def setUp(self):
+        catalog.invalidate()
+
+    def test_barcode_scan_returns_the_first_expiring_batch(self):
+        result = catalog.lookup('8900000000017')
+        self.assertEqual(result['product']['id'], self.product.pk)
+        self.assertEqual(result['batch']['batch_number'], 'SOON')
+
+    def test_batch_scan_returns_that_batch(self):
+        self.assertEqual(catalog.lookup(' LATE ')['batch']['batch_number'], 'LATE')
+        self.assertIsNone(catalog.lookup('UNKNOWN'))
+
+    def test_saves_refresh_the_warm_index(self):
+        catalog.warm()
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.get(pk=self.product.pk)
+            product.sku = 'AV-2'
+            product.save()
+        self.assertIsNone(catalog.lookup('AV-1'))
+        self.assertEqual(catalog.lookup('AV-2')['product']['sku'], 'AV-2')
+
+    def test_scan_endpoint(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('customers:scan_lookup'), {'code': 'AV-1'})
+        self.assertEqual(response.json()['price'], '1800.00')
+        self.assertEqual(self.client.get(reverse('customers:scan_lookup'), {'code': 'nope'}).status_code, 404)
+
+
+class SharedCodeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('counter', password='secret')
+        cls.aviator = Product.objects.create(name='Aviator', sku='AV-1', price=2000)
+        cls.wayfarer = Product.objects.create(name='Wayfarer', sku='WF-1', price=1500)
+        for product in (cls.aviator, cls.wayfarer):
+            Inventory.objects.create(
+                product=product, batch_number='B100', quantity=5, purchase_price=1000,
+                selling_price=product.price, purchase_date=date(2024, 1, 1),
+            )
+        # A batch numbered like another product's SKU.
+        Inventory.objects.create(
+            product=cls.wayfarer, batch_number='AV-1', quantity=5, purchase_price=1000,
+            selling_price=1500, purchase_date=date(2024, 1, 1),
+        )
+
+    def setUp(self):
+        catalog.invalidate()
+
+    def test_batch_number_of_two_products_is_ambiguous(self):
+        with self.assertRaises(AmbiguousCode) as raised:
+            catalog.lookup('B100')
+        self.assertCountEqual([p['id'] for p in raised.exception.products], [self.aviator.pk, self.wayfarer.pk])
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('customers:scan_lookup'), {'code': 'B100'})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(len(response.json()['products']), 2)
+
+    def test_sku_wins_over_a_batch_number_before_and_after_a_refresh(self):
+        self.assertEqual(catalog.lookup('AV-1')['product']['id'], self.aviator.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.get(pk=self.wayfarer.pk).save()
+        self.assertEqual(catalog.lookup('AV-1')['product']['id'], self.aviator.pk)
+        with self.assertRaises(AmbiguousCode):
+            catalog.lookup('B100')
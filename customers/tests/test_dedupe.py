@@ -0,0 +1,61 @@
+from datetime import date
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from customers import dedupe
+from customers.models import (
+    ArchivedBill, ArchivedFinancialYear, ChangeLogEntry, Customer, CustomerHistory, Prescription,
+)
+
+
+class MergeCustomersTests(TestCase):
+    databases = {'default', 'archive'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('counter', password='secret')
+
+    def setUp(self):
+        self.survivor = Customer.objects.create(user=self.user, first_name='Asha', phone='9800000001')
+        self.duplicate = Customer.objects.create(
+            user=self.user, first_name='Asha', phone='9800000002', email='asha@example.com',
+        )
+        self.prescription = Prescription.objects.create(customer=self.duplicate, date=date(2024, 4, 1))
+        ArchivedFinancialYear.objects.create(start_year=2022)
+        self.archived_bill = ArchivedBill.objects.create(
+            original_id=1, financial_year=2022, date=timezone.now(), customer_id=self.duplicate.pk,
+            customer_user_id=self.user.pk, total=100, payment_method='CASH',
+        )
+
+    def test_related_rows_move_to_the_survivor(self):
+        self.assertEqual(dedupe.merge_customers(self.survivor, [self.duplicate]), 1)
+
+        self.assertFalse(Customer.objects.filter(pk=self.duplicate.pk).exists())
+        self.survivor.refresh_from_db()
+        self.assertEqual(self.survivor.email, 'asha@example.com')
+        self.assertEqual(self.survivor.latest_prescription_id, self.prescription.pk)
+        self.assertEqual(Prescription.objects.get().customer_id, self.survivor.pk)
+        self.assertEqual(ArchivedBill.objects.get().customer_id, self.survivor.pk)
+        self.assertTrue(CustomerHistory.objects.filter(customer=self.survivor).exists())
+
+    def test_moved_prescriptions_are_logged_for_replication(self):
+        dedupe.merge_customers(self.survivor, [self.duplicate])
+
+        entry = ChangeLogEntry.objects.filter(uid=self.prescription.sync_uid).latest('pk')
+        self.assertEqual(entry.op, ChangeLogEntry.Operation.SAVE)
+        self.assertEqual(entry.data['customer'], str(self.survivor.sync_uid))
+        self.assertTrue(ChangeLogEntry.objects.filter(
+            uid=self.duplicate.sync_uid, op=ChangeLogEntry.Operation.DELETE,
+        ).exists())
+
+    def test_failed_merge_leaves_both_databases_unchanged(self):
+        with mock.patch.object(CustomerHistory.objects, 'create', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                dedupe.merge_customers(self.survivor, [self.duplicate])
+
+        self.assertTrue(Customer.objects.filter(pk=self.duplicate.pk).exists())
+        self.assertEqual(Prescription.objects.get().customer_id, self.duplicate.pk)
+        self.assertEqual(ArchivedBill.objects.get().customer_id, self.duplicate.pk)
@@ -0,0 +1,64 @@
+from datetime import date, timedelta
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from customers import forecasting
+from customers.models import Inventory, Product, ProductForecast, Sale, Supplier
+
+
+class SmoothingTests(TestCase):
+    def test_steady_demand_is_forecast_flat_with_no_error(self):
+        demand = np.array([[0.0] * 10 + [4.0] * 94, [0.0] * 104])
+        level, trend, seasonal, error = forecasting.smooth(demand)
+        self.assertAlmostEqual(level[0], 4.0)
+        self.assertAlmostEqual(trend[0], 0.0)
+        self.assertAlmostEqual(error[0], 0.0)
+        # A product that never sold gets no forecast.
+        self.assertTrue(np.isnan(error[1]))
+        weekly = forecasting.weekly_forecast(level, trend, seasonal, 3)
+        np.testing.assert_allclose(weekly[0], [4.0, 4.0, 4.0])
+
+    def test_demand_over_interpolates_part_weeks(self):
+        weekly = np.array([[2.0, 4.0, 6.0]])
+        self.assertEqual(forecasting.demand_over(weekly, np.array([1.5]))[0], 4.0)
+
+
+class ReorderTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('counter', password='secret')
+        cls.supplier = Supplier.objects.create(name='Lens Co', lead_time_days=14)
+        cls.product = Product.objects.create(name='Aviator', price=100, reorder_level=1)
+        cls.idle = Product.objects.create(name='Round', price=100, reorder_level=1)
+        for product, quantity in ((cls.product, 5), (cls.idle, 5)):
+            Inventory.objects.create(product=product, supplier=cls.supplier, batch_number=f'B-{product.pk}',
+                                     quantity=quantity, purchase_price=50, selling_price=100,
+                                     purchase_date=date(2024, 1, 1))
+        cls.as_of = date(2024, 6, 3)
+        for week in range(1, 21):
+            Sale.objects.create(date=cls.as_of - timedelta(weeks=week), product=cls.product,
+                                quantity=10, price=100, created_by=cls.user)
+
+    def test_forecast_sets_the_reorder_point_from_the_supplier_lead_time(self):
+        run = forecasting.refresh_forecasts(as_of=self.as_of)
+        self.assertEqual(run.products_forecast, 1)
+
+        forecast = ProductForecast.objects.get(product=self.product)
+        self.assertEqual(forecast.supplier_id, self.supplier.pk)
+        self.assertEqual(forecast.lead_time_days, 14)
+        self.assertEqual(forecast.reorder_point, 20)
+        self.assertEqual(forecast.order_up_to, 60)
+        self.assertFalse(ProductForecast.objects.filter(product=self.idle).exists())
+        self.assertEqual(list(forecasting.low_stock()), [self.product])
+        [group] = forecasting.reorder_suggestions()
+        self.assertEqual(group['supplier'], 'Lens Co')
+        self.assertEqual(group['items'][0]['quantity'], 55)
+
+    def test_unchanged_forecasts_are_not_rewritten_and_stale_ones_are_dropped(self):
+        forecasting.refresh_forecasts(as_of=self.as_of)
+        self.assertEqual(forecasting.refresh_forecasts(as_of=self.as_of).forecasts_updated, 0)
+        Sale.objects.all().delete()
+        self.assertEqual(forecasting.refresh_forecasts(as_of=self.as_of).forecasts_updated, 1)
+        self.assertFalse(ProductForecast.objects.exists())
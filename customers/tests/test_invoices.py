@@ -0,0 +1,82 @@
+import os
+import tempfile
+import threading
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from customers import invoices
+from customers.models import Bill, Customer, Product
+
+
+class InvoiceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = user = User.objects.create_user('counter', password='secret')
+        customer = Customer.objects.create(user=user, first_name='Asha', phone='9800000001')
+        cls.product = Product.objects.create(name='Aviator', price=1000, hsn_code='9004')
+        cls.bill = Bill.objects.create(customer=customer, total=1000, payment_method='CASH', created_by=user)
+        cls.bill.products.add(cls.product)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache_dir = directory.name
+        settings = override_settings(INVOICE_CACHE_DIR=self.cache_dir)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_invoice_is_rendered_once_per_bill_version(self):
+        for fmt in invoices.FORMATS:
+            pdf = invoices.get_invoice_pdf(self.bill, fmt)
+            self.assertTrue(pdf.startswith(b'%PDF'))
+            with mock.patch.object(invoices, 'render_invoice') as render:
+                self.assertEqual(invoices.get_invoice_pdf(self.bill, fmt), pdf)
+            render.assert_not_called()
+
+    def test_invoice_data_uses_the_price_when_billed(self):
+        self.product.price = 1200
+        self.product.save()
+        self.assertEqual(invoices.invoice_data(self.bill)['lines'][0]['price'], '1000.00')
+
+    def test_rebuilding_a_batch_never_serves_the_previous_archive(self):
+        path = invoices.batch_archive_path('1-2024-04-a4')
+        os.makedirs(os.path.dirname(path))
+        with open(path, 'wb') as stale:
+            stale.write(b'stale')
+
+        release = threading.Event()
+        temporaries = []
+
+        def render(bills, archive_path, fmt):
+            temporaries.append(archive_path)
+            release.wait(5)
+            with open(archive_path, 'wb') as handle:
+                handle.write(b'fresh')
+
+        with mock.patch.object(invoices, 'render_batch', render):
+            future = invoices.start_batch(Bill.objects.none(), '1-2024-04-a4')
+            self.assertFalse(os.path.exists(path))
+            release.set()
+            future.result(5)
+        with open(path, 'rb') as archive:
+            self.assertEqual(archive.read(), b'fresh')
+        self.assertNotEqual(temporaries[0], f'{path}.tmp')
+        self.assertEqual(os.listdir(os.path.dirname(path)), [os.path.basename(path)])
+
+    def test_failed_batch_is_reported_to_the_polling_client(self):
+        name = f'{self.user.pk}-2024-04-a4'
+        with mock.patch.object(invoices, 'render_batch', side_effect=OSError('disk full')):
+            future = invoices.start_batch(Bill.objects.none(), name)
+            with self.assertRaises(OSError):
+                future.result(5)
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('customers:invoice_batch_download', args=[name]))
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.json(), {'status': 'failed', 'error': 'disk full'})
+
+        with mock.patch.object(invoices, 'render_batch'):
+            invoices.start_batch(Bill.objects.none(), name).result(5)
+        self.assertIsNone(invoices.batch_error(name))
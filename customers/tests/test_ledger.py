@@ -0,0 +1,90 @@
+from datetime import date
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+
+from customers import ledger
+from customers.models import Inventory, Product, Supplier, SupplierLedgerEntry
+
+EntryType = SupplierLedgerEntry.EntryType
+
+
+class SupplierLedgerTests(TestCase):
+    def setUp(self):
+        self.supplier = Supplier.objects.create(name='Lens House', payment_terms='30D', credit_limit=1000)
+
+    def entry(self, entry_type, amount, day):
+        return SupplierLedgerEntry.objects.create(
+            supplier=self.supplier, entry_type=entry_type, amount=amount, date=date(2024, 1, day),
+        )
+
+    def test_balance_and_running_balance(self):
+        self.entry(EntryType.INVOICE, 500, 1)
+        self.entry(EntryType.PAYMENT, 200, 2)
+        self.entry(EntryType.DEBIT_NOTE, 50, 3)
+        self.supplier.refresh_from_db()
+        self.assertEqual(self.supplier.balance, Decimal('250'))
+        balances = [e.running_balance for e in ledger.ledger_with_running_balance(self.supplier)]
+        self.assertEqual(balances, [Decimal('500'), Decimal('300'), Decimal('250')])
+        self.assertEqual(self.supplier.recalculate_balance(), Decimal('250'))
+
+    def test_invoice_due_date_follows_payment_terms(self):
+        invoice = self.entry(EntryType.INVOICE, 100, 1)
+        self.assertEqual(invoice.due_date, date(2024, 1, 31))
+
+    def test_ageing_assigns_the_balance_to_the_newest_invoices(self):
+        self.entry(EntryType.INVOICE, 300, 1)   # due 31 Jan
+        self.entry(EntryType.INVOICE, 200, 20)  # due 19 Feb
+        self.entry(EntryType.PAYMENT, 250, 21)
+        self.supplier.refresh_from_db()
+        buckets = {row['bucket']: row['amount'] for row in ledger.payables_ageing(self.supplier, date(2024, 2, 10))}
+        self.assertEqual(buckets['Not due'], Decimal('200'))
+        self.assertEqual(buckets['1-30 days'], Decimal('50'))
+
+    def test_credit_limit(self):
+        self.entry(EntryType.INVOICE, 900, 1)
+        self.supplier.refresh_from_db()
+        ledger.check_credit(self.supplier, Decimal('100'))
+        with self.assertRaises(ValidationError):
+            ledger.check_credit(self.supplier, Decimal('101'))
+
+    def test_credit_check_reads_the_current_balance(self):
+        stale = Supplier.objects.get(pk=self.supplier.pk)
+        self.entry(EntryType.INVOICE, 900, 1)
+        with self.assertRaises(ValidationError):
+            ledger.check_credit(stale, Decimal('101'))
+
+
+class StockInInvoiceTests(TestCase):
+    def setUp(self):
+        self.supplier = Supplier.objects.create(name='Lens House', payment_terms='30D', credit_limit=1000)
+        self.product = Product.objects.create(name='Aviator', price=100)
+        self.batch = Inventory.objects.create(
+            product=self.product, supplier=self.supplier, batch_number='B1', quantity=10,
+            purchase_price=50, selling_price=100, purchase_date=date(2024, 1, 1),
+        )
+        ledger.record_stock_in(self.batch)
+
+    def edit(self, **changes):
+        previous = Inventory.objects.get(pk=self.batch.pk)
+        for field, value in changes.items():
+            setattr(self.batch, field, value)
+        self.batch.save()
+        return ledger.record_stock_in(self.batch, previous=previous)
+
+    def test_editing_a_batch_adjusts_its_invoice(self):
+        invoice = self.edit(quantity=12)
+        self.assertEqual(invoice.amount, Decimal('600'))
+        self.supplier.refresh_from_db()
+        self.assertEqual(self.supplier.balance, Decimal('600'))
+        self.assertEqual(SupplierLedgerEntry.objects.count(), 1)
+
+    def test_edit_past_the_credit_limit_is_refused(self):
+        with self.assertRaises(ValidationError):
+            self.edit(quantity=30)
+
+    def test_invoiced_batch_cannot_change_supplier(self):
+        other = Supplier.objects.create(name='Frame Co', payment_terms='COD')
+        with self.assertRaises(ValidationError):
+            self.edit(supplier=other)
@@ -0,0 +1,17 @@
+import socket
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+
+class LoadTestCommandTests(TestCase):
+    def test_busy_port_is_refused_before_anything_is_seeded(self):
+        with socket.socket() as listener:
+            listener.bind(('127.0.0.1', 0))
+            listener.listen()
+            port = listener.getsockname()[1]
+            with self.assertRaisesMessage(CommandError, f"Port {port} is already in use"):
+                call_command('load_test', port=port, users=1, duration=1)
+        self.assertFalse(User.objects.filter(username__startswith='loadtest-').exists())
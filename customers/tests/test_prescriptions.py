@@ -0,0 +1,50 @@
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from customers.forms import CustomerForm
+from customers.models import Customer, Prescription
+
+
+class LatestPrescriptionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('counter', password='secret')
+
+    def setUp(self):
+        self.customer = Customer.objects.create(user=self.user, first_name='Asha', phone='9800000001')
+
+    def latest(self):
+        self.customer.refresh_from_db()
+        return self.customer.latest_prescription_id
+
+    def test_pointer_follows_the_newest_prescription(self):
+        old = Prescription.objects.create(customer=self.customer, date=date(2023, 1, 1), sph_left=Decimal('-1.00'))
+        self.assertEqual(self.latest(), old.pk)
+        new = Prescription.objects.create(customer=self.customer, date=date(2024, 1, 1), sph_left=Decimal('-1.50'))
+        self.assertEqual(self.latest(), new.pk)
+        new.delete()
+        self.assertEqual(self.latest(), old.pk)
+
+    def test_form_starts_from_the_latest_readings(self):
+        Prescription.objects.create(customer=self.customer, sph_left=Decimal('-1.25'), axis_right=90)
+        customer = Customer.objects.select_related('latest_prescription').get(pk=self.customer.pk)
+        form = CustomerForm(instance=customer)
+        self.assertEqual(form.initial['sph_left'], Decimal('-1.25'))
+        self.assertEqual(form.initial['axis_right'], 90)
+
+    def test_edit_records_a_prescription_only_when_the_readings_change(self):
+        self.client.force_login(self.user)
+        url = reverse('customers:edit_customer', args=[self.customer.pk])
+        data = {'first_name': 'Asha', 'phone': '9800000001', 'sph_left': '-1.25'}
+
+        self.assertEqual(self.client.post(url, data).status_code, 302)
+        self.assertEqual(self.client.post(url, data).status_code, 302)
+        self.assertEqual(Prescription.objects.filter(customer=self.customer).count(), 1)
+
+        self.client.post(url, {**data, 'sph_left': '-1.50'})
+        self.assertEqual(Prescription.objects.filter(customer=self.customer).count(), 2)
+        self.assertEqual(Prescription.objects.get(pk=self.latest()).sph_left, Decimal('-1.50'))
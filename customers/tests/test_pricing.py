@@ -0,0 +1,96 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from customers import pricing
+from customers.models import Bill, Customer, PriceHistory, Product
+
+
+class RepriceViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('owner', password='secret')
+        cls.product = Product.objects.create(name='Aviator', sku='AV-1', brand='Ray', price=100)
+        cls.other = Product.objects.create(name='Wayfarer', sku='WF-1', brand='Ray', price=200)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def post(self, button, follow=False, **extra):
+        return self.client.post(reverse('customers:reprice_products'), {
+            'brand': 'Ray', 'target': 'price', 'base': 'price', 'percent': '10', 'round_to': '0.01',
+            button: '1', **extra,
+        }, follow=follow)
+
+    def preview_plan(self):
+        response = self.post('preview')
+        self.assertEqual(response.context['applicable'], 2)
+        return response.context['plan']
+
+    def test_page_loads_the_supplier_autocomplete(self):
+        response = self.client.get(reverse('customers:reprice_products'))
+        self.assertContains(response, 'autocomplete.js')
+
+    def test_applying_the_same_preview_twice_does_not_compound(self):
+        plan = self.preview_plan()
+        self.assertEqual(self.post('apply', plan=plan).status_code, 302)
+        self.assertEqual(self.post('apply', plan=plan).status_code, 302)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.price, Decimal('110.00'))
+        self.assertEqual(PriceHistory.objects.filter(product=self.product).count(), 1)
+
+    def test_products_repriced_since_the_preview_are_skipped(self):
+        plan = self.preview_plan()
+        Product.objects.filter(pk=self.other.pk).update(price=250)
+        response = self.post('apply', plan=plan, follow=True)
+        self.product.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertEqual(self.product.price, Decimal('110.00'))
+        self.assertEqual(self.other.price, Decimal('250.00'))
+        self.assertIn(
+            'Skipped 1 product(s) whose price changed since the preview.',
+            [str(message) for message in get_messages(response.wsgi_request)],
+        )
+
+    def test_tampered_plan_is_rejected(self):
+        response = self.post('apply', plan='forged')
+        self.assertEqual(response.status_code, 200)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.price, Decimal('100.00'))
+
+
+class PriceAtTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('staff', password='secret')
+        cls.customer = Customer.objects.create(user=cls.user, first_name='Asha', phone='9800000001')
+        cls.product = Product.objects.create(name='Aviator', sku='AV-1', price=100)
+
+    def reprice(self, price, when):
+        change = pricing._change(self.product, price=Decimal(price), mrp=self.product.mrp)
+        pricing.apply([change])
+        PriceHistory.objects.filter(pk=PriceHistory.objects.latest('id').pk).update(effective_at=when)
+        self.product.refresh_from_db()
+
+    def test_price_at_resolves_the_price_of_the_moment(self):
+        now = timezone.now()
+        self.reprice('120', now - timedelta(days=10))
+        self.reprice('150', now - timedelta(days=5))
+
+        def at(moment):
+            return Product.objects.annotate(then=pricing.price_at(moment)).get(pk=self.product.pk).then
+
+        self.assertEqual(at(now - timedelta(days=20)), Decimal('100.00'))
+        self.assertEqual(at(now - timedelta(days=7)), Decimal('120.00'))
+        self.assertEqual(at(now), Decimal('150.00'))
+
+    def test_bill_prices_use_the_price_when_the_bill_was_made(self):
+        bill = Bill.objects.create(customer=self.customer, total=100, payment_method='CASH', created_by=self.user)
+        bill.products.add(self.product)
+        self.reprice('180', bill.date + timedelta(days=1))
+        self.assertEqual(pricing.bill_prices([bill.pk]), {(bill.pk, self.product.pk): Decimal('100.00')})
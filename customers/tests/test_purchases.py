@@ -0,0 +1,59 @@
+from decimal import Decimal
+from importlib import import_module
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from customers import analytics
+from customers.models import Customer, ProductCategory, Purchase
+
+backfill = import_module('customers.migrations.0036_backfill_purchase_detail_columns')
+
+
+class PurchaseDetailColumnTests(TestCase):
+    databases = {'default', 'archive'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('counter', password='secret')
+        cls.customer = Customer.objects.create(user=cls.user, first_name='Asha', phone='9800000001')
+
+    def purchase(self, product_type='frames', **details):
+        return Purchase.objects.create(customer=self.customer, product_type=product_type, details=details)
+
+    def test_save_copies_the_typed_keys_out_of_details(self):
+        purchase = self.purchase(lens_price='1,250', frame_price='', lens_type='progressive', frame_model='AV-1')
+        self.assertEqual(purchase.lens_price, Decimal('1250.00'))
+        self.assertIsNone(purchase.frame_price)
+        self.assertEqual(purchase.total_cost(), Decimal('1250.00'))
+        self.assertEqual(Purchase.objects.get(lens_type='progressive').frame_model, 'AV-1')
+
+    def test_migration_backfills_rows_saved_before_the_columns(self):
+        purchase = self.purchase(lens_price='800', frame_price=1200, lens_type='single_vision')
+        Purchase.objects.update(lens_price=None, frame_price=None, lens_type=None)
+
+        backfill.fill_detail_columns(apps, None)
+
+        purchase.refresh_from_db()
+        self.assertEqual(purchase.total_cost(), Decimal('2000.00'))
+        self.assertEqual(purchase.lens_type, 'single_vision')
+
+    def test_revenue_is_summed_per_lens_type(self):
+        self.purchase(lens_price='800', frame_price='1200', lens_type='progressive')
+        self.purchase(lens_price='500', lens_type='bifocal')
+        revenue = analytics.purchase_revenue(Purchase.objects.all())
+        self.assertEqual(revenue['total'], Decimal('2500.00'))
+        self.assertEqual(revenue['by_lens_type'][0]['lens_type'], 'progressive')
+
+    def test_sales_report_applies_the_category_to_purchases(self):
+        category = ProductCategory.objects.create(name='Contact Lenses')
+        self.purchase('contact_lenses', lens_price='300')
+        self.purchase('frames', frame_price='900')
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse('customers:sales_report'), {'category': category.pk})
+
+        self.assertEqual(response.context['purchase_revenue']['count'], 1)
+        self.assertEqual(response.context['purchase_revenue']['total'], Decimal('300.00'))
@@ -0,0 +1,93 @@
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import Permission, User
+from django.test import TestCase
+from django.urls import reverse
+
+from customers import receiving
+from customers.models import (
+    GoodsReceipt, Inventory, Product, PurchaseOrder, PurchaseOrderLine, StockMovement, Supplier,
+)
+
+
+class ReceiveGoodsViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('counter', password='secret')
+        cls.user.user_permissions.add(Permission.objects.get(codename='add_inventory'))
+        cls.supplier = Supplier.objects.create(name='Lens Co')
+        cls.product = Product.objects.create(name='Aviator', sku='AV-1', price=1000)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def post(self, lines, **fields):
+        data = {
+            'supplier': self.supplier.pk, 'received_date': '2024-04-10', 'reference': 'INV-7',
+            'lines-TOTAL_FORMS': len(lines), 'lines-INITIAL_FORMS': 0, **fields,
+        }
+        for i, line in enumerate(lines):
+            data.update({f'lines-{i}-{name}': value for name, value in line.items()})
+        return self.client.post(reverse('customers:receive_goods'), data)
+
+    def test_page_loads_the_supplier_widget_script(self):
+        response = self.client.get(reverse('customers:receive_goods'))
+        self.assertContains(response, '<script src="/static/customers/js/autocomplete.js">')
+
+    def test_receipt_posts_stock_and_the_supplier_ledger(self):
+        response = self.post([
+            {'product': 'AV-1', 'batch_number': 'B1', 'quantity': 3, 'purchase_price': '400', 'selling_price': '1000'},
+            {'product': 'AV-1', 'batch_number': 'B2', 'quantity': 2, 'purchase_price': '450', 'selling_price': '1000'},
+        ])
+
+        self.assertRedirects(response, reverse('customers:supplier_ledger', args=[self.supplier.pk]),
+                             fetch_redirect_response=False)
+        receipt = GoodsReceipt.objects.get()
+        self.assertEqual(receipt.received_date, date(2024, 4, 10))
+        self.assertEqual(Inventory.objects.filter(goods_receipt=receipt).count(), 2)
+        self.assertEqual(
+            sorted(StockMovement.objects.filter(kind=StockMovement.Kind.RECEIPT).values_list('quantity', flat=True)),
+            [2, 3],
+        )
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_on_hand, 5)
+        self.assertEqual(receipt.ledger_entry.amount, Decimal('2100.00'))
+        self.assertEqual(receipt.ledger_entry.reference, 'INV-7')
+        self.supplier.refresh_from_db()
+        self.assertEqual(self.supplier.balance, Decimal('2100.00'))
+
+    def test_receipt_against_an_order_updates_what_is_outstanding(self):
+        order = PurchaseOrder.objects.create(supplier=self.supplier, status=PurchaseOrder.Status.ORDERED)
+        line = PurchaseOrderLine.objects.create(order=order, product=self.product, quantity_ordered=5, unit_price=400)
+
+        self.post([{'product': 'AV-1', 'batch_number': 'B1', 'quantity': 3, 'purchase_price': '400',
+                    'selling_price': '1000'}], purchase_order=order.pk)
+
+        line.refresh_from_db()
+        order.refresh_from_db()
+        self.assertEqual(line.quantity_received, 3)
+        self.assertEqual(order.status, PurchaseOrder.Status.PARTIAL)
+
+    def test_unknown_product_is_rejected_without_saving(self):
+        response = self.post([{'product': 'NOPE', 'batch_number': 'B1', 'quantity': 1,
+                               'purchase_price': '400', 'selling_price': '1000'}])
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(GoodsReceipt.objects.exists())
+        self.assertFalse(Inventory.objects.exists())
+
+    def test_receiving_requires_the_inventory_permission(self):
+        self.client.force_login(User.objects.create_user('viewer', password='secret'))
+        self.assertEqual(self.client.get(reverse('customers:receive_goods')).status_code, 403)
+
+    def test_batch_received_concurrently_is_a_form_error(self):
+        line = {'product': 'AV-1', 'batch_number': 'B1', 'quantity': 1, 'purchase_price': '400', 'selling_price': '1000'}
+        # The other receipt saves B1 after this one's formset checked it.
+        with mock.patch.object(receiving, 'existing_batches', side_effect=[set(), {(self.product.pk, 'B1')}]):
+            Inventory.objects.create(product=self.product, batch_number='B1', quantity=1, purchase_price=400,
+                                     selling_price=1000, purchase_date=date(2024, 4, 9))
+            response = self.post([line])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('was received by someone else meanwhile', str(response.context['form'].non_field_errors()))
+        self.assertFalse(GoodsReceipt.objects.exists())
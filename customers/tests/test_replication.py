@@ -0,0 +1,130 @@
+import os
+import tempfile
+import uuid
+from datetime import date, timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from customers import dedupe, replication
+from customers.models import (
+    ChangeLogEntry, Customer, CustomerHistory, ParkedChange, Prescription, Product, ProductCategory, SyncPeer,
+)
+
+Operation = ChangeLogEntry.Operation
+
+
+def remote_change(seq, model, data, uid=None, op=Operation.SAVE, changed_at=None):
+    return {
+        'origin': 'branch2',
+        'seq': seq,
+        'model': model,
+        'uid': str(uid or uuid.uuid4()),
+        'op': op,
+        'data': data,
+        'changed_at': (changed_at or timezone.now()).isoformat(),
+    }
+
+
+def payload(*changes, last_seq=None, more=False):
+    return {
+        'branch': 'branch2',
+        'last_seq': last_seq if last_seq is not None else max(change['seq'] for change in changes),
+        'more': more,
+        'changes': list(changes),
+    }
+
+
+class ReplicationTests(TestCase):
+    databases = {'default', 'archive'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('counter', password='secret')
+
+    def test_local_saves_are_logged_with_related_keys(self):
+        category = ProductCategory.objects.create(name='Frames')
+        product = Product.objects.create(name='Aviator', sku='AV-1', category=category)
+        entry = ChangeLogEntry.objects.get(model='product', uid=product.sync_uid)
+        self.assertEqual(entry.data['category'], str(category.sync_uid))
+        changes = replication.changes_since(0)['changes']
+        self.assertEqual([change['model'] for change in changes], ['productcategory', 'product'])
+        self.assertEqual(replication.changes_since(0, exclude_origin=replication.branch_id())['changes'], [])
+
+    def test_remote_changes_are_applied_once(self):
+        change = remote_change(1, 'customer', {'user': 'counter', 'first_name': 'Asha', 'phone': '9800000001'})
+        self.assertEqual(replication.apply_changes(payload(change))['applied'], 1)
+        self.assertEqual(replication.apply_changes(payload(change))['skipped'], 1)
+        customer = Customer.objects.get(sync_uid=change['uid'])
+        self.assertEqual(customer.user, self.user)
+        # Applying a remote change is not logged as a new local change.
+        self.assertFalse(ChangeLogEntry.objects.filter(uid=customer.sync_uid, origin_seq=None).exists())
+        self.assertEqual(SyncPeer.objects.get(branch='branch2').last_received, 1)
+
+    def test_same_customer_created_in_both_branches_is_matched_on_natural_key(self):
+        local = Customer.objects.create(user=self.user, first_name='Asha', phone='9800000001')
+        local_uid = str(local.sync_uid)
+        change = remote_change(1, 'customer', {'user': 'counter', 'last_name': 'Rao', 'phone': '9800000001'},
+                               changed_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(replication.apply_changes(payload(change))['conflicts'], 1)
+        local.refresh_from_db()
+        self.assertEqual((local.first_name, local.last_name), ('Asha', 'Rao'))
+        # Both branches settle on the smaller uid.
+        self.assertEqual(str(local.sync_uid), min(change['uid'], local_uid))
+
+    def test_unresolved_change_is_parked_until_its_dependency_arrives(self):
+        category_uid = uuid.uuid4()
+        product = remote_change(5, 'product', {'name': 'Aviator', 'sku': 'AV-1', 'category': str(category_uid)})
+        counts = replication.apply_changes(payload(product, last_seq=5))
+        self.assertEqual(counts['parked'], 1)
+        self.assertEqual(SyncPeer.objects.get(branch='branch2').last_received, 5)
+        self.assertFalse(Product.objects.exists())
+
+        category = remote_change(6, 'productcategory', {'name': 'Frames'}, uid=category_uid)
+        counts = replication.apply_changes(payload(category))
+        self.assertEqual((counts['applied'], counts['parked']), (2, 0))
+        self.assertEqual(Product.objects.get(sku='AV-1').category.name, 'Frames')
+        self.assertFalse(ParkedChange.objects.exists())
+
+    def test_pull_stops_when_the_peer_does_not_advance(self):
+        peer = SyncPeer.objects.create(branch='branch2', url='http://branch2/sync/')
+        stuck = payload(last_seq=0, more=True)
+        pulls = []
+
+        def request(url, data=None):
+            if data is not None:
+                return {'applied': 0}
+            pulls.append(url)
+            return stuck
+
+        with mock.patch.object(replication, '_request', request):
+            replication.sync_with(peer)
+        self.assertEqual(len(pulls), 1)
+
+    def test_merge_replays_on_another_branch(self):
+        survivor = Customer.objects.create(user=self.user, first_name='Asha', phone='9800000001')
+        duplicate = Customer.objects.create(user=self.user, first_name='Asha', phone='9800000002', email='a@example.com')
+        prescription = Prescription.objects.create(customer=duplicate, date=date(2024, 4, 1))
+        with tempfile.TemporaryDirectory() as directory:
+            created, merged = os.path.join(directory, 'created.json'), os.path.join(directory, 'merged.json')
+            since = replication.export_changes(created, 0)
+            dedupe.merge_customers(survivor, [duplicate])
+            replication.export_changes(merged, since)
+
+            # Start over as a branch that only has what the files carry.
+            CustomerHistory.objects.all().delete()
+            Prescription.objects.all().delete()
+            Customer.objects.all().delete()
+            ChangeLogEntry.objects.all().delete()
+            with override_settings(BRANCH_ID='branch2'):
+                replication.import_changes(created)
+                self.assertEqual(Customer.objects.count(), 2)
+                counts = replication.import_changes(merged)
+
+        self.assertEqual((counts['conflicts'], counts['parked']), (0, 0))
+        customer = Customer.objects.get()
+        self.assertEqual(customer.sync_uid, survivor.sync_uid)
+        self.assertEqual(customer.email, 'a@example.com')
+        self.assertEqual(Prescription.objects.get(sync_uid=prescription.sync_uid).customer, customer)
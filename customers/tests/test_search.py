@@ -0,0 +1,49 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from customers import search
+from customers.models import Product, ProductCategory
+
+
+class ProductSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('counter', password='secret')
+        cls.frames = ProductCategory.objects.create(name='Frames')
+        cls.lenses = ProductCategory.objects.create(name='Lenses')
+        cls.aviator = Product.objects.create(name='Aviator Classic', brand='Ray-Ban', sku='RB-1',
+                                             category=cls.frames, frame_material='MT')
+        cls.wayfarer = Product.objects.create(name='Wayfarer', brand='Ray-Ban', sku='RB-2',
+                                              category=cls.frames, frame_material='AC')
+        cls.lens = Product.objects.create(name='Clear lens', brand='Essilor', sku='ES-1',
+                                          category=cls.lenses, lens_type='PL')
+
+    def test_every_word_matches_as_a_prefix(self):
+        results = search.search('ray av')
+        self.assertEqual(results['products'], [self.aviator])
+        self.assertCountEqual(search.search('ray')['products'], [self.aviator, self.wayfarer])
+        # Saves keep the index current.
+        self.wayfarer.name = 'Clubmaster'
+        self.wayfarer.save()
+        self.assertEqual(search.search('club')['products'], [self.wayfarer])
+
+    def test_each_facet_ignores_its_own_filter(self):
+        results = search.search(category=self.frames.pk, frame_material='MT')
+        self.assertEqual(results['products'], [self.aviator])
+        facets = results['facets']
+        self.assertEqual(facets['category'], [(self.frames.pk, 'Frames', 1)])
+        self.assertEqual(facets['frame_material'], [('AC', 'Acetate', 1), ('MT', 'Metal', 1)])
+        self.assertEqual(facets['in_stock'], [(0, 'Out of stock', 1)])
+
+    def test_page_past_the_end_returns_the_last_page(self):
+        results = search.search('', page=10 ** 30)
+        self.assertEqual((results['page'], results['pages'], results['total']), (1, 1, 3))
+        self.assertEqual(len(results['products']), 3)
+
+    def test_view_clamps_a_huge_page(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('customers:product_search'), {'page': '9' * 40, 'format': 'json'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['page'], 1)
+        self.assertEqual(self.client.get(reverse('customers:product_search'), {'page': '9' * 40}).status_code, 200)
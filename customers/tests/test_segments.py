@@ -0,0 +1,55 @@
+from datetime import date, datetime
+from decimal import Decimal
+from io import StringIO
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from customers import archive, segments
+from customers.models import ArchivedPurchase, Bill, Customer, CustomerSegment, Purchase
+
+
+class SegmentTests(TestCase):
+    databases = {'default', 'archive'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('counter', password='secret')
+        cls.old = Customer.objects.create(user=cls.user, first_name='Old', phone='9800000001')
+        cls.new = Customer.objects.create(user=cls.user, first_name='New', phone='9800000002')
+        cls.idle = Customer.objects.create(user=cls.user, first_name='Idle', phone='9800000003')
+        Purchase.objects.create(customer=cls.old, date_of_purchase=date(2022, 6, 1),
+                                details={'lens_price': '1,500', 'frame_price': 500})
+        bill = Bill.objects.create(customer=cls.old, total=700, payment_method='CASH', created_by=cls.user)
+        Bill.objects.filter(pk=bill.pk).update(date=timezone.make_aware(datetime(2022, 7, 1, 12)))
+        Bill.objects.create(customer=cls.new, total=300, payment_method='CASH', created_by=cls.user)
+
+    def test_rank_scores_share_the_lower_score_on_ties(self):
+        self.assertEqual(segments.rank_scores(np.array([1, 1, 5, 9, 9])).tolist(), [1, 1, 3, 4, 4])
+
+    def test_archived_activity_still_counts(self):
+        archive.archive_through(2022)
+        self.assertEqual(ArchivedPurchase.objects.get().lens_price, Decimal('1500.00'))
+
+        call_command('refresh_segments', stdout=StringIO())
+
+        old = CustomerSegment.objects.get(customer=self.old)
+        self.assertEqual((old.frequency, old.monetary), (2, Decimal('2700.00')))
+        self.assertEqual(old.last_activity, date(2022, 7, 1))
+        self.assertEqual(CustomerSegment.objects.get(customer=self.new).frequency, 1)
+        self.assertEqual(CustomerSegment.objects.get(customer=self.idle).segment, CustomerSegment.Segment.PROSPECT)
+
+    def test_unchanged_scores_are_not_rewritten(self):
+        self.assertEqual(segments.refresh_segments().segments_updated, 3)
+        self.assertEqual(segments.refresh_segments().segments_updated, 0)
+
+    def test_segment_customers_reads_the_user_segment_index(self):
+        segments.refresh_segments()
+        customers = segments.segment_customers(self.user, CustomerSegment.Segment.PROSPECT)
+        self.assertEqual(list(customers), [self.idle])
+        self.assertIn('segment_user_segment_idx', customers.explain())
+        other = User.objects.create_user('other', password='secret')
+        self.assertFalse(segments.segment_customers(other, CustomerSegment.Segment.PROSPECT).exists())
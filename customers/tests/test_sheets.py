@@ -0,0 +1,15 @@
+from django.test import SimpleTestCase
+
+from customers.sheets import read_sheet
+
+
+class ReadSheetTests(SimpleTestCase):
+    def test_header_row_is_dropped_and_blank_lines_skipped(self):
+        text = 'Batch,Qty\n\nB1,4\n  \nB2,5\n'
+        self.assertEqual(read_sheet(text, 1), [['B1', '4'], ['B2', '5']])
+
+    def test_first_row_with_a_number_is_data(self):
+        self.assertEqual(read_sheet('AV-1\t\t1499.50\n', 1, 2), [['AV-1', '', '1499.50']])
+
+    def test_short_header_row_is_dropped(self):
+        self.assertEqual(read_sheet('Code\nAV-1,1499\n', 1), [['AV-1', '1499']])
@@ -0,0 +1,68 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from customers import stock
+from customers.models import Inventory, Product, StockMovement, StockSnapshot
+
+
+class StockLedgerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('counter', password='secret')
+        cls.product = Product.objects.create(name='Aviator', sku='AV-1', price=1000)
+
+    def setUp(self):
+        self.batch = Inventory.objects.create(product=self.product, batch_number='B1', quantity=10,
+                                              purchase_price=400, selling_price=1000, purchase_date=date(2024, 1, 1))
+
+    def test_batch_saves_and_deletes_post_movements(self):
+        self.batch.quantity = 7
+        self.batch.save()
+        self.assertEqual(list(StockMovement.objects.values_list('quantity', flat=True)), [10, -3])
+        self.batch.delete()
+        self.assertEqual(sum(StockMovement.objects.values_list('quantity', flat=True)), 0)
+        movement = StockMovement.objects.first()
+        with self.assertRaises(ValueError):
+            movement.save()
+
+    def test_move_refuses_to_go_below_zero(self):
+        stock.move(self.batch, -4, StockMovement.Kind.SALE, user=self.user)
+        with self.assertRaises(ValidationError):
+            stock.move(self.batch, -7, StockMovement.Kind.SALE)
+        self.batch.refresh_from_db()
+        self.product.refresh_from_db()
+        self.assertEqual((self.batch.quantity, self.product.stock_on_hand), (6, 6))
+
+    def test_stock_at_combines_the_snapshot_with_later_movements(self):
+        yesterday = timezone.now() - timedelta(days=1)
+        StockMovement.objects.update(occurred_at=yesterday)
+        snapshot = stock.take_snapshot()
+        self.assertEqual((snapshot.products, snapshot.units, snapshot.value), (1, 10, Decimal('4000.00')))
+        self.assertEqual(stock.take_snapshot(), snapshot)
+
+        stock.move(self.batch, -4, StockMovement.Kind.SALE)
+
+        self.assertEqual(stock.stock_at(timezone.now())[self.product.pk]['units'], 6)
+        self.assertEqual(stock.stock_at(yesterday.date())[self.product.pk]['units'], 10)
+        self.assertEqual(stock.stock_at(yesterday - timedelta(days=1)), {})
+        self.assertEqual(stock.take_snapshot().units, 6)
+        self.assertEqual(StockSnapshot.objects.count(), 2)
+
+    def test_drift_finds_raw_updates_that_skipped_the_ledger(self):
+        snapshot = stock.take_snapshot()
+        self.assertEqual(stock.drift(snapshot), [])
+        Inventory.objects.filter(pk=self.batch.pk).update(quantity=12)
+        self.assertEqual(stock.drift(snapshot), [self.product.pk])
+
+    def test_history_page_values_stock_on_a_day(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('customers:stock_history'), {'date': timezone.localdate().isoformat()})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['units'], 10)
+        self.assertEqual(response.context['retail'], Decimal('10000'))
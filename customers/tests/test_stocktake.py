@@ -0,0 +1,80 @@
+from datetime import date
+
+from django.contrib.auth.models import Permission, User
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+from django.urls import reverse
+
+from customers import stock, stocktake
+from customers.models import Inventory, Product, StockMovement, StockTake
+
+
+class StockTakeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('counter', password='secret')
+        cls.product = Product.objects.create(name='Aviator', sku='AV-1', price=1000)
+
+    def batch(self, number, quantity):
+        return Inventory.objects.create(product=self.product, batch_number=number, quantity=quantity,
+                                        purchase_price=400, selling_price=1000, purchase_date=date(2024, 1, 1))
+
+    def test_sheet_counts_are_summed_per_batch(self):
+        first = self.batch('B1', 5)
+        counts, errors = stocktake.parse_counts("batch,qty\nB1,2\nB1,1\nB9,4\nB1,x")
+        self.assertEqual(counts, {first.pk: 3})
+        self.assertEqual(errors, ["Line 3: no batch 'B9'.", "Line 4: 'x' is not a whole number."])
+
+    def test_sales_between_counting_and_applying_are_kept(self):
+        batch = self.batch('B1', 10)
+        take = stocktake.start('April', user=self.user)
+        stocktake.record_counts(take, {batch.pk: 8})
+        stock.move(batch, -3, StockMovement.Kind.SALE)
+
+        self.assertEqual(stocktake.apply(take), 1)
+
+        batch.refresh_from_db()
+        self.assertEqual(batch.quantity, 5)
+        adjustment = StockMovement.objects.get(kind=StockMovement.Kind.ADJUSTMENT)
+        self.assertEqual(adjustment.quantity, -2)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_on_hand, 5)
+        [row] = stocktake.variance_report(take)['rows']
+        self.assertEqual((row['expected'], row['counted'], row['variance']), (10, 8, -2))
+
+    def test_full_count_only_zeroes_batches_that_existed_when_it_started(self):
+        counted, missing = self.batch('B1', 4), self.batch('B2', 6)
+        take = stocktake.start('Full', user=self.user)
+        received = self.batch('B3', 12)
+        stocktake.record_counts(take, {counted.pk: 4})
+
+        self.assertEqual(stocktake.apply(take, zero_uncounted=True), 1)
+
+        quantities = dict(Inventory.objects.values_list('pk', 'quantity'))
+        self.assertEqual(quantities, {counted.pk: 4, missing.pk: 0, received.pk: 12})
+        take.refresh_from_db()
+        self.assertEqual(take.status, StockTake.Status.APPLIED)
+        with self.assertRaises(ValidationError):
+            stocktake.apply(take)
+
+
+class StockTakeViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('counter', password='secret')
+        cls.manager = User.objects.create_user('manager', password='secret')
+        cls.manager.user_permissions.add(Permission.objects.get(codename='change_inventory'))
+        cls.take = StockTake.objects.create(name='April')
+
+    def test_stock_takes_need_the_inventory_permission(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('customers:stock_takes')).status_code, 403)
+        self.assertEqual(self.client.post(reverse('customers:stock_take', args=[self.take.pk]), {'apply': '1'}).status_code, 403)
+        self.take.refresh_from_db()
+        self.assertEqual(self.take.status, StockTake.Status.OPEN)
+
+        self.client.force_login(self.manager)
+        self.assertEqual(self.client.get(reverse('customers:stock_take', args=[self.take.pk])).status_code, 200)
+        response = self.client.post(reverse('customers:stock_takes'), {'name': 'May'})
+        self.assertIsNotNone(StockTake.objects.get(name='May').created_by)
+        self.assertEqual(response.status_code, 302)
@@ -0,0 +1,29 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from customers.models import Customer, Prescription
+
+
+class TenantScopingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('counter', password='secret')
+        cls.other = User.objects.create_user('other', password='secret')
+        cls.mine = Customer.objects.create(user=cls.user, first_name='Mine', phone='9800000001')
+        cls.theirs = Customer.objects.create(user=cls.other, first_name='Theirs', phone='9800000002')
+        Prescription.objects.create(customer=cls.mine)
+        Prescription.objects.create(customer=cls.theirs)
+
+    def test_for_user_filters_in_one_query_through_the_owner_lookup(self):
+        with self.assertNumQueries(1):
+            prescriptions = list(Prescription.objects.for_user(self.user))
+        self.assertEqual([p.customer_id for p in prescriptions], [self.mine.pk])
+        self.assertEqual(list(Customer.objects.for_user(self.user.pk)), [self.mine])
+
+    def test_another_users_customer_is_not_found(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('customers:edit_customer', args=[self.mine.pk])).status_code, 200)
+        self.assertEqual(self.client.get(reverse('customers:customer_details', args=[self.theirs.pk])).status_code, 404)
+        self.assertEqual(self.client.post(reverse('customers:delete_customer', args=[self.theirs.pk])).status_code, 404)
+        self.assertTrue(Customer.objects.filter(pk=self.theirs.pk).exists())
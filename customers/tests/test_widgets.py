@@ -0,0 +1,39 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from customers.models import Bill, Customer, Product
+
+
+class AutocompleteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('counter', password='secret')
+        cls.other = User.objects.create_user('other', password='secret')
+        cls.customer = Customer.objects.create(user=cls.user, first_name='Asha', last_name='Rao', phone='9800000001')
+        Customer.objects.create(user=cls.other, first_name='Asha', phone='9800000002')
+        cls.product = Product.objects.create(name='Aviator', brand='Ray-Ban', price=1000)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_prefix_search_is_scoped_to_the_user(self):
+        response = self.client.get(reverse('customers:autocomplete', args=['customers']), {'q': 'ash'})
+        self.assertEqual(response.json()['results'], [{'id': self.customer.pk, 'text': 'Asha Rao (9800000001)'}])
+
+    def test_bill_page_loads_the_widget_script(self):
+        response = self.client.get(reverse('customers:create_bill'))
+        self.assertContains(response, '<script src="/static/customers/js/autocomplete.js">')
+        self.assertContains(response, 'data-autocomplete-url="%s"' % reverse('customers:autocomplete', args=['products']))
+
+    def test_bill_is_created_from_the_form(self):
+        response = self.client.post(reverse('customers:create_bill'), {
+            'customer': self.customer.pk,
+            'products': [self.product.pk],
+            'discount': '10',
+            'payment_method': 'UPI',
+        })
+        self.assertRedirects(response, reverse('customers:customer_details', args=[self.customer.pk]), fetch_redirect_response=False)
+        bill = Bill.objects.get()
+        self.assertEqual(str(bill.total), '900.00')
+        self.assertEqual(list(bill.products.all()), [self.product])
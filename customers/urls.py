@@ -1,6 +1,10 @@
 from django.urls import path, include
+from django.conf import settings
 from django.contrib import admin
-from . import views
+from . import views, api, async_views
+
+# Under ASGI these views run their independent queries concurrently.
+concurrent = async_views if settings.ASYNC_VIEWS else views
 
 app_name = 'customers'
 
@@ -29,27 +33,47 @@ urlpatterns = [
     path('inventory/add/', views.inventory_form, name='add_inventory'),
     path('inventory/edit/<int:inventory_id>/', views.inventory_form, name='edit_inventory'),
     path('inventory/add-product/', views.add_product, name='add_product'),
+    path('inventory/products/', views.product_search, name='product_search'),
+    path('inventory/reprice/', views.reprice_products, name='reprice_products'),
     path('inventory/add-supplier/', views.add_supplier, name='add_supplier'),
+    path('inventory/receive/', views.receive_goods, name='receive_goods'),
+    path('inventory/stock-takes/', views.stock_takes, name='stock_takes'),
+    path('inventory/stock-takes/<int:take_id>/', views.stock_take, name='stock_take'),
+    path('inventory/history/', views.stock_history, name='stock_history'),
     path('batch/<str:batch_number>/', views.batch_details, name='batch_details'),
+    path('scan/', concurrent.scan_lookup, name='scan_lookup'),
     
     # Sales & Billing
-    path('sales/', views.sales_report, name='sales_report'),
+    path('sales/', concurrent.sales_report, name='sales_report'),
+    path('sales/analytics/', views.sales_analytics, name='sales_analytics'),
     path('sales/export/', views.export_sales_report, name='export_sales_report'),
     path('billing/create/', views.create_bill, name='create_bill'),
+    path('billing/<int:bill_id>/invoice/', views.bill_invoice, name='bill_invoice'),
+    path('billing/<int:bill_id>/invoice/<str:fmt>/', views.bill_invoice, name='bill_invoice_format'),
+    path('billing/invoices/batch/', views.invoice_batch, name='invoice_batch'),
+    path('billing/invoices/batch/<str:name>/', views.invoice_batch_download, name='invoice_batch_download'),
     
     # Reports
     path('reports/gst/', views.gst_reports, name='gst_reports'),
     path('supplier/<int:supplier_id>/ledger/', views.supplier_ledger, name='supplier_ledger'),
+    path('supplier/<int:supplier_id>/ledger/payment/', views.record_supplier_payment, name='record_supplier_payment'),
     
     # Marketing
     path('send-promotional-message/', views.send_promotional_message, name='send_promotional_message'),
     
     # Alerts
     path('alerts/', views.inventory_alert, name='inventory_alerts'),
+    path('alerts/ageing/', views.inventory_ageing, name='inventory_ageing'),
     
     # Dashboard
-    path('dashboard/', views.dashboard, name='dashboard'),
+    path('dashboard/', concurrent.dashboard, name='dashboard'),
     
+    # JSON API
+    path('api/<str:resource>/', api.api_list, name='api_list'),
+    path('api/<str:resource>/<int:pk>/', api.api_detail, name='api_detail'),
+    path('autocomplete/<str:resource>/', api.autocomplete, name='autocomplete'),
+    path('sync/changes/', api.sync_changes, name='sync_changes'),
+
     # Admin
     path('django-admin/', admin.site.urls),
     
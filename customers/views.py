@@ -1,17 +1,24 @@
+import csv
+import os
 import pandas as pd
 import json
-from datetime import timedelta
+from datetime import datetime, time, timedelta
+from decimal import Decimal
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, permission_required
 from django.contrib import messages
 from django.contrib.auth import login, logout, get_user_model
 from django.urls import reverse_lazy
 from django.views.generic import CreateView
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, Http404, FileResponse
+from django.core.exceptions import ValidationError
 from django.utils import timezone
-from django.db.models import Q, Sum, F
+from django.utils.dateparse import parse_date
+from django.db import transaction
+from django.db.models import Count, Q, Sum, F
+from django.core import signing
+from django.core.paginator import Paginator
 from django.core.mail import send_mail
-from django.core.exceptions import PermissionDenied
 from django.conf import settings
 from twilio.rest import Client
 
@@ -19,17 +26,24 @@ from twilio.rest import Client
 from .forms import (
     CustomerForm, ProductForm, SupplierForm,
     InventoryForm, SalesFilterForm, CustomUserCreationForm,
-    PurchaseForm, PrescriptionForm, BillForm
+    PurchaseForm, PrescriptionForm, BillForm, SupplierPaymentForm,
+    GoodsReceiptForm, ReceiptLineFormSet, RepriceForm
 )
 from .models import (
-    Customer, CustomerHistory, Product,
+    PRESCRIPTION_FIELDS, Customer, CustomerHistory, Product,
     Supplier, Inventory, Sale, ProductCategory,
-    Purchase, Prescription, Bill
+    Purchase, Prescription, Bill, ForecastRun, InventoryAgeingRun, SegmentRun,
+    PurchaseOrder, StockMovement, StockTake
 )
 from .utils import is_safe_url
+from . import ageing, analytics, archive, forecasting, invoices, ledger, pricing, receiving, search, segments, stock, stocktake
+from .catalog import AmbiguousCode, catalog
 
 User = get_user_model()
 
+# Rows of a price revision shown before it is applied.
+PREVIEW_ROWS = 200
+
 # ======================
 # Authentication Views
 # ======================
@@ -54,18 +68,21 @@ def logout_view(request):
 # ======================
 # Dashboard Views
 # ======================
+def dashboard_queries(user):
+    """The dashboard's customers, recent sales and low stock; ``async_views`` runs the same queries."""
+    return (
+        Customer.objects.for_user(user),
+        Sale.objects.for_user(user).select_related('product').order_by('-date')[:5],
+        forecasting.low_stock()[:5],
+    )
+
 @login_required
 def dashboard(request):
     # Calculate basic stats for dashboard
-    customer_count = Customer.objects.filter(user=request.user).count()
-    recent_sales = Sale.objects.filter(created_by=request.user).order_by('-date')[:5]
-    low_stock = Inventory.objects.filter(
-        quantity__lt=F('product__reorder_level'),
-        is_active=True
-    )[:5]
+    customers, recent_sales, low_stock = dashboard_queries(request.user)
 
     context = {
-        'customer_count': customer_count,
+        'customer_count': customers.count(),
         'recent_sales': recent_sales,
         'low_stock': low_stock
     }
@@ -74,10 +91,16 @@ def dashboard(request):
 # ======================
 # Customer Management
 # ======================
+# Columns the list and detail pages display; the wider row stays unread.
+CUSTOMER_LIST_FIELDS = ('id', 'first_name', 'last_name', 'email', 'phone', 'created_at')
+CUSTOMER_DETAIL_FIELDS = CUSTOMER_LIST_FIELDS + (
+    'address', 'date_of_birth', 'gender', 'prescription_date', 'additional_info', 'latest_prescription',
+)
+
 @login_required
 def customer_list(request):
     query = request.GET.get('q', '')
-    customers = Customer.objects.filter(user=request.user).order_by('-created_at')
+    customers = Customer.objects.for_user(request.user).only(*CUSTOMER_LIST_FIELDS).order_by('-created_at')
 
     if query:
         customers = customers.filter(
@@ -96,8 +119,13 @@ def customer_list(request):
 
 @login_required
 def customer_details(request, customer_id):
-    customer = get_object_or_404(Customer, id=customer_id, user=request.user)
-    purchases = Purchase.objects.filter(customer=customer).select_related('product_type')
+    customer = get_object_or_404(
+        Customer.objects.for_user(request.user)
+        .select_related('latest_prescription')
+        .only(*CUSTOMER_DETAIL_FIELDS, *(f'latest_prescription__{name}' for name in PRESCRIPTION_FIELDS)),
+        id=customer_id
+    )
+    purchases = Purchase.objects.filter(customer=customer)
     prescriptions = Prescription.objects.filter(customer=customer)
     bills = Bill.objects.filter(customer=customer).prefetch_related('products')
 
@@ -118,6 +146,7 @@ def add_customer(request):
             customer = form.save(commit=False)
             customer.user = request.user
             customer.save()
+            form.save_prescription(customer)
 
             CustomerHistory.objects.create(
                 customer=customer,
@@ -143,12 +172,15 @@ def add_customer(request):
 
 @login_required
 def edit_customer(request, customer_id):
-    customer = get_object_or_404(Customer, id=customer_id, user=request.user)
+    customer = get_object_or_404(
+        Customer.objects.for_user(request.user).select_related('latest_prescription'), id=customer_id
+    )
 
     if request.method == "POST":
         form = CustomerForm(request.POST, instance=customer)
         if form.is_valid():
             form.save()
+            form.save_prescription(customer)
 
             CustomerHistory.objects.create(
                 customer=customer,
@@ -173,7 +205,7 @@ def edit_customer(request, customer_id):
 
 @login_required
 def delete_customer(request, customer_id):
-    customer = get_object_or_404(Customer, id=customer_id, user=request.user)
+    customer = get_object_or_404(Customer.objects.for_user(request.user), id=customer_id)
     
     if request.method == "POST":
         customer.delete()
@@ -190,7 +222,7 @@ def delete_customer(request, customer_id):
 # ======================
 @login_required
 def add_purchase_and_prescription(request, customer_id):
-    customer = get_object_or_404(Customer, id=customer_id, user=request.user)
+    customer = get_object_or_404(Customer.objects.for_user(request.user), id=customer_id)
     
     if request.method == 'POST':
         purchase_form = PurchaseForm(request.POST)
@@ -223,10 +255,10 @@ def add_purchase_and_prescription(request, customer_id):
 
 @login_required
 def view_purchase(request, purchase_id):
-    purchase = get_object_or_404(Purchase, id=purchase_id)
-    if purchase.customer.user != request.user:
-        raise PermissionDenied
-    
+    purchase = get_object_or_404(
+        Purchase.objects.for_user(request.user).select_related('customer'), id=purchase_id
+    )
+
     try:
         prescription = Prescription.objects.get(purchase=purchase)
     except Prescription.DoesNotExist:
@@ -241,12 +273,10 @@ def view_purchase(request, purchase_id):
 
 @login_required
 def delete_purchase(request, purchase_id):
-    purchase = get_object_or_404(Purchase, id=purchase_id)
-    if purchase.customer.user != request.user:
-        raise PermissionDenied
-    
+    purchase = get_object_or_404(Purchase.objects.for_user(request.user), id=purchase_id)
+
     if request.method == 'POST':
-        customer_id = purchase.customer.id
+        customer_id = purchase.customer_id
         purchase.delete()
         messages.success(request, 'Purchase deleted successfully!')
         return redirect('customers:customer_details', customer_id=customer_id)
@@ -258,12 +288,10 @@ def delete_purchase(request, purchase_id):
 
 @login_required
 def delete_prescription(request, prescription_id):
-    prescription = get_object_or_404(Prescription, id=prescription_id)
-    if prescription.customer.user != request.user:
-        raise PermissionDenied
-    
+    prescription = get_object_or_404(Prescription.objects.for_user(request.user), id=prescription_id)
+
     if request.method == 'POST':
-        customer_id = prescription.customer.id
+        customer_id = prescription.customer_id
         prescription.delete()
         messages.success(request, 'Prescription deleted successfully!')
         return redirect('customers:customer_details', customer_id=customer_id)
@@ -277,21 +305,26 @@ def delete_prescription(request, prescription_id):
 # Bill Management
 # ======================
 @login_required
-def create_bill(request, customer_id):
-    customer = get_object_or_404(Customer, id=customer_id, user=request.user)
+def create_bill(request, customer_id=None):
+    # The billing URL takes the customer from the form; customer_id pins it.
+    customer = None
+    if customer_id is not None:
+        customer = get_object_or_404(Customer.objects.for_user(request.user), id=customer_id)
     
     if request.method == 'POST':
         form = BillForm(request.user, request.POST)
         if form.is_valid():
             bill = form.save(commit=False)
-            bill.customer = customer
+            if customer is not None:
+                bill.customer = customer
             bill.created_by = request.user
-            bill.total_amount = sum(product.price for product in form.cleaned_data['products'])
+            subtotal = sum(product.price or 0 for product in form.cleaned_data['products'])
+            bill.total = Decimal(subtotal - subtotal * (bill.discount or 0) / 100).quantize(Decimal('0.01'))
             bill.save()
             form.save_m2m()
             
             messages.success(request, 'Bill created successfully!')
-            return redirect('customers:customer_details', customer_id=customer.id)
+            return redirect('customers:customer_details', customer_id=bill.customer_id)
         else:
             messages.error(request, 'Please correct the errors below.')
     else:
@@ -305,10 +338,8 @@ def create_bill(request, customer_id):
 
 @login_required
 def view_bill(request, bill_id):
-    bill = get_object_or_404(Bill, id=bill_id)
-    if bill.customer.user != request.user:
-        raise PermissionDenied
-    
+    bill = get_object_or_404(Bill.objects.for_user(request.user).select_related('customer'), id=bill_id)
+
     context = {
         'bill': bill,
         'customer': bill.customer,
@@ -316,6 +347,51 @@ def view_bill(request, bill_id):
     }
     return render(request, 'customers/view_bill.html', context)
 
+@login_required
+def bill_invoice(request, bill_id, fmt='a4'):
+    if fmt not in invoices.FORMATS:
+        raise Http404("Unknown invoice format")
+    bill = get_object_or_404(Bill.objects.for_user(request.user).select_related('customer'), id=bill_id)
+
+    response = HttpResponse(invoices.get_invoice_pdf(bill, fmt), content_type='application/pdf')
+    response['Content-Disposition'] = f'inline; filename="invoice-{bill.id}-{fmt}.pdf"'
+    return response
+
+@login_required
+def invoice_batch(request):
+    if request.method != 'POST':
+        return redirect('customers:sales_report')
+
+    fmt = request.POST.get('format', 'a4')
+    period = request.POST.get('period', '')
+    bills = Bill.objects.for_user(request.user)
+    day = parse_date(period)
+    month = parse_date(f'{period}-01') if day is None else None
+    if fmt not in invoices.FORMATS or (day is None and month is None):
+        messages.error(request, 'Choose a day (YYYY-MM-DD) or a month (YYYY-MM) and a valid format.')
+        return redirect('customers:sales_report')
+    if day:
+        bills = bills.filter(date__date=day)
+    else:
+        bills = bills.filter(date__year=month.year, date__month=month.month)
+
+    name = f'{request.user.pk}-{period}-{fmt}'
+    invoices.start_batch(bills, name, fmt)
+    messages.success(request, 'Invoices are being rendered in the background. The download link will work once they are ready.')
+    return redirect('customers:invoice_batch_download', name=name)
+
+@login_required
+def invoice_batch_download(request, name):
+    if not name.startswith(f'{request.user.pk}-'):
+        raise Http404("Archive not found")
+    path = invoices.batch_archive_path(name)
+    if not os.path.exists(path):
+        error = invoices.batch_error(name)
+        if error is not None:
+            return JsonResponse({'status': 'failed', 'error': error}, status=500)
+        return JsonResponse({'status': 'pending'}, status=202)
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=f'invoices-{name}.zip')
+
 # ======================
 # Inventory Management
 # ======================
@@ -336,12 +412,22 @@ def inventory_form(request, inventory_id=None):
     form = InventoryForm(request.POST or None, instance=inventory)
 
     if form.is_valid():
+        # Form validation has already copied the edits onto the instance.
+        previous = None
+        if inventory_id:
+            previous = Inventory.objects.select_related('supplier', 'goods_receipt__ledger_entry').get(pk=inventory_id)
         inventory = form.save(commit=False)
         inventory.created_by = request.user
-        inventory.save()
-        action = 'updated' if inventory_id else 'created'
-        messages.success(request, f'Inventory {action} successfully!')
-        return redirect('manage_inventory')
+        try:
+            with transaction.atomic():
+                inventory.save()
+                ledger.record_stock_in(inventory, request.user, previous=previous)
+        except ValidationError as exc:
+            form.add_error(None, exc)
+        else:
+            action = 'updated' if inventory_id else 'created'
+            messages.success(request, f'Inventory {action} successfully!')
+            return redirect('manage_inventory')
 
     return render(request, 'inventory/form.html', {'form': form})
 
@@ -384,6 +470,101 @@ def add_supplier(request):
     
     return render(request, 'inventory/add_supplier.html', {'form': form})
 
+@login_required
+def product_search(request):
+    filters = {
+        'category': request.GET.get('category', ''),
+        'lens_type': request.GET.get('lens_type', ''),
+        'frame_material': request.GET.get('frame_material', ''),
+        'in_stock': bool(request.GET.get('in_stock')),
+    }
+    if not filters['category'].isdigit():
+        filters['category'] = None
+    page = request.GET.get('page', '1')
+    query = request.GET.get('q', '').strip()
+    results = search.search(query, page=int(page) if page.isdigit() else 1, **filters)
+
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'total': results['total'],
+            'page': results['page'],
+            'pages': results['pages'],
+            'products': [
+                {
+                    'id': product.pk, 'name': product.name, 'brand': product.brand,
+                    'model_number': product.model_number, 'sku': product.sku,
+                    'price': product.price, 'stock_on_hand': product.stock_on_hand,
+                }
+                for product in results['products']
+            ],
+            'facets': {
+                facet: [{'value': value, 'label': label, 'count': count} for value, label, count in counts]
+                for facet, counts in results['facets'].items()
+            },
+        })
+
+    params = request.GET.copy()
+    params.pop('page', None)
+    context = {
+        **results,
+        'query': query,
+        'filters': filters,
+        'querystring': params.urlencode(),
+    }
+    return render(request, 'customers/product_search.html', context)
+
+@login_required
+@permission_required('customers.change_product', raise_exception=True)
+def reprice_products(request):
+    changes, data = None, None
+    if request.method == 'POST':
+        data = request.POST.copy()
+        upload = request.FILES.get('sheet_file')
+        if upload:
+            # Carry an uploaded sheet in the textarea, so the preview can be applied as is.
+            data['sheet'] = upload.read().decode('utf-8-sig', errors='replace')
+    form = RepriceForm(data)
+    if data is not None and form.is_valid() and 'apply' in request.POST:
+        # Apply what was previewed; re-planning here would compound a revision submitted twice.
+        try:
+            planned = pricing.load_plan(request.POST.get('plan', ''))
+        except signing.BadSignature:
+            messages.error(request, 'This preview has expired. Preview the revision again before applying it.')
+        else:
+            repriced = pricing.apply(planned, user=request.user, reason=form.cleaned_data['reason'] or 'Bulk reprice')
+            messages.success(request, f'Repriced {repriced} product(s).')
+            if len(planned) > repriced:
+                messages.warning(
+                    request, f'Skipped {len(planned) - repriced} product(s) whose price changed since the preview.',
+                )
+            return redirect('customers:reprice_products')
+    if data is not None and form.is_valid():
+        sheet, errors = form.cleaned_data['sheet'], []
+        if sheet.strip():
+            changes, errors = pricing.plan_sheet(sheet)
+        else:
+            products = pricing.scope(
+                form.cleaned_data['brand'], form.cleaned_data['category'], form.cleaned_data['supplier'],
+            )
+            changes = pricing.plan_formula(
+                products, form.cleaned_data['percent'], form.cleaned_data['target'],
+                form.cleaned_data['base'], form.cleaned_data['round_to'],
+            )
+        for error in errors:
+            messages.error(request, error)
+
+    invalid = sum(1 for change in changes if change['error']) if changes else 0
+    context = {
+        'form': form,
+        'changes': changes[:PREVIEW_ROWS] if changes else changes,
+        'change_count': len(changes) if changes else 0,
+        'invalid': invalid,
+        'applicable': (len(changes) - invalid) if changes else 0,
+        'plan': pricing.sign_plan(changes) if changes else '',
+        'preview_rows': PREVIEW_ROWS,
+    }
+    return render(request, 'customers/reprice_products.html', context)
+
 @login_required
 def batch_details(request, batch_number):
     batch_items = Inventory.objects.filter(batch_number=batch_number)
@@ -396,29 +577,229 @@ def batch_details(request, batch_number):
     }
     return render(request, 'inventory/batch_details.html', context)
 
+@login_required
+@permission_required('customers.add_inventory', raise_exception=True)
+def receive_goods(request):
+    if request.method == 'POST':
+        form = GoodsReceiptForm(request.POST, request.FILES)
+        upload = request.FILES.get('sheet_file')
+        sheet = upload.read().decode('utf-8-sig', errors='replace') if upload else request.POST.get('sheet', '')
+        # A pasted or uploaded sheet replaces the rows typed into the grid.
+        data = receiving.sheet_to_data(sheet, 'lines') if sheet.strip() else request.POST
+        lines = ReceiptLineFormSet(data, prefix='lines')
+        if form.is_valid() and lines.is_valid():
+            try:
+                receipt = receiving.receive(
+                    form.cleaned_data['supplier'], lines.lines, user=request.user,
+                    purchase_order=form.cleaned_data['purchase_order'],
+                    received_date=form.cleaned_data['received_date'],
+                    reference=form.cleaned_data['reference'],
+                )
+            except ValidationError as exc:
+                form.add_error(None, exc)
+            else:
+                units = sum(line['quantity'] for line in lines.lines)
+                messages.success(request, f'Received {receipt.number}: {len(lines.lines)} batch(es), {units} unit(s).')
+                return redirect('customers:supplier_ledger', supplier_id=receipt.supplier_id)
+    else:
+        order_id = request.GET.get('order', '')
+        order = PurchaseOrder.objects.select_related('supplier').filter(pk=order_id).first() if order_id.isdigit() else None
+        form = GoodsReceiptForm(initial={'supplier': order.supplier, 'purchase_order': order} if order else None)
+        lines = ReceiptLineFormSet(initial=receiving.outstanding_lines(order) if order else None, prefix='lines')
+
+    return render(request, 'customers/goods_receipt.html', {'form': form, 'lines': lines})
+
+@login_required
+@permission_required('customers.change_inventory', raise_exception=True)
+def stock_takes(request):
+    if request.method == 'POST':
+        name = request.POST.get('name', '').strip() or f'Stock take {timezone.localdate():%Y-%m-%d}'
+        take = stocktake.start(name, user=request.user)
+        return redirect('customers:stock_take', take_id=take.pk)
+
+    context = {
+        'stock_takes': StockTake.objects.annotate(lines=Count('counts'))[:50],
+    }
+    return render(request, 'customers/stock_takes.html', context)
+
+@login_required
+@permission_required('customers.change_inventory', raise_exception=True)
+def stock_take(request, take_id):
+    take = get_object_or_404(StockTake, id=take_id)
+    if request.method == 'POST':
+        if take.status != StockTake.Status.OPEN:
+            messages.error(request, f'{take.name} is no longer counting.')
+        elif 'apply' in request.POST:
+            try:
+                changed = stocktake.apply(take, zero_uncounted=bool(request.POST.get('zero_uncounted')))
+            except ValidationError as exc:
+                messages.error(request, exc.messages[0])
+            else:
+                messages.success(request, f'Stock take applied: {changed} batch(es) adjusted.')
+        else:
+            upload = request.FILES.get('sheet_file')
+            sheet = upload.read().decode('utf-8-sig', errors='replace') if upload else request.POST.get('sheet', '')
+            counts, errors = stocktake.parse_counts(sheet)
+            # A sheet with any bad line is rejected whole, so it can be fixed and re-sent.
+            for error in errors:
+                messages.error(request, error)
+            if counts and not errors:
+                recorded = stocktake.record_counts(take, counts)
+                messages.success(request, f'Recorded counts for {recorded} batch(es).')
+        return redirect('customers:stock_take', take_id=take.pk)
+
+    report = stocktake.variance_report(take)
+    if request.GET.get('format') == 'csv':
+        response = HttpResponse(content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="stock-take-{take.pk}.csv"'
+        writer = csv.writer(response)
+        writer.writerow(['Product', 'SKU', 'Batch', 'Book', 'Counted', 'Variance', 'Value at cost'])
+        for row in report['rows']:
+            writer.writerow([
+                row['product__name'], row['product__sku'], row['batch_number'], row['expected'],
+                row['counted'], row['variance'], row.get('value'),
+            ])
+        return response
+
+    context = {
+        'take': take,
+        'rows': report['rows'],
+        'summary': report['summary'],
+    }
+    return render(request, 'customers/stock_take.html', context)
+
+@login_required
+def stock_history(request):
+    on = parse_date(request.GET.get('date', '')) or timezone.localdate()
+    day_end = timezone.make_aware(datetime.combine(on, time.max))
+    balances = stock.stock_at(day_end)
+    # Selling prices as they were that day, for the retail value.
+    products = Product.objects.annotate(price_then=pricing.price_at(day_end)).in_bulk(balances)
+    rows = sorted(
+        (
+            {'product': products[product_id], 'retail': balance['units'] * (products[product_id].price_then or 0), **balance}
+            for product_id, balance in balances.items()
+        ),
+        key=lambda row: row['product'].name or '',
+    )
+    context = {
+        'on': on,
+        'rows': rows,
+        'units': sum(row['units'] for row in rows),
+        'value': sum(row['value'] for row in rows),
+        'retail': sum(row['retail'] for row in rows),
+        'movements': StockMovement.objects.filter(
+            occurred_at__gte=timezone.make_aware(datetime.combine(on, time.min)),
+            occurred_at__lte=day_end,
+        ).select_related('product')[:100],
+    }
+    return render(request, 'customers/stock_history.html', context)
+
+def ambiguous_scan(exc):
+    """The 409 answer for a code shared by several products, listing them to choose from."""
+    return JsonResponse({
+        'error': f'{exc.code} matches more than one product.',
+        'products': [{'id': product['id'], 'name': product['name'], 'sku': product['sku']} for product in exc.products],
+    }, status=409)
+
+@login_required
+def scan_lookup(request):
+    code = request.GET.get('code', '').strip()
+    if not code:
+        return JsonResponse({'error': 'No code scanned.'}, status=400)
+
+    try:
+        result = catalog.lookup(code)
+    except AmbiguousCode as exc:
+        return ambiguous_scan(exc)
+    if result is None:
+        return JsonResponse({'error': f'No product or batch found for {code}.'}, status=404)
+    return JsonResponse(result)
+
 # ======================
 # Sales & Reporting
 # ======================
-@login_required
-def sales_report(request):
-    sales = Sale.objects.filter(created_by=request.user).select_related('product__category')
+def sales_report_queries(request, user):
+    """
+    The filter form and the sales, archived sales and purchases it selects;
+    ``async_views`` evaluates the same querysets concurrently.
+    """
     form = SalesFilterForm(request.GET or None)
-
-    if form.is_valid():
+    filters = form.cleaned_data if form.is_valid() else {}
+    sales = Sale.objects.for_user(user).select_related('product__category')
+    purchases = Purchase.objects.for_user(user)
+    if filters:
         sales = form.filter_queryset(sales)
+        purchases = form.filter_queryset(purchases, date_field='date_of_purchase', category_field=None)
+        # Optical purchases have no product category; their product_type is the
+        # category name as a slug ('contact_lenses' for Contact Lenses).
+        if filters.get('category'):
+            purchases = purchases.filter(product_type__iexact=filters['category'].name.replace(' ', '_'))
+    archived_sales = archive.archived_sales(
+        user, filters.get('start_date'), filters.get('end_date'), filters.get('category')
+    )
+    return form, sales, archived_sales, purchases
+
+def archived_sales_page(archived_sales, number):
+    page = Paginator(archived_sales.order_by('-date', '-id'), archive.REPORT_PAGE_SIZE).get_page(number)
+    # Evaluated here so rendering does not query again.
+    page.object_list = list(page.object_list)
+    return page
+
+def sales_total(queryset):
+    return queryset.aggregate(total=Sum('total'))['total'] or 0
+
+@login_required
+def sales_report(request):
+    form, sales, archived_sales, purchases = sales_report_queries(request, request.user)
+    total_sales = sales_total(sales)
+    archived_total = sales_total(archived_sales)
 
-    total_sales = sales.aggregate(total=Sum('total'))['total'] or 0
-    
     context = {
         'sales': sales,
+        'archived_sales': archived_sales_page(archived_sales, request.GET.get('archived_page')),
         'form': form,
-        'total_sales': total_sales
+        'total_sales': total_sales + archived_total,
+        'archived_total': archived_total,
+        'purchase_revenue': analytics.purchase_revenue(purchases),
     }
-    return render(request, 'reports/sales_report.html', context)
+    return render(request, 'customers/sales_report.html', context)
+
+@login_required
+def sales_analytics(request):
+    form = SalesFilterForm(request.GET or None)
+    sales = Sale.objects.for_user(request.user)
+    bills = Bill.objects.for_user(request.user)
+
+    filters = {}
+    if form.is_bound:
+        if not form.is_valid():
+            return JsonResponse({'errors': form.errors}, status=400)
+        filters = form.cleaned_data
+        sales = form.filter_queryset(sales)
+        bills = form.filter_queryset(bills, date_field='date__date', category_field='products__category')
+    start_date, end_date = filters.get('start_date'), filters.get('end_date')
+
+    period = request.GET.get('period', 'day')
+    if period not in analytics.PERIODS:
+        return JsonResponse({'errors': {'period': [f"Choose one of {', '.join(analytics.PERIODS)}."]}}, status=400)
+
+    params = request.GET.copy()
+    params.pop('period', None)
+    data = analytics.summarize(
+        request.user, sales, bills,
+        period=period,
+        window=7 if period == 'day' else 4 if period == 'week' else 3,
+        cache_key=params.urlencode(),
+        archived_sales=archive.archived_sales(request.user, start_date, end_date, filters.get('category')),
+        # Archived bills keep product ids only, so a category filter leaves them out.
+        archived_bills=None if filters.get('category') else archive.archived_bills(request.user, start_date, end_date),
+    )
+    return JsonResponse(data)
 
 @login_required
 def export_sales_report(request):
-    sales = Sale.objects.filter(created_by=request.user)
+    sales = Sale.objects.for_user(request.user)
     
     # Create a DataFrame from the sales data
     data = []
@@ -446,7 +827,7 @@ def export_sales_report(request):
 @login_required
 def gst_reports(request):
     # Calculate GST reports
-    sales = Sale.objects.filter(created_by=request.user)
+    sales = Sale.objects.for_user(request.user)
     gst_data = sales.values('product__category__gst_rate').annotate(
         total_sales=Sum('total'),
         total_tax=Sum(F('total') * F('product__category__gst_rate') / 100)
@@ -462,14 +843,33 @@ def gst_reports(request):
 @login_required
 def supplier_ledger(request, supplier_id):
     supplier = get_object_or_404(Supplier, id=supplier_id)
-    inventory_items = Inventory.objects.filter(supplier=supplier).order_by('-date_added')
-    
+    entries = Paginator(ledger.ledger_with_running_balance(supplier), 50)
+    # Default to the most recent page, which is what is usually being reconciled.
+    page = entries.get_page(request.GET.get('page', entries.num_pages))
+
     context = {
         'supplier': supplier,
-        'inventory_items': inventory_items,
-        'total_value': sum(item.total_value() for item in inventory_items)
+        'entries': page,
+        'totals': ledger.supplier_totals(supplier),
+        'ageing': ledger.payables_ageing(supplier),
+        'payment_form': SupplierPaymentForm(),
     }
-    return render(request, 'reports/supplier_ledger.html', context)
+    return render(request, 'customers/supplier_ledger.html', context)
+
+@login_required
+def record_supplier_payment(request, supplier_id):
+    supplier = get_object_or_404(Supplier, id=supplier_id)
+    if request.method == 'POST':
+        form = SupplierPaymentForm(request.POST)
+        if form.is_valid():
+            entry = form.save(commit=False)
+            entry.supplier = supplier
+            entry.created_by = request.user
+            entry.save()
+            messages.success(request, f'{entry.get_entry_type_display()} recorded successfully!')
+        else:
+            messages.error(request, 'Please correct the errors below.')
+    return redirect('customers:supplier_ledger', supplier_id=supplier.id)
 
 # ======================
 # Marketing
@@ -478,7 +878,12 @@ def supplier_ledger(request, supplier_id):
 def send_promotional_message(request):
     if request.method == 'POST':
         message = request.POST.get('message')
-        customers = Customer.objects.filter(user=request.user)
+        segment = request.POST.get('segment')
+        if segment:
+            # Indexed lookup through the (user, segment) index on CustomerSegment.
+            customers = segments.segment_customers(request.user, segment)
+        else:
+            customers = Customer.objects.for_user(request.user).only('first_name', 'last_name', 'phone', 'email')
         
         # For SMS (Twilio example)
         if settings.TWILIO_ACCOUNT_SID and settings.TWILIO_AUTH_TOKEN:
@@ -493,7 +898,7 @@ def send_promotional_message(request):
                             to=customer.phone
                         )
                     except Exception as e:
-                        messages.error(request, f"Failed to send SMS to {customer.get_full_name()}: {str(e)}")
+                        messages.error(request, f"Failed to send SMS to {customer.full_name()}: {str(e)}")
         
         # For Email
         for customer in customers:
@@ -507,27 +912,36 @@ def send_promotional_message(request):
                         fail_silently=False,
                     )
                 except Exception as e:
-                    messages.error(request, f"Failed to send email to {customer.get_full_name()}: {str(e)}")
+                    messages.error(request, f"Failed to send email to {customer.full_name()}: {str(e)}")
         
         messages.success(request, 'Promotional messages sent successfully!')
-        return redirect('dashboard')
+        return redirect('customers:send_promotional_message')
     
-    return render(request, 'marketing/send_promotional_message.html')
+    context = {
+        'segments': segments.segment_counts(request.user),
+        'last_run': SegmentRun.objects.first(),
+    }
+    return render(request, 'customers/customer_segments.html', context)
 
 # ======================
 # Alerts
 # ======================
 @login_required
 def inventory_alert(request):
-    low_stock = Inventory.objects.filter(
-        quantity__lt=F('product__reorder_level'),
-        is_active=True
-    ).select_related('product', 'supplier')
-    
     context = {
-        'low_stock_items': low_stock
+        'suggestions': forecasting.reorder_suggestions(),
+        'last_run': ForecastRun.objects.first(),
+    }
+    return render(request, 'customers/inventory_alerts.html', context)
+
+@login_required
+def inventory_ageing(request):
+    context = {
+        'summary': ageing.ageing_summary(),
+        'proposals': ageing.markdown_proposals(),
+        'last_run': InventoryAgeingRun.objects.first(),
     }
-    return render(request, 'alerts/inventory_alerts.html', context)
+    return render(request, 'customers/inventory_ageing.html', context)
 
 # ======================
 # Error Handlers
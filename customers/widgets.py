@@ -0,0 +1,45 @@
+from django import forms
+from django.urls import reverse
+
+
+class AutocompleteMixin:
+    """
+    Select widget that only renders the currently selected option(s); the
+    rest are fetched as the user types from a JSON prefix-search endpoint, so
+    the page size does not grow with the table behind the field.
+    """
+    resource = None
+
+    def __init__(self, resource=None, attrs=None, choices=()):
+        super().__init__(attrs, choices)
+        self.resource = resource or self.resource
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        attrs.setdefault('class', 'form-select')
+        attrs['data-autocomplete-url'] = reverse('customers:autocomplete', args=[self.resource])
+        return attrs
+
+    def optgroups(self, name, value, attrs=None):
+        selected = {str(v) for v in value if v not in (None, '')}
+        groups = []
+        if not self.allow_multiple_selected:
+            groups.append((None, [self.create_option(name, '', '---------', not selected, 0)], 0))
+        if selected:
+            # Only the chosen rows are loaded; the queryset itself is never iterated.
+            queryset = self.choices.queryset.filter(pk__in=selected)
+            for index, obj in enumerate(queryset, start=1):
+                option = self.create_option(name, obj.pk, str(obj), True, index)
+                groups.append((None, [option], index))
+        return groups
+
+    class Media:
+        js = ['customers/js/autocomplete.js']
+
+
+class AutocompleteSelect(AutocompleteMixin, forms.Select):
+    pass
+
+
+class AutocompleteSelectMultiple(AutocompleteMixin, forms.SelectMultiple):
+    pass
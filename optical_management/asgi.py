@@ -12,5 +12,12 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'optical_management.settings')
+# The async dashboard/report/lookup views (customers.async_views) hold a
+# database connection per query thread; set DJANGO_ASYNC_VIEWS=1 to serve them.
 
 application = get_asgi_application()
+
+# Load the barcode/SKU index before the first scan reaches this process.
+from customers.catalog import catalog  # noqa: E402
+
+catalog.warm_on_startup()
@@ -93,10 +93,56 @@ WSGI_APPLICATION = 'optical_management.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        # DJANGO_DB_PATH points a process at another copy (load_test runs on one).
+        'NAME': os.environ.get('DJANGO_DB_PATH') or BASE_DIR / 'db.sqlite3',
+    },
+    # Closed financial years moved out of the working set (customers.archive).
+    # Create it with: python manage.py migrate --database archive
+    'archive': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'archive.sqlite3',
+    },
+}
+
+DATABASE_ROUTERS = ['customers.routers.ArchiveRouter']
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'optical-management',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
 }
 
+# Sessions: 'cached_db' reads from the cache and writes through to the
+# database, 'signed_cookies' keeps them in the browser, 'db' is Django's
+# default (a query per request). Expired rows are removed by
+# python manage.py expire_sessions.
+SESSION_STORE = os.environ.get('DJANGO_SESSION_STORE', 'cached_db')
+SESSION_ENGINE = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}[SESSION_STORE]
+
+# Users are loaded from the cache on each request (customers.auth). The plain
+# ModelBackend stays listed so sessions created before keep working.
+AUTHENTICATION_BACKENDS = [
+    'customers.auth.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+AUTH_USER_CACHE_TIMEOUT = 60 * 60
+# Cached users older than this are checked against auth_user (customers.auth).
+AUTH_USER_RECHECK_INTERVAL = 60
+
+# The goods receipt screen posts seven fields per line for deliveries of up
+# to 1000 lines (customers.receiving.MAX_LINES).
+DATA_UPLOAD_MAX_NUMBER_FIELDS = 10000
+
+# Route the dashboard, sales report and scan lookup to customers.async_views.
+# Off by default; only worth enabling under ASGI (DJANGO_ASYNC_VIEWS=1).
+ASYNC_VIEWS = os.environ.get('DJANGO_ASYNC_VIEWS') == '1'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -150,6 +196,23 @@ EMAIL_HOST_USER = 'your-email@gmail.com'  # Your email address
 EMAIL_HOST_PASSWORD = 'your-email-password'  # Your email password or app-specific password
 DEFAULT_FROM_EMAIL = 'your-email@gmail.com'  # Default sender email
 
+# Shop details printed on invoices and receipts
+SHOP_NAME = 'Sachdeva Opticals'
+SHOP_ADDRESS = 'Rudrapur, Uttarakhand'
+SHOP_GSTIN = '05AOFPS6623C1Z4'
+
+# Rendered invoice PDFs, keyed by bill version
+INVOICE_CACHE_DIR = BASE_DIR / 'invoice_cache'
+
+# Online database backups (python manage.py backup_db)
+BACKUP_DIR = BASE_DIR / 'backups'
+BACKUP_KEEP = 14  # per database
+
+# Branch replication (python manage.py sync_branch). BRANCH_ID must differ per
+# branch; SYNC_TOKEN is shared by branches that sync over HTTP (empty disables it).
+BRANCH_ID = 'main'
+SYNC_TOKEN = ''
+
 # settings.py
 
 TWILIO_ACCOUNT_SID = 'your-account-sid'
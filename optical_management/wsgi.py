@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'optical_management.settings')
 
 application = get_wsgi_application()
+
+# Load the barcode/SKU index before the first scan reaches this process.
+from customers.catalog import catalog  # noqa: E402
+
+catalog.warm_on_startup()
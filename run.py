@@ -1,6 +1,12 @@
 import os
 import sys
 import logging
+import multiprocessing
+
+# Invoice batches render in a process pool; in the PyInstaller bundle each
+# worker re-runs this executable, and freeze_support() hands it over to the pool.
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
 
 # Setup logging to log into a file for debugging
 logging.basicConfig(filename='app.log', level=logging.DEBUG)
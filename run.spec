@@ -13,7 +13,8 @@ a = Analysis(
         ('optical_management/asgi.py', 'optical_management'),
         ('templates/*', 'templates/'),  # Include the templates folder
         ('customers/*', 'customers/'),  # Include the customer folder
-        ('db.sqlite3', '.'),  # Include the database file (if applicable)
+        # db.sqlite3 is deliberately not bundled; it lives next to the app and is
+        # backed up with "python manage.py backup_db".
         # Add other necessary files here (e.g., migrations, static, media)
     ],
     hiddenimports=[],
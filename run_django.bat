@@ -1,3 +1,9 @@
 @echo off
 cd /d %~dp0
 start cmd /k "python manage.py runserver"
+start cmd /k "python manage.py age_inventory --every 1440"
+start cmd /k "python manage.py backup_db --every 60"
+start cmd /k "python manage.py expire_sessions --every 1440"
+start cmd /k "python manage.py forecast_demand --every 1440"
+start cmd /k "python manage.py refresh_segments --every 1440"
+start cmd /k "python manage.py snapshot_stock --every 1440"